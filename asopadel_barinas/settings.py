@@ -30,11 +30,13 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "core.apps.CoreConfig",
     "competitions.apps.CompetitionsConfig",
-    "facilities",
+    "facilities.apps.FacilitiesConfig",
     "blog",
 ]
 
 MIDDLEWARE = [
+    # Sin efecto salvo que INSTRUMENTACION esté activa (core/instrumentacion.py)
+    "core.instrumentacion.InstrumentacionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -72,6 +74,18 @@ DATABASES = {
     )
 }
 
+# Caché (estado de canchas, disponibilidad). Las claves incluyen la versión
+# de cada cancha, así que una caché por proceso (locmem) nunca sirve datos
+# viejos; con varios workers conviene una compartida (p. ej. Redis).
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="asopadel-barinas"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
@@ -99,6 +113,15 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Difusión en vivo de cambios de disponibilidad (SSE). El valor por defecto
+# funciona dentro de un único proceso ASGI; con varios procesos debe apuntar a
+# un broadcaster compartido con la misma interfaz.
+BROADCASTER = config("BROADCASTER", default="facilities.broadcast.BroadcasterEnMemoria")
+
+# Mediciones por petición (SQL, plantillas, vista) en cabeceras Server-Timing,
+# en el log y en el resumen de rendimiento del panel de administración
+INSTRUMENTACION = config("INSTRUMENTACION", default=False, cast=bool)
+
 # Modelo de usuario personalizado
 AUTH_USER_MODEL = "users.Usuario"
 # Redirecciones de autenticación
@@ -183,5 +206,10 @@ LOGGING = {
             "level": "ERROR",
             "propagate": False,
         },
+        "core.instrumentacion": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
@@ -0,0 +1,265 @@
+"""
+Tabla de posiciones de los torneos (`Clasificacion`).
+
+Cada resultado suma (y cada corrección resta el anterior y suma el nuevo) a
+las dos filas de los equipos del partido, bloqueadas dentro de la transacción
+del resultado; luego se reordena solo el grupo afectado. Así la tabla se
+sirve con una consulta indexada en lugar de recorrer todos los partidos y
+parsear sus marcadores. Los partidos de eliminación directa no cuentan.
+
+Orden: puntos, enfrentamiento directo entre los empatados, diferencia de
+sets, diferencia de games, games a favor.
+"""
+
+from collections import defaultdict
+from itertools import groupby
+
+from django.db import transaction
+
+from .marcador import parsear_marcador
+from .models import Clasificacion, Partido
+
+PUNTOS_VICTORIA = 3
+PUNTOS_DERROTA = 0
+
+CAMPOS_ACUMULADOS = (
+    "jugados",
+    "ganados",
+    "perdidos",
+    "sets_favor",
+    "sets_contra",
+    "games_favor",
+    "games_contra",
+    "puntos",
+)
+CAMPOS_ACTUALIZABLES = CAMPOS_ACUMULADOS + (
+    "diferencia_sets",
+    "diferencia_games",
+    "enfrentamientos",
+    "posicion",
+)
+
+def clave_equipo(jugadores_ids):
+    return "-".join(str(i) for i in sorted(jugadores_ids))
+
+
+def _aportes(equipo_ganador, marcador):
+    """Lo que un resultado suma a cada equipo: (equipo 1, equipo 2)."""
+    sets1 = sets2 = games1 = games2 = 0
+    leido = parsear_marcador(marcador, equipo_ganador)
+    if leido:
+        sets1, sets2, games1, games2 = leido
+
+    def aporte(gano, sets_favor, sets_contra, games_favor, games_contra):
+        return {
+            "jugados": 1,
+            "ganados": int(gano),
+            "perdidos": int(not gano),
+            "sets_favor": sets_favor,
+            "sets_contra": sets_contra,
+            "games_favor": games_favor,
+            "games_contra": games_contra,
+            "puntos": PUNTOS_VICTORIA if gano else PUNTOS_DERROTA,
+        }
+
+    return (
+        aporte(equipo_ganador == 1, sets1, sets2, games1, games2),
+        aporte(equipo_ganador == 2, sets2, sets1, games2, games1),
+    )
+
+
+def _sumar(fila, aporte, rival, signo):
+    for campo, valor in aporte.items():
+        setattr(fila, campo, getattr(fila, campo) + signo * valor)
+    fila.diferencia_sets = fila.sets_favor - fila.sets_contra
+    fila.diferencia_games = fila.games_favor - fila.games_contra
+    ganados, perdidos = fila.enfrentamientos.get(rival, [0, 0])
+    ganados += signo * aporte["ganados"]
+    perdidos += signo * aporte["perdidos"]
+    if ganados or perdidos:
+        fila.enfrentamientos[rival] = [ganados, perdidos]
+    else:
+        fila.enfrentamientos.pop(rival, None)
+
+
+def ordenar(filas):
+    """Asigna `posicion` a las filas de un grupo aplicando los desempates."""
+    ordenadas = []
+    por_puntos = sorted(filas, key=lambda f: -f.puntos)
+    for _, empatadas in groupby(por_puntos, key=lambda f: f.puntos):
+        empatadas = list(empatadas)
+        claves = {f.clave for f in empatadas}
+
+        def directo(fila):
+            return sum(
+                ganados - perdidos
+                for rival, (ganados, perdidos) in fila.enfrentamientos.items()
+                if rival in claves
+            )
+
+        empatadas.sort(
+            key=lambda f: (
+                -directo(f),
+                -f.diferencia_sets,
+                -f.diferencia_games,
+                -f.games_favor,
+                f.clave,
+            )
+        )
+        ordenadas.extend(empatadas)
+    for posicion, fila in enumerate(ordenadas, start=1):
+        fila.posicion = posicion
+    return ordenadas
+
+
+def _equipos(partido):
+    return (
+        list(partido.equipo1.values_list("pk", flat=True)),
+        list(partido.equipo2.values_list("pk", flat=True)),
+    )
+
+
+def actualizar_clasificacion(partido, anterior=None):
+    """
+    Suma el resultado de un partido finalizado a la clasificación de su
+    torneo. En una corrección, `anterior` es el (equipo_ganador, marcador)
+    que ya estaba contado y se resta primero. Debe llamarse dentro de la
+    transacción que guarda el resultado.
+    """
+    if not partido.torneo_id or partido.fase == "eliminacion":
+        return
+    cambios = []
+    if anterior and anterior[0]:
+        cambios.append((-1, *anterior))
+    if partido.estado == "finalizado" and partido.equipo_ganador:
+        cambios.append((1, partido.equipo_ganador, partido.marcador))
+    equipo1, equipo2 = _equipos(partido)
+    if not cambios or not equipo1 or not equipo2:
+        return
+
+    claves = {clave_equipo(equipo1): equipo1, clave_equipo(equipo2): equipo2}
+    existentes = set(
+        Clasificacion.objects.filter(torneo_id=partido.torneo_id, clave__in=claves).values_list(
+            "clave", flat=True
+        )
+    )
+    for clave, jugadores in claves.items():
+        if clave not in existentes:
+            # Otro resultado simultáneo puede haberla creado entre tanto
+            fila, creada = Clasificacion.objects.get_or_create(
+                torneo_id=partido.torneo_id, clave=clave, defaults={"grupo": partido.grupo}
+            )
+            if creada:
+                fila.jugadores.set(jugadores)
+
+    # La fila de un equipo puede estar en otro grupo que el del partido (un
+    # partido suelto del torneo con equipos de un cuadro): se bloquean
+    # enteros los grupos de ambas filas, todas sus posiciones pueden cambiar
+    grupos = set(
+        Clasificacion.objects.filter(torneo_id=partido.torneo_id, clave__in=claves).values_list(
+            "grupo", flat=True
+        )
+    )
+    filas = {
+        f.clave: f
+        for f in Clasificacion.objects.select_for_update()
+        .filter(torneo_id=partido.torneo_id, grupo__in=grupos)
+        .order_by("pk")
+    }
+    clave1, clave2 = clave_equipo(equipo1), clave_equipo(equipo2)
+    for signo, equipo_ganador, marcador in cambios:
+        aporte1, aporte2 = _aportes(equipo_ganador, marcador)
+        _sumar(filas[clave1], aporte1, clave2, signo)
+        _sumar(filas[clave2], aporte2, clave1, signo)
+    por_grupo = defaultdict(list)
+    for fila in filas.values():
+        por_grupo[fila.grupo].append(fila)
+    for filas_grupo in por_grupo.values():
+        ordenar(filas_grupo)
+    Clasificacion.objects.bulk_update(filas.values(), CAMPOS_ACTUALIZABLES)
+
+
+def _guardar_filas(filas, jugadores):
+    """Crea las filas nuevas y sus jugadores ({clave: [ids]}) en bloque."""
+    creadas = Clasificacion.objects.bulk_create(filas)
+    relacion = Clasificacion.jugadores.through
+    relacion.objects.bulk_create(
+        relacion(clasificacion_id=fila.pk, usuario_id=jugador_id)
+        for fila in creadas
+        for jugador_id in jugadores[fila.clave]
+    )
+    return creadas
+
+
+def crear_filas(torneo, grupos):
+    """
+    Crea en cero la fila de cada equipo al generar el cuadro, así la tabla
+    muestra a todos desde el inicio y los clasificados a la fase final salen
+    siempre de `posicion`. Las filas que ya existan se conservan.
+
+    Args:
+        grupos: {grupo: [equipo, ...]} con los equipos en orden de siembra.
+    """
+    existentes = set(
+        Clasificacion.objects.filter(torneo=torneo).values_list("clave", flat=True)
+    )
+    filas = []
+    jugadores = {}
+    for grupo, equipos in grupos.items():
+        for posicion, equipo in enumerate(equipos, start=1):
+            clave = clave_equipo(equipo)
+            if clave in existentes:
+                continue
+            jugadores[clave] = equipo
+            filas.append(
+                Clasificacion(
+                    torneo=torneo, clave=clave, grupo=grupo, posicion=posicion, enfrentamientos={}
+                )
+            )
+    return _guardar_filas(filas, jugadores)
+
+
+@transaction.atomic
+def reconstruir_clasificacion(torneo):
+    """
+    Rehace desde cero la clasificación de un torneo a partir de sus partidos
+    (para datos previos o reparaciones). Los equipos sin resultados quedan
+    con su fila en cero.
+
+    Returns:
+        int: cantidad de filas escritas.
+    """
+    Clasificacion.objects.filter(torneo=torneo).delete()
+    partidos = (
+        Partido.objects.filter(torneo=torneo)
+        .exclude(fase="eliminacion")
+        .prefetch_related("equipo1", "equipo2")
+        .order_by("pk")
+    )
+    filas = {}
+    jugadores = {}
+    for partido in partidos:
+        equipo1 = [j.pk for j in partido.equipo1.all()]
+        equipo2 = [j.pk for j in partido.equipo2.all()]
+        if not equipo1 or not equipo2:
+            continue
+        clave1, clave2 = clave_equipo(equipo1), clave_equipo(equipo2)
+        for clave, equipo in ((clave1, equipo1), (clave2, equipo2)):
+            if clave not in filas:
+                filas[clave] = Clasificacion(
+                    torneo=torneo, clave=clave, grupo=partido.grupo, enfrentamientos={}
+                )
+                jugadores[clave] = equipo
+        if partido.estado != "finalizado" or not partido.equipo_ganador:
+            continue
+        aporte1, aporte2 = _aportes(partido.equipo_ganador, partido.marcador)
+        _sumar(filas[clave1], aporte1, clave2, 1)
+        _sumar(filas[clave2], aporte2, clave1, 1)
+
+    por_grupo = defaultdict(list)
+    for fila in filas.values():
+        por_grupo[fila.grupo].append(fila)
+    for filas_grupo in por_grupo.values():
+        ordenar(filas_grupo)
+
+    return len(_guardar_filas(filas.values(), jugadores))
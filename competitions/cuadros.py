@@ -0,0 +1,427 @@
+"""
+Generación del cuadro de un torneo a partir de sus inscritos.
+
+Formatos (`Torneo.formato`):
+- eliminacion: cuadro de eliminación directa sembrado por ranking; si los
+  equipos no son potencia de 2, los mejores sembrados pasan la primera ronda.
+- todos_contra_todos: un único grupo en el que todos juegan contra todos.
+- grupos_eliminacion: grupos repartidos en serpiente por siembra y, al
+  terminar la fase de grupos, cuadro de eliminación con los clasificados.
+
+Todos los partidos del cuadro se crean de una vez con `bulk_create`. Los que
+ya tienen ambos equipos se programan con `competitions.programacion`; el resto
+quedan sin cancha, el último día del torneo, hasta que se conozcan sus equipos.
+`avanzar_ganador` lleva al ganador de cada partido al siguiente y lo programa
+en cuanto están los dos equipos.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from users.models import Usuario
+from .clasificacion import clave_equipo, crear_filas
+from .models import Clasificacion, Partido
+from .programacion import Programacion, guardar_programacion, planificar_partidos
+from .ranking import rating_efectivo
+
+FORMATOS = ("eliminacion", "todos_contra_todos", "grupos_eliminacion")
+# Hora guardada en los partidos cuyos equipos o cancha aún no se conocen. Su
+# estado `por_programar` los saca de los listados: la fecha y hora no valen
+HORA_POR_PROGRAMAR = datetime.time(0, 0)
+LETRAS_GRUPO = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def orden_siembra(tamano):
+    """
+    Semillas 1..tamano en el orden en que se colocan en el cuadro: los
+    partidos de primera ronda son pares consecutivos y las semillas 1 y 2
+    solo pueden cruzarse en la final.
+    """
+    orden = [1]
+    while len(orden) < tamano:
+        total = 2 * len(orden) + 1
+        orden = [s for semilla in orden for s in (semilla, total - semilla)]
+    return orden
+
+
+def _sembrar(equipos):
+    """Ordena los equipos por la suma del rating de sus jugadores (mayor primero)."""
+    equipos = [list(e) for e in equipos]
+    ids = {j for equipo in equipos for j in equipo}
+    rankings = dict(Usuario.objects.filter(pk__in=ids).values_list("pk", "ranking"))
+    return sorted(
+        equipos,
+        key=lambda equipo: (-sum(rating_efectivo(rankings.get(j)) for j in equipo), min(equipo)),
+    )
+
+
+def equipos_inscritos(torneo, jugadores_por_equipo=2):
+    """
+    Arma los equipos con los jugadores inscritos, uniendo a los consecutivos
+    por ranking.
+
+    Raises:
+        ValueError: si los inscritos no completan equipos.
+    """
+    jugadores = sorted(
+        torneo.jugadores_inscritos.values_list("pk", "ranking"),
+        key=lambda fila: (-rating_efectivo(fila[1]), fila[0]),
+    )
+    if len(jugadores) % jugadores_por_equipo:
+        raise ValueError(
+            f"Hay {len(jugadores)} inscritos: no se pueden formar equipos de "
+            f"{jugadores_por_equipo}."
+        )
+    ids = [pk for pk, _ in jugadores]
+    return [
+        ids[i : i + jugadores_por_equipo] for i in range(0, len(ids), jugadores_por_equipo)
+    ]
+
+
+def _nuevo_partido(torneo, equipos=(None, None), **campos):
+    partido = Partido(torneo=torneo, arbitro_id=torneo.arbitro_id, **campos)
+    partido.equipos = tuple(equipos)
+    return partido
+
+
+def _rondas_eliminacion(torneo, cantidad):
+    """
+    Partidos (sin guardar) de un cuadro de eliminación para `cantidad`
+    equipos, como lista de rondas. En la primera ronda los huecos de los
+    partidos que no se juegan (pases directos) son None.
+    """
+    tamano = 1
+    while tamano < cantidad:
+        tamano *= 2
+    orden = orden_siembra(tamano)
+    rondas = []
+    partidos_ronda = tamano // 2
+    while partidos_ronda:
+        rondas.append(
+            [
+                _nuevo_partido(torneo, fase="eliminacion", ronda=len(rondas) + 1, posicion=p)
+                for p in range(partidos_ronda)
+            ]
+        )
+        partidos_ronda //= 2
+
+    rondas[0] = [
+        partido if max(orden[2 * p], orden[2 * p + 1]) <= cantidad else None
+        for p, partido in enumerate(rondas[0])
+    ]
+    for actual, siguiente in zip(rondas, rondas[1:]):
+        for p, partido in enumerate(actual):
+            if partido is not None:
+                partido.siguiente_partido = siguiente[p // 2]
+                partido.siguiente_equipo = p % 2 + 1
+    return rondas
+
+
+def _colocar_semillas(primera_ronda, segunda_ronda, sembrados):
+    """
+    Reparte los equipos sembrados en la primera ronda; los que tienen pase
+    directo van a su lugar de la segunda.
+
+    Returns:
+        list: (partido, número de equipo, jugadores) de cada lugar asignado.
+    """
+    orden = orden_siembra(2 * len(primera_ronda))
+    lugares = []
+    for p, partido in enumerate(primera_ronda):
+        semilla1, semilla2 = orden[2 * p], orden[2 * p + 1]
+        if partido is not None:
+            lugares.append((partido, 1, sembrados[semilla1 - 1]))
+            lugares.append((partido, 2, sembrados[semilla2 - 1]))
+        else:
+            lugares.append((segunda_ronda[p // 2], p % 2 + 1, sembrados[semilla1 - 1]))
+    return lugares
+
+
+def _rondas_todos_contra_todos(equipos):
+    """Rondas del método del círculo: cada equipo juega una vez por ronda."""
+    equipos = list(equipos)
+    if len(equipos) % 2:
+        equipos.append(None)
+    rondas = []
+    for _ in range(len(equipos) - 1):
+        mitad = len(equipos) // 2
+        rondas.append(
+            [
+                (a, b)
+                for a, b in zip(equipos[:mitad], reversed(equipos[mitad:]))
+                if a is not None and b is not None
+            ]
+        )
+        equipos = [equipos[0], equipos[-1], *equipos[1:-1]]
+    return rondas
+
+
+def _repartir_en_grupos(sembrados, num_grupos):
+    """Reparto en serpiente: A, B, C, C, B, A, A, B..."""
+    grupos = [[] for _ in range(num_grupos)]
+    for i, equipo in enumerate(sembrados):
+        vuelta, indice = divmod(i, num_grupos)
+        grupos[indice if vuelta % 2 == 0 else num_grupos - 1 - indice].append(equipo)
+    return grupos
+
+
+def _programar(torneo, partidos, desde, hasta, opciones):
+    """Asigna cancha a los partidos con ambos equipos; el resto queda por programar."""
+    con_equipos = [p for p in partidos if all(p.equipos)]
+    if con_equipos:
+        planificar_partidos(
+            torneo,
+            [p.equipos for p in con_equipos],
+            desde,
+            hasta,
+            plantillas=con_equipos,
+            **opciones,
+        )
+    for partido in partidos:
+        if partido.cancha_id is None:
+            partido.estado = "por_programar"
+            partido.fecha = torneo.fecha_fin
+            partido.hora = HORA_POR_PROGRAMAR
+            partido.calcular_fin()
+
+
+@transaction.atomic
+def generar_cuadro(
+    torneo,
+    formato,
+    equipos=None,
+    jugadores_por_equipo=2,
+    grupos=None,
+    clasificados_por_grupo=2,
+    desde=None,
+    hasta=None,
+    **opciones,
+):
+    """
+    Crea todos los partidos del cuadro de un torneo y programa los que ya
+    tienen ambos equipos.
+
+    Args:
+        equipos: listas de ids de jugadores; por defecto se forman con
+            `equipos_inscritos`.
+        grupos: cantidad de grupos en `grupos_eliminacion` (por defecto uno
+            cada cuatro equipos).
+        desde, hasta: ventana de programación (por defecto las fechas del
+            torneo). El resto de opciones se pasan a `planificar_partidos`.
+
+    Returns:
+        list[Partido]: los partidos creados.
+
+    Raises:
+        ValueError: formato desconocido, equipos insuficientes o cuadro ya
+            generado.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de torneo desconocido: {formato}")
+    if Partido.objects.filter(torneo=torneo).exclude(fase="").exists():
+        raise ValueError("El torneo ya tiene un cuadro generado.")
+    if equipos is None:
+        equipos = equipos_inscritos(torneo, jugadores_por_equipo)
+    sembrados = _sembrar(equipos)
+    if len(sembrados) < 2:
+        raise ValueError("Se necesitan al menos dos equipos.")
+
+    # Partidos en orden de escritura: cada ronda de eliminación se guarda
+    # antes que las que alimentan a ella para poder enlazar `siguiente_partido`
+    tandas = []
+    rondas = []
+    if formato == "eliminacion":
+        rondas = _rondas_eliminacion(torneo, len(sembrados))
+        segunda = rondas[1] if len(rondas) > 1 else []
+        for partido, numero, jugadores in _colocar_semillas(rondas[0], segunda, sembrados):
+            equipos_partido = list(partido.equipos)
+            equipos_partido[numero - 1] = jugadores
+            partido.equipos = tuple(equipos_partido)
+    else:
+        num_grupos = 1
+        if formato == "grupos_eliminacion":
+            num_grupos = grupos or max(2, len(sembrados) // 4)
+            if len(sembrados) < num_grupos * max(2, clasificados_por_grupo):
+                raise ValueError("No hay suficientes equipos para esos grupos y clasificados.")
+            rondas = _rondas_eliminacion(torneo, num_grupos * clasificados_por_grupo)
+        miembros_grupos = {
+            LETRAS_GRUPO[g]: miembros
+            for g, miembros in enumerate(_repartir_en_grupos(sembrados, num_grupos))
+        }
+        crear_filas(torneo, miembros_grupos)
+        fase_grupos = [
+            _nuevo_partido(
+                torneo,
+                equipos=pareja,
+                fase="grupos",
+                grupo=grupo,
+                ronda=r,
+                posicion=p,
+            )
+            for grupo, miembros in miembros_grupos.items()
+            for r, pares in enumerate(_rondas_todos_contra_todos(miembros), start=1)
+            for p, pareja in enumerate(pares)
+        ]
+        fase_grupos.sort(key=lambda p: (p.ronda, p.grupo, p.posicion))
+        tandas.append(fase_grupos)
+    tandas[:0] = [[p for p in ronda if p is not None] for ronda in reversed(rondas)]
+
+    # Se programa en orden de juego (primeras rondas primero)
+    _programar(
+        torneo,
+        [p for tanda in reversed(tandas) for p in tanda],
+        desde or torneo.fecha_inicio,
+        hasta or torneo.fecha_fin,
+        opciones,
+    )
+    creados = []
+    for tanda in tandas:
+        creados.extend(guardar_programacion(Programacion(tanda, [])))
+
+    torneo.formato = formato
+    torneo.clasificados_por_grupo = clasificados_por_grupo
+    torneo.save(update_fields=["formato", "clasificados_por_grupo"])
+    return creados
+
+
+def _equipo(partido, numero):
+    return list(getattr(partido, f"equipo{numero}").values_list("pk", flat=True))
+
+
+def programar_si_completo(partido, **opciones):
+    """
+    Da cancha, fecha y hora a un partido del cuadro que aún no la tiene en
+    cuanto se conocen ambos equipos, no antes del fin de los partidos que lo
+    alimentan.
+
+    Returns:
+        bool: True si el partido quedó programado.
+    """
+    if partido.cancha_id is not None:
+        return False
+    equipo1, equipo2 = _equipo(partido, 1), _equipo(partido, 2)
+    if not equipo1 or not equipo2:
+        return False
+
+    ahora = timezone.now()
+    fin_previos = partido.partidos_previos.aggregate(fin=Max("fin"))["fin"]
+    if fin_previos and fin_previos > ahora:
+        ahora = fin_previos
+    desde = timezone.localtime(ahora).date()
+    hasta = max(partido.torneo.fecha_fin, desde)
+    opciones.setdefault("duracion", partido.duracion)
+    programacion = planificar_partidos(
+        partido.torneo,
+        [(equipo1, equipo2)],
+        desde,
+        hasta,
+        ahora=ahora,
+        plantillas=[partido],
+        **opciones,
+    )
+    if not programacion.partidos:
+        return False
+    partido.estado = "pendiente"
+    partido.save(update_fields=["cancha", "fecha", "hora", "duracion", "estado"])
+    return True
+
+
+def _posiciones_grupos(torneo):
+    """
+    {grupo: [equipo, ...]} en el orden de la tabla de posiciones
+    (`Clasificacion.posicion`, con todos sus desempates). Cada equipo es una
+    lista de ids de jugadores. Los equipos sin fila (cuadros generados antes
+    de que se crearan al inicio) van al final, por siembra.
+    """
+    grupo_de = dict(
+        Partido.objects.filter(torneo=torneo, fase="grupos").values_list("pk", "grupo")
+    )
+    equipos = defaultdict(lambda: (set(), set()))
+    for numero, relacion in ((0, Partido.equipo1.through), (1, Partido.equipo2.through)):
+        filas = relacion.objects.filter(partido_id__in=grupo_de).values_list(
+            "partido_id", "usuario_id"
+        )
+        for partido_id, usuario_id in filas:
+            equipos[partido_id][numero].add(usuario_id)
+    miembros = defaultdict(dict)
+    for partido_id, par in equipos.items():
+        for equipo in par:
+            if equipo:
+                miembros[grupo_de[partido_id]][clave_equipo(equipo)] = sorted(equipo)
+
+    posiciones = {}
+    for grupo, por_clave in miembros.items():
+        claves = Clasificacion.objects.filter(torneo=torneo, grupo=grupo).order_by(
+            "posicion"
+        ).values_list("clave", flat=True)
+        ordenados = [por_clave.pop(clave) for clave in claves if clave in por_clave]
+        posiciones[grupo] = ordenados + _sembrar(por_clave.values())
+    return posiciones
+
+
+def completar_eliminacion(torneo):
+    """
+    Al terminar la fase de grupos, coloca a los clasificados en el cuadro de
+    eliminación: primeros de grupo como semillas 1..G, segundos a
+    continuación, y así sucesivamente.
+
+    Returns:
+        bool: True si el cuadro se completó en esta llamada.
+    """
+    if (
+        Partido.objects.filter(torneo=torneo, fase="grupos")
+        .exclude(estado__in=["finalizado", "cancelado"])
+        .exists()
+    ):
+        return False
+    eliminacion = list(
+        Partido.objects.filter(torneo=torneo, fase="eliminacion").select_related("torneo")
+    )
+    ids = [p.pk for p in eliminacion]
+    if not eliminacion or any(
+        relacion.objects.filter(partido_id__in=ids).exists()
+        for relacion in (Partido.equipo1.through, Partido.equipo2.through)
+    ):
+        return False
+
+    posiciones = _posiciones_grupos(torneo)
+    sembrados = [
+        posiciones[grupo][puesto]
+        for puesto in range(torneo.clasificados_por_grupo)
+        for grupo in sorted(posiciones)
+    ]
+    por_lugar = {(p.ronda, p.posicion): p for p in eliminacion}
+    ronda_final = max(p.ronda for p in eliminacion)
+    cantidad = 2 ** (ronda_final - 1)
+    primera = [por_lugar.get((1, p)) for p in range(cantidad)]
+    segunda = [por_lugar.get((2, p)) for p in range(cantidad // 2)]
+
+    completos = set()
+    for partido, numero, jugadores in _colocar_semillas(primera, segunda, sembrados):
+        getattr(partido, f"equipo{numero}").add(*jugadores)
+        completos.add(partido)
+    for partido in sorted(completos, key=lambda p: (p.ronda, p.posicion)):
+        programar_si_completo(partido)
+    return True
+
+
+def avanzar_ganador(partido):
+    """
+    Lleva al ganador de un partido del cuadro a su lugar en el siguiente
+    partido (reemplazando al anterior si el resultado se corrigió y el
+    siguiente aún no se decidió) y lo programa si ya tiene ambos equipos.
+    En la fase de grupos, completa el cuadro de eliminación cuando termina.
+    """
+    if partido.fase == "grupos" and partido.torneo.formato == "grupos_eliminacion":
+        completar_eliminacion(partido.torneo)
+        return
+    siguiente = partido.siguiente_partido
+    if siguiente is None or not partido.equipo_ganador or siguiente.equipo_ganador:
+        return
+    ganadores = _equipo(partido, partido.equipo_ganador)
+    getattr(siguiente, f"equipo{partido.siguiente_equipo}").set(ganadores)
+    programar_si_completo(siguiente)
@@ -0,0 +1,138 @@
+"""
+Marcadores de los partidos.
+
+`Partido.marcador` sigue siendo el texto que carga el árbitro ("6-4, 7-6(5)"
+o un conteo de sets como "2-1"); al aplicar el resultado se normaliza en filas
+de `SetPartido`, de modo que games, sets y tie-breaks se suman en SQL con
+`SUM`/`GROUP BY` en lugar de parsear textos fila por fila.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db.models import Case, Count, F, Q, Sum, When
+
+from .models import SetPartido
+
+# Un set "6-4", con el tie-break opcional del perdedor: "7-6(5)"
+PATRON_SET = re.compile(r"(\d+)\s*-\s*(\d+)(?:\s*\((\d+)\))?")
+# Un único par con ambos valores hasta este número es un conteo de sets (2-1)
+MAXIMO_CONTEO_SETS = 3
+
+Marcador = namedtuple("Marcador", ["sets1", "sets2", "games1", "games2"])
+Set = namedtuple("Set", ["games1", "games2", "tiebreak1", "tiebreak2"])
+
+
+def _leer(marcador):
+    """(sets, es_conteo) tal como están escritos."""
+    sets = []
+    for a, b, tiebreak in PATRON_SET.findall(marcador or ""):
+        a, b = int(a), int(b)
+        tb1 = tb2 = None
+        if tiebreak:
+            perdedor = int(tiebreak)
+            ganador = max(7, perdedor + 2)
+            tb1, tb2 = (ganador, perdedor) if a > b else (perdedor, ganador)
+        sets.append(Set(a, b, tb1, tb2))
+    es_conteo = (
+        len(sets) == 1
+        and sets[0].tiebreak1 is None
+        and max(sets[0].games1, sets[0].games2) <= MAXIMO_CONTEO_SETS
+    )
+    return sets, es_conteo
+
+
+def _contradice(equipo_ganador, sets1, sets2):
+    return (equipo_ganador == 1 and sets1 < sets2) or (equipo_ganador == 2 and sets2 < sets1)
+
+
+def parsear_sets(marcador, equipo_ganador=None):
+    """
+    Sets de un marcador, desde el equipo 1. Si se indica `equipo_ganador` y
+    el marcador lo contradice, se entiende escrito desde el ganador y se
+    invierte. Un conteo de sets ("2-1") no tiene detalle: devuelve [].
+
+    Returns:
+        list[Set]
+    """
+    sets, es_conteo = _leer(marcador)
+    if es_conteo:
+        return []
+    ganados1 = sum(1 for s in sets if s.games1 > s.games2)
+    ganados2 = sum(1 for s in sets if s.games2 > s.games1)
+    if _contradice(equipo_ganador, ganados1, ganados2):
+        sets = [Set(s.games2, s.games1, s.tiebreak2, s.tiebreak1) for s in sets]
+    return sets
+
+
+def parsear_marcador(marcador, equipo_ganador=None):
+    """
+    Totales de un marcador por sets ("6-4, 3-6, 7-5") o de un conteo simple
+    de sets ("2-1"), con la misma orientación que `parsear_sets`.
+
+    Returns:
+        Marcador, o None si no hay marcador legible.
+    """
+    sets, es_conteo = _leer(marcador)
+    if not sets:
+        return None
+    if es_conteo:
+        sets1, sets2 = sets[0].games1, sets[0].games2
+        if _contradice(equipo_ganador, sets1, sets2):
+            sets1, sets2 = sets2, sets1
+        return Marcador(sets1, sets2, 0, 0)
+    sets = parsear_sets(marcador, equipo_ganador)
+    return Marcador(
+        sum(1 for s in sets if s.games1 > s.games2),
+        sum(1 for s in sets if s.games2 > s.games1),
+        sum(s.games1 for s in sets),
+        sum(s.games2 for s in sets),
+    )
+
+
+def guardar_sets(partido):
+    """Reemplaza los `SetPartido` de un partido por los de su marcador actual."""
+    SetPartido.objects.filter(partido=partido).delete()
+    SetPartido.objects.bulk_create(
+        SetPartido(
+            partido=partido,
+            numero=numero,
+            games_equipo1=s.games1,
+            games_equipo2=s.games2,
+            tiebreak_equipo1=s.tiebreak1,
+            tiebreak_equipo2=s.tiebreak2,
+        )
+        for numero, s in enumerate(parsear_sets(partido.marcador, partido.equipo_ganador), start=1)
+    )
+
+
+def totales_jugador(jugador):
+    """
+    Sets, games y tie-breaks ganados y perdidos por un jugador en partidos
+    finalizados, sumados en SQL en una sola consulta a través de sus
+    participaciones.
+
+    Returns:
+        dict
+    """
+    # Sin negaciones: un NOT sobre la relación se convertiría en subconsulta
+    en_equipo1 = Q(partido__participaciones__equipo=1)
+    en_equipo2 = Q(partido__participaciones__equipo=2)
+    propios = Case(When(en_equipo1, then=F("games_equipo1")), default=F("games_equipo2"))
+    rivales = Case(When(en_equipo1, then=F("games_equipo2")), default=F("games_equipo1"))
+    gana1 = Q(games_equipo1__gt=F("games_equipo2"))
+    gana2 = Q(games_equipo2__gt=F("games_equipo1"))
+    gana = (en_equipo1 & gana1) | (en_equipo2 & gana2)
+    pierde = (en_equipo1 & gana2) | (en_equipo2 & gana1)
+    con_tiebreak = Q(tiebreak_equipo1__isnull=False)
+    totales = SetPartido.objects.filter(
+        partido__participaciones__jugador=jugador, partido__estado="finalizado"
+    ).aggregate(
+        sets_ganados=Count("pk", filter=gana),
+        sets_perdidos=Count("pk", filter=pierde),
+        games_favor=Sum(propios),
+        games_contra=Sum(rivales),
+        tiebreaks_ganados=Count("pk", filter=gana & con_tiebreak),
+        tiebreaks_perdidos=Count("pk", filter=pierde & con_tiebreak),
+    )
+    return {campo: valor or 0 for campo, valor in totales.items()}
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0008_add_ediciones_resultado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('ratings', models.JSONField(default=dict)),
+                ('estadisticas', models.JSONField(default=list)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('partido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_checkpoints', to='competitions.partido')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Ranking',
+                'verbose_name_plural': 'Checkpoints de Ranking',
+                'ordering': ['fecha', 'hora', 'partido_id'],
+                'indexes': [models.Index(fields=['fecha', 'hora', 'partido'], name='rating_checkpoint_orden_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RatingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('rating_antes', models.IntegerField()),
+                ('rating_despues', models.IntegerField()),
+                ('delta', models.IntegerField()),
+                ('victoria', models.BooleanField()),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_events', to=settings.AUTH_USER_MODEL)),
+                ('partido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_events', to='competitions.partido')),
+            ],
+            options={
+                'verbose_name': 'Evento de Ranking',
+                'verbose_name_plural': 'Eventos de Ranking',
+                'ordering': ['fecha', 'hora', 'partido_id'],
+                'indexes': [models.Index(fields=['jugador', 'fecha', 'hora'], name='rating_event_jugador_idx'), models.Index(fields=['fecha', 'hora', 'partido'], name='rating_event_orden_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ratingevent',
+            constraint=models.UniqueConstraint(fields=('partido', 'jugador'), name='unique_rating_event_partido'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+def marcar_resultados_aplicados(apps, schema_editor):
+    # Los partidos ya finalizados con ganador se contaron con el flujo anterior
+    Partido = apps.get_model('competitions', 'Partido')
+    Partido.objects.filter(
+        estado='finalizado', equipo_ganador__isnull=False
+    ).update(resultado_aplicado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0009_rating_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partido',
+            name='resultado_aplicado',
+            field=models.BooleanField(default=False, help_text='Indica si el resultado ya se aplicó a estadísticas y ranking', verbose_name='Resultado Aplicado'),
+        ),
+        migrations.RunPython(marcar_resultados_aplicados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Restricción de exclusión: dos partidos no cancelados de la misma cancha no
+# pueden solaparse (duración fija de 2 horas). Solo aplica en PostgreSQL
+# (btree_gist + EXCLUDE USING gist); en SQLite y otros motores la protección
+# sigue siendo la validación del formulario.
+
+from django.db import migrations
+
+CREAR = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE competitions_partido
+    ADD COLUMN rango tsrange GENERATED ALWAYS AS (
+        tsrange(fecha + hora, fecha + hora + interval '2 hours', '[)')
+    ) STORED
+    """,
+]
+
+RESTRICCION = """
+    ALTER TABLE competitions_partido
+    ADD CONSTRAINT partido_sin_solapamiento
+    EXCLUDE USING gist (cancha_id WITH =, rango WITH &&)
+    WHERE (estado <> 'cancelado')
+"""
+
+ELIMINAR = [
+    "ALTER TABLE competitions_partido DROP CONSTRAINT IF EXISTS partido_sin_solapamiento",
+    "ALTER TABLE competitions_partido DROP COLUMN IF EXISTS rango",
+]
+
+# Pares activos que ya se solapan. EXCLUDE no admite NOT VALID, así que con
+# alguno la restricción fallaría a mitad del despliegue: se aborta antes,
+# indicando qué filas corregir.
+SOLAPADOS = """
+    SELECT a.id, b.id
+    FROM competitions_partido a
+    JOIN competitions_partido b
+      ON a.cancha_id = b.cancha_id AND a.id < b.id AND a.rango && b.rango
+    WHERE a.estado <> 'cancelado' AND b.estado <> 'cancelado'
+    ORDER BY a.id, b.id
+"""
+# Pares que se listan en el error
+MAX_PARES_LISTADOS = 50
+
+
+def comprobar_solapados(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(SOLAPADOS)
+        pares = cursor.fetchall()
+    if pares:
+        listados = ", ".join(f"{a}-{b}" for a, b in pares[:MAX_PARES_LISTADOS])
+        if len(pares) > MAX_PARES_LISTADOS:
+            listados += f" y {len(pares) - MAX_PARES_LISTADOS} más"
+        raise RuntimeError(
+            f"No se puede crear partido_sin_solapamiento: hay partidos no cancelados que se "
+            f"solapan en la misma cancha (pares de ids: {listados}). Cancele o "
+            "reprograme uno de cada par y vuelva a ejecutar la migración."
+        )
+
+
+def crear_restriccion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREAR:
+        schema_editor.execute(sql)
+    comprobar_solapados(schema_editor)
+    schema_editor.execute(RESTRICCION)
+
+
+def eliminar_restriccion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in ELIMINAR:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0010_partido_resultado_aplicado'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_restriccion, eliminar_restriccion),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:12
+
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def calcular_fin(apps, schema_editor):
+    # Hasta ahora todos los partidos duraban 2 horas (valor por defecto)
+    Partido = apps.get_model('competitions', 'Partido')
+    partidos = []
+    for partido in Partido.objects.only('fecha', 'hora', 'duracion').iterator(chunk_size=1000):
+        inicio = timezone.make_aware(datetime.datetime.combine(partido.fecha, partido.hora))
+        partido.fin = inicio + datetime.timedelta(minutes=partido.duracion)
+        partidos.append(partido)
+    Partido.objects.bulk_update(partidos, ['fin'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0011_partido_sin_solapamiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partido',
+            name='duracion',
+            field=models.PositiveSmallIntegerField(default=120, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(1440)], verbose_name='Duración (minutos)'),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='fin',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='partido',
+            name='fin',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='partido',
+            index=models.Index(fields=['cancha', 'fecha', 'fin'], name='partido_cancha_fecha_fin'),
+        ),
+    ]
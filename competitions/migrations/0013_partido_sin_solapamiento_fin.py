@@ -0,0 +1,89 @@
+# La restricción de exclusión de partidos pasa a usar la duración y el fin
+# guardados en lugar de las 2 horas fijas, así que también cubre partidos que
+# pasan de medianoche. El rango se expresa en UTC para que la columna generada
+# sea inmutable. Solo aplica en PostgreSQL.
+
+from django.db import migrations
+
+RANGO_FIJO = (
+    "tsrange(fecha + hora, fecha + hora + interval '2 hours', '[)')"
+)
+RANGO_FIN = (
+    "tsrange((fin AT TIME ZONE 'UTC') - make_interval(mins => duracion), "
+    "fin AT TIME ZONE 'UTC', '[)')"
+)
+
+
+# Pares activos que ya se solapan. EXCLUDE no admite NOT VALID, así que con
+# alguno la restricción fallaría a mitad del despliegue: se aborta antes,
+# indicando qué filas corregir.
+SOLAPADOS = """
+    SELECT a.id, b.id
+    FROM competitions_partido a
+    JOIN competitions_partido b
+      ON a.cancha_id = b.cancha_id AND a.id < b.id AND a.rango && b.rango
+    WHERE a.estado <> 'cancelado' AND b.estado <> 'cancelado'
+    ORDER BY a.id, b.id
+"""
+# Pares que se listan en el error
+MAX_PARES_LISTADOS = 50
+
+
+def comprobar_solapados(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(SOLAPADOS)
+        pares = cursor.fetchall()
+    if pares:
+        listados = ", ".join(f"{a}-{b}" for a, b in pares[:MAX_PARES_LISTADOS])
+        if len(pares) > MAX_PARES_LISTADOS:
+            listados += f" y {len(pares) - MAX_PARES_LISTADOS} más"
+        raise RuntimeError(
+            f"No se puede crear partido_sin_solapamiento: hay partidos no cancelados que se "
+            f"solapan en la misma cancha (pares de ids: {listados}). Cancele o "
+            "reprograme uno de cada par y vuelva a ejecutar la migración."
+        )
+
+
+def _recrear(schema_editor, rango):
+    for sql in [
+        "ALTER TABLE competitions_partido DROP CONSTRAINT IF EXISTS partido_sin_solapamiento",
+        "ALTER TABLE competitions_partido DROP COLUMN IF EXISTS rango",
+        f"""
+        ALTER TABLE competitions_partido
+        ADD COLUMN rango tsrange GENERATED ALWAYS AS ({rango}) STORED
+        """,
+    ]:
+        schema_editor.execute(sql)
+    # Con la duración real el rango puede ser más largo que las 2 horas fijas
+    comprobar_solapados(schema_editor)
+    schema_editor.execute(
+        """
+        ALTER TABLE competitions_partido
+        ADD CONSTRAINT partido_sin_solapamiento
+        EXCLUDE USING gist (cancha_id WITH =, rango WITH &&)
+        WHERE (estado <> 'cancelado')
+        """
+    )
+
+
+def usar_fin(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _recrear(schema_editor, RANGO_FIN)
+
+
+def usar_duracion_fija(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _recrear(schema_editor, RANGO_FIJO)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0012_partido_duracion_fin'),
+    ]
+
+    operations = [
+        migrations.RunPython(usar_fin, usar_duracion_fija),
+    ]
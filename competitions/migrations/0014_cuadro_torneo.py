@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0013_partido_sin_solapamiento_fin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partido',
+            name='fase',
+            field=models.CharField(blank=True, choices=[('grupos', 'Fase de Grupos'), ('eliminacion', 'Eliminación')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='grupo',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='posicion',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='ronda',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='siguiente_equipo',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Equipo 1'), (2, 'Equipo 2')], null=True),
+        ),
+        migrations.AddField(
+            model_name='partido',
+            name='siguiente_partido',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='partidos_previos', to='competitions.partido'),
+        ),
+        migrations.AddField(
+            model_name='torneo',
+            name='clasificados_por_grupo',
+            field=models.PositiveSmallIntegerField(default=2, verbose_name='Clasificados por Grupo'),
+        ),
+        migrations.AddField(
+            model_name='torneo',
+            name='formato',
+            field=models.CharField(blank=True, choices=[('eliminacion', 'Eliminación directa'), ('todos_contra_todos', 'Todos contra todos'), ('grupos_eliminacion', 'Grupos y eliminación')], max_length=30, verbose_name='Formato'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0014_cuadro_torneo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Clasificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100)),
+                ('grupo', models.CharField(blank=True, max_length=10)),
+                ('posicion', models.PositiveIntegerField(default=0)),
+                ('jugados', models.PositiveIntegerField(default=0)),
+                ('ganados', models.PositiveIntegerField(default=0)),
+                ('perdidos', models.PositiveIntegerField(default=0)),
+                ('sets_favor', models.PositiveIntegerField(default=0)),
+                ('sets_contra', models.PositiveIntegerField(default=0)),
+                ('games_favor', models.PositiveIntegerField(default=0)),
+                ('games_contra', models.PositiveIntegerField(default=0)),
+                ('puntos', models.IntegerField(default=0)),
+                ('diferencia_sets', models.IntegerField(default=0)),
+                ('diferencia_games', models.IntegerField(default=0)),
+                ('enfrentamientos', models.JSONField(default=dict)),
+                ('jugadores', models.ManyToManyField(related_name='clasificaciones', to=settings.AUTH_USER_MODEL)),
+                ('torneo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clasificacion', to='competitions.torneo')),
+            ],
+            options={
+                'verbose_name': 'Clasificación',
+                'verbose_name_plural': 'Clasificaciones',
+                'ordering': ['torneo', 'grupo', 'posicion'],
+                'indexes': [models.Index(fields=['torneo', 'grupo', 'posicion'], name='clasificacion_orden_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clasificacion',
+            constraint=models.UniqueConstraint(fields=('torneo', 'clave'), name='unique_clasificacion_equipo'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:26
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cargar_sets(apps, schema_editor):
+    # Copia del parser de `competitions.marcador` a la fecha de esta migración
+    SetPartido = apps.get_model('competitions', 'SetPartido')
+    Partido = apps.get_model('competitions', 'Partido')
+    patron = re.compile(r'(\d+)\s*-\s*(\d+)(?:\s*\((\d+)\))?')
+    sets = []
+    partidos = Partido.objects.exclude(marcador='').values_list('pk', 'marcador', 'equipo_ganador')
+    for partido_id, marcador, equipo_ganador in partidos.iterator(chunk_size=1000):
+        leidos = []
+        for a, b, tiebreak in patron.findall(marcador):
+            a, b = int(a), int(b)
+            tb1 = tb2 = None
+            if tiebreak:
+                perdedor = int(tiebreak)
+                tb1, tb2 = (max(7, perdedor + 2), perdedor) if a > b else (perdedor, max(7, perdedor + 2))
+            leidos.append([a, b, tb1, tb2])
+        # "2-1" es un conteo de sets, sin detalle por set
+        if len(leidos) == 1 and max(leidos[0][:2]) <= 3 and leidos[0][2] is None:
+            continue
+        ganados1 = sum(1 for s in leidos if s[0] > s[1])
+        ganados2 = sum(1 for s in leidos if s[1] > s[0])
+        if (equipo_ganador == 1 and ganados1 < ganados2) or (equipo_ganador == 2 and ganados2 < ganados1):
+            leidos = [[s[1], s[0], s[3], s[2]] for s in leidos]
+        sets.extend(
+            SetPartido(
+                partido_id=partido_id,
+                numero=numero,
+                games_equipo1=s[0],
+                games_equipo2=s[1],
+                tiebreak_equipo1=s[2],
+                tiebreak_equipo2=s[3],
+            )
+            for numero, s in enumerate(leidos, start=1)
+        )
+    SetPartido.objects.bulk_create(sets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0015_clasificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SetPartido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveSmallIntegerField()),
+                ('games_equipo1', models.PositiveSmallIntegerField()),
+                ('games_equipo2', models.PositiveSmallIntegerField()),
+                ('tiebreak_equipo1', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('tiebreak_equipo2', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('partido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sets', to='competitions.partido')),
+            ],
+            options={
+                'verbose_name': 'Set de Partido',
+                'verbose_name_plural': 'Sets de Partidos',
+                'ordering': ['partido', 'numero'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='setpartido',
+            constraint=models.UniqueConstraint(fields=('partido', 'numero'), name='unique_set_partido'),
+        ),
+        migrations.RunPython(cargar_sets, migrations.RunPython.noop),
+    ]
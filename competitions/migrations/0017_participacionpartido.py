@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cargar_participaciones(apps, schema_editor):
+    Partido = apps.get_model('competitions', 'Partido')
+    ParticipacionPartido = apps.get_model('competitions', 'ParticipacionPartido')
+    partidos = {
+        pk: (fecha, estado, ganador)
+        for pk, fecha, estado, ganador in Partido.objects.values_list(
+            'pk', 'fecha', 'estado', 'equipo_ganador'
+        ).iterator(chunk_size=1000)
+    }
+    filas = []
+    for equipo, campo in ((1, 'equipo1'), (2, 'equipo2')):
+        relacion = Partido._meta.get_field(campo).remote_field.through
+        for partido_id, jugador_id in relacion.objects.values_list('partido_id', 'usuario_id').iterator(chunk_size=1000):
+            fecha, estado, ganador = partidos[partido_id]
+            if estado != 'finalizado' or not ganador:
+                resultado = 'pendiente'
+            else:
+                resultado = 'victoria' if ganador == equipo else 'derrota'
+            filas.append(
+                ParticipacionPartido(
+                    partido_id=partido_id,
+                    jugador_id=jugador_id,
+                    equipo=equipo,
+                    resultado=resultado,
+                    fecha=fecha,
+                )
+            )
+    ParticipacionPartido.objects.bulk_create(filas, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0016_setpartido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipacionPartido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipo', models.PositiveSmallIntegerField(choices=[(1, 'Equipo 1'), (2, 'Equipo 2')])),
+                ('resultado', models.CharField(choices=[('pendiente', 'Pendiente'), ('victoria', 'Victoria'), ('derrota', 'Derrota')], default='pendiente', max_length=10)),
+                ('fecha', models.DateField()),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participaciones', to=settings.AUTH_USER_MODEL)),
+                ('partido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participaciones', to='competitions.partido')),
+            ],
+            options={
+                'verbose_name': 'Participación en Partido',
+                'verbose_name_plural': 'Participaciones en Partidos',
+                'indexes': [models.Index(fields=['jugador', 'fecha'], name='participacion_jugador_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='participacionpartido',
+            constraint=models.UniqueConstraint(fields=('partido', 'jugador'), name='unique_participacion_partido'),
+        ),
+        migrations.RunPython(cargar_participaciones, migrations.RunPython.noop),
+    ]
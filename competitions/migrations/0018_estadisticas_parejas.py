@@ -0,0 +1,105 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cargar_parejas(apps, schema_editor):
+    ParticipacionPartido = apps.get_model('competitions', 'ParticipacionPartido')
+    EstadisticaPareja = apps.get_model('competitions', 'EstadisticaPareja')
+    EstadisticaEnfrentamiento = apps.get_model('competitions', 'EstadisticaEnfrentamiento')
+    equipos = {}
+    filas = ParticipacionPartido.objects.filter(
+        partido__resultado_aplicado=True, resultado__in=('victoria', 'derrota')
+    ).values_list('partido_id', 'jugador_id', 'resultado')
+    for partido_id, jugador_id, resultado in filas.iterator(chunk_size=1000):
+        ganadores, perdedores = equipos.setdefault(partido_id, ([], []))
+        (ganadores if resultado == 'victoria' else perdedores).append(jugador_id)
+
+    parejas, enfrentamientos = {}, {}
+    for ganadores, perdedores in equipos.values():
+        if not ganadores or not perdedores:
+            continue
+        for equipo, indice in ((ganadores, 0), (perdedores, 1)):
+            for a in equipo:
+                for b in equipo:
+                    if a != b:
+                        parejas.setdefault((a, b), [0, 0])[indice] += 1
+        for a in ganadores:
+            for b in perdedores:
+                enfrentamientos.setdefault((a, b), [0, 0])[0] += 1
+                enfrentamientos.setdefault((b, a), [0, 0])[1] += 1
+
+    for modelo, otro, conteos in (
+        (EstadisticaPareja, 'companero_id', parejas),
+        (EstadisticaEnfrentamiento, 'rival_id', enfrentamientos),
+    ):
+        modelo.objects.bulk_create(
+            [
+                modelo(
+                    jugador_id=jugador_id,
+                    partidos_jugados=victorias + derrotas,
+                    victorias=victorias,
+                    derrotas=derrotas,
+                    **{otro: otro_id},
+                )
+                for (jugador_id, otro_id), (victorias, derrotas) in conteos.items()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0017_participacionpartido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaPareja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partidos_jugados', models.PositiveIntegerField(default=0)),
+                ('victorias', models.PositiveIntegerField(default=0)),
+                ('derrotas', models.PositiveIntegerField(default=0)),
+                ('companero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_pareja', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Estadística de Pareja',
+                'verbose_name_plural': 'Estadísticas de Parejas',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticaEnfrentamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partidos_jugados', models.PositiveIntegerField(default=0)),
+                ('victorias', models.PositiveIntegerField(default=0)),
+                ('derrotas', models.PositiveIntegerField(default=0)),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_enfrentamiento', to=settings.AUTH_USER_MODEL)),
+                ('rival', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Estadística de Enfrentamiento',
+                'verbose_name_plural': 'Estadísticas de Enfrentamientos',
+                'indexes': [models.Index(fields=['jugador', '-partidos_jugados'], name='enfrentamiento_jugador_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticaenfrentamiento',
+            constraint=models.UniqueConstraint(fields=('jugador', 'rival'), name='unique_estadistica_enfrentamiento'),
+        ),
+        migrations.AddIndex(
+            model_name='estadisticapareja',
+            index=models.Index(fields=['jugador', '-victorias'], name='pareja_jugador_victorias_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticapareja',
+            constraint=models.UniqueConstraint(fields=('jugador', 'companero'), name='unique_estadistica_pareja'),
+        ),
+        migrations.RunPython(cargar_parejas, migrations.RunPython.noop),
+    ]
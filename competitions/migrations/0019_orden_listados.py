@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0018_estadisticas_parejas'),
+        ('facilities', '0009_orden_listados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='partido',
+            index=models.Index(fields=['fecha', 'hora', 'id'], name='partido_orden_idx'),
+        ),
+    ]
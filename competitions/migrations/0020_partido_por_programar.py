@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+def marcar_por_programar(apps, schema_editor):
+    # Partidos del cuadro guardados sin cancha a las 00:00 del último día
+    Partido = apps.get_model('competitions', 'Partido')
+    Partido.objects.exclude(fase='').filter(
+        cancha__isnull=True, estado='pendiente'
+    ).update(estado='por_programar')
+
+
+def desmarcar_por_programar(apps, schema_editor):
+    Partido = apps.get_model('competitions', 'Partido')
+    Partido.objects.filter(estado='por_programar').update(estado='pendiente')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0019_orden_listados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='partido',
+            name='estado',
+            field=models.CharField(choices=[('por_programar', 'Por programar'), ('pendiente', 'Pendiente'), ('confirmado', 'Confirmado'), ('finalizado', 'Finalizado'), ('cancelado', 'Cancelado')], default='pendiente', max_length=50),
+        ),
+        migrations.RunPython(marcar_por_programar, desmarcar_por_programar),
+    ]
@@ -1,4 +1,14 @@
+import datetime
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+from facilities.ocupacion import (
+    DURACION_MAXIMA_MINUTOS,
+    DURACION_PARTIDO_MINUTOS,
+    fin_partido,
+)
 from users.models import Usuario
 
 
@@ -34,6 +44,20 @@ class Torneo(models.Model):
         Usuario, blank=True, related_name="torneos_inscritos"
     )
     cancelado = models.BooleanField(default=False, verbose_name="Torneo Cancelado")
+    # Estructura generada por `competitions.cuadros` (vacío si se arma a mano)
+    formato = models.CharField(
+        max_length=30,
+        choices=[
+            ("eliminacion", "Eliminación directa"),
+            ("todos_contra_todos", "Todos contra todos"),
+            ("grupos_eliminacion", "Grupos y eliminación"),
+        ],
+        blank=True,
+        verbose_name="Formato",
+    )
+    clasificados_por_grupo = models.PositiveSmallIntegerField(
+        default=2, verbose_name="Clasificados por Grupo"
+    )
 
     @property
     def activo(self):
@@ -51,6 +75,41 @@ class Torneo(models.Model):
         verbose_name_plural = "Torneos"
 
 
+class PartidoQuerySet(models.QuerySet):
+    def activos(self):
+        return self.exclude(estado="cancelado")
+
+    def programados(self):
+        """Excluye los partidos del cuadro que aún no tienen cancha, fecha ni hora."""
+        return self.exclude(estado="por_programar")
+
+    def solapados(self, inicio, fin):
+        """
+        Partidos que se solapan con [inicio, fin) (datetimes aware). Se
+        resuelve con el índice (cancha, fecha, fin): un partido dura como
+        mucho un día, así que solo puede empezar el día anterior al inicio.
+        """
+        inicio_local = timezone.localtime(inicio)
+        fin_local = timezone.localtime(fin)
+        return self.filter(
+            fecha__range=[inicio_local.date() - datetime.timedelta(days=1), fin_local.date()],
+            fin__gt=inicio,
+        ).filter(
+            # Empieza antes de `fin`
+            models.Q(fecha__lt=fin_local.date()) | models.Q(hora__lt=fin_local.time())
+        )
+
+    def en_curso(self, ahora):
+        """Partidos que ya empezaron y aún no terminan en `ahora`."""
+        ahora_local = timezone.localtime(ahora)
+        return self.filter(
+            fecha__range=[ahora_local.date() - datetime.timedelta(days=1), ahora_local.date()],
+            fin__gt=ahora,
+        ).filter(
+            models.Q(fecha__lt=ahora_local.date()) | models.Q(hora__lte=ahora_local.time())
+        )
+
+
 class Partido(models.Model):
     torneo = models.ForeignKey(
         Torneo, on_delete=models.CASCADE, related_name="partidos", null=True, blank=True
@@ -62,6 +121,14 @@ class Partido(models.Model):
     )
     fecha = models.DateField()
     hora = models.TimeField()
+    duracion = models.PositiveSmallIntegerField(
+        default=DURACION_PARTIDO_MINUTOS,
+        validators=[MinValueValidator(1), MaxValueValidator(DURACION_MAXIMA_MINUTOS)],
+        verbose_name="Duración (minutos)",
+    )
+    # Fin del partido (fecha + hora + duración); se calcula al guardar para
+    # que los solapamientos se resuelvan en SQL
+    fin = models.DateTimeField(editable=False)
 
     # NEW: Team-based fields (Padel: 1v1 or 2v2)
     equipo1 = models.ManyToManyField(
@@ -87,6 +154,7 @@ class Partido(models.Model):
     estado = models.CharField(
         max_length=50,
         choices=[
+            ("por_programar", "Por programar"),
             ("pendiente", "Pendiente"),
             ("confirmado", "Confirmado"),
             ("finalizado", "Finalizado"),
@@ -100,14 +168,62 @@ class Partido(models.Model):
         verbose_name="Ediciones de Resultado",
         help_text="Número de veces que se ha editado el resultado",
     )
+    # Evita contar dos veces el mismo resultado en estadísticas y ranking
+    resultado_aplicado = models.BooleanField(
+        default=False,
+        verbose_name="Resultado Aplicado",
+        help_text="Indica si el resultado ya se aplicó a estadísticas y ranking",
+    )
+
+    # Posición en el cuadro del torneo (ver `competitions.cuadros`)
+    fase = models.CharField(
+        max_length=20,
+        choices=[("grupos", "Fase de Grupos"), ("eliminacion", "Eliminación")],
+        blank=True,
+    )
+    grupo = models.CharField(max_length=10, blank=True)
+    ronda = models.PositiveSmallIntegerField(null=True, blank=True)
+    posicion = models.PositiveSmallIntegerField(null=True, blank=True)
+    # El ganador pasa a este partido como equipo `siguiente_equipo` (1 o 2)
+    siguiente_partido = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="partidos_previos",
+    )
+    siguiente_equipo = models.PositiveSmallIntegerField(
+        choices=[(1, "Equipo 1"), (2, "Equipo 2")], null=True, blank=True
+    )
+
+    objects = PartidoQuerySet.as_manager()
 
     def __str__(self):
         torneo_nombre = self.torneo.nombre if self.torneo else "Partido Casual"
         return f"{torneo_nombre} - {self.fecha} {self.hora}"
 
+    def calcular_fin(self):
+        """Recalcula `fin` a partir de fecha, hora y duración."""
+        fecha = self._meta.get_field("fecha").to_python(self.fecha)
+        hora = self._meta.get_field("hora").to_python(self.hora)
+        self.fin = fin_partido(fecha, hora, self.duracion)
+        return self.fin
+
+    def save(self, *args, **kwargs):
+        self.calcular_fin()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"fecha", "hora", "duracion"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "fin"}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["fecha", "hora"]
         verbose_name_plural = "Partidos"
+        indexes = [
+            models.Index(fields=["cancha", "fecha", "fin"], name="partido_cancha_fecha_fin"),
+            # Paginación por cursor de los listados de partidos
+            models.Index(fields=["fecha", "hora", "id"], name="partido_orden_idx"),
+        ]
 
 
 class EstadisticaJugador(models.Model):
@@ -138,3 +254,258 @@ class EstadisticaJugador(models.Model):
     class Meta:
         verbose_name = "Estadística de Jugador"
         verbose_name_plural = "Estadísticas de Jugadores"
+
+
+class EstadisticaPareja(models.Model):
+    """
+    Partidos jugados por `jugador` junto a `companero`. Se guarda en ambos
+    sentidos (A con B y B con A) para listar las parejas de un jugador con
+    un solo recorrido del índice.
+    """
+
+    jugador = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name="estadisticas_pareja"
+    )
+    companero = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name="+")
+    partidos_jugados = models.PositiveIntegerField(default=0)
+    victorias = models.PositiveIntegerField(default=0)
+    derrotas = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.jugador_id} con {self.companero_id}: {self.victorias}-{self.derrotas}"
+
+    class Meta:
+        verbose_name = "Estadística de Pareja"
+        verbose_name_plural = "Estadísticas de Parejas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["jugador", "companero"], name="unique_estadistica_pareja"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["jugador", "-victorias"], name="pareja_jugador_victorias_idx"
+            ),
+        ]
+
+
+class EstadisticaEnfrentamiento(models.Model):
+    """
+    Historial de `jugador` contra `rival`, guardado en ambos sentidos como
+    `EstadisticaPareja`.
+    """
+
+    jugador = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name="estadisticas_enfrentamiento"
+    )
+    rival = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name="+")
+    partidos_jugados = models.PositiveIntegerField(default=0)
+    victorias = models.PositiveIntegerField(default=0)
+    derrotas = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.jugador_id} vs {self.rival_id}: {self.victorias}-{self.derrotas}"
+
+    class Meta:
+        verbose_name = "Estadística de Enfrentamiento"
+        verbose_name_plural = "Estadísticas de Enfrentamientos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["jugador", "rival"], name="unique_estadistica_enfrentamiento"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["jugador", "-partidos_jugados"], name="enfrentamiento_jugador_idx"
+            ),
+        ]
+
+
+class RatingEvent(models.Model):
+    """
+    Historial del ranking: cambio de rating de un jugador en un partido.
+
+    Guarda una copia de la fecha/hora del partido para ordenar el historial y
+    responder "ranking a la fecha X" sin recalcular.
+    """
+
+    partido = models.ForeignKey(
+        Partido, on_delete=models.CASCADE, related_name="rating_events"
+    )
+    jugador = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name="rating_events"
+    )
+    fecha = models.DateField()
+    hora = models.TimeField()
+    rating_antes = models.IntegerField()
+    rating_despues = models.IntegerField()
+    delta = models.IntegerField()
+    victoria = models.BooleanField()
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.jugador_id} {self.rating_antes} -> {self.rating_despues}"
+
+    class Meta:
+        ordering = ["fecha", "hora", "partido_id"]
+        verbose_name = "Evento de Ranking"
+        verbose_name_plural = "Eventos de Ranking"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["partido", "jugador"], name="unique_rating_event_partido"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["jugador", "fecha", "hora"], name="rating_event_jugador_idx"
+            ),
+            models.Index(
+                fields=["fecha", "hora", "partido"], name="rating_event_orden_idx"
+            ),
+        ]
+
+
+class RatingCheckpoint(models.Model):
+    """
+    Foto periódica de ratings y estadísticas después de un partido, desde la
+    que se puede reanudar una repetición del historial.
+    """
+
+    partido = models.ForeignKey(
+        Partido, on_delete=models.CASCADE, related_name="rating_checkpoints"
+    )
+    fecha = models.DateField()
+    hora = models.TimeField()
+    # {jugador_id: rating}
+    ratings = models.JSONField(default=dict)
+    # [[jugador_id, categoria_id, partidos_jugados, victorias, derrotas], ...]
+    estadisticas = models.JSONField(default=list)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Checkpoint {self.fecha} {self.hora} (partido {self.partido_id})"
+
+    class Meta:
+        ordering = ["fecha", "hora", "partido_id"]
+        verbose_name = "Checkpoint de Ranking"
+        verbose_name_plural = "Checkpoints de Ranking"
+        indexes = [
+            models.Index(
+                fields=["fecha", "hora", "partido"], name="rating_checkpoint_orden_idx"
+            ),
+        ]
+
+
+class Clasificacion(models.Model):
+    """
+    Fila de la tabla de posiciones de un torneo para un equipo (o jugador en
+    individuales). Se actualiza de forma incremental al cargar o corregir cada
+    resultado (ver `competitions.clasificacion`), con los desempates ya
+    resueltos en `posicion`.
+    """
+
+    torneo = models.ForeignKey(
+        Torneo, on_delete=models.CASCADE, related_name="clasificacion"
+    )
+    # Ids de los jugadores ordenados y unidos por "-"
+    clave = models.CharField(max_length=100)
+    jugadores = models.ManyToManyField(Usuario, related_name="clasificaciones")
+    grupo = models.CharField(max_length=10, blank=True)
+    posicion = models.PositiveIntegerField(default=0)
+    jugados = models.PositiveIntegerField(default=0)
+    ganados = models.PositiveIntegerField(default=0)
+    perdidos = models.PositiveIntegerField(default=0)
+    sets_favor = models.PositiveIntegerField(default=0)
+    sets_contra = models.PositiveIntegerField(default=0)
+    games_favor = models.PositiveIntegerField(default=0)
+    games_contra = models.PositiveIntegerField(default=0)
+    puntos = models.IntegerField(default=0)
+    diferencia_sets = models.IntegerField(default=0)
+    diferencia_games = models.IntegerField(default=0)
+    # {clave del rival: [ganados, perdidos]} para el desempate por enfrentamiento directo
+    enfrentamientos = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"{self.torneo_id} {self.grupo} #{self.posicion} {self.clave}"
+
+    class Meta:
+        ordering = ["torneo", "grupo", "posicion"]
+        verbose_name = "Clasificación"
+        verbose_name_plural = "Clasificaciones"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["torneo", "clave"], name="unique_clasificacion_equipo"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["torneo", "grupo", "posicion"], name="clasificacion_orden_idx"
+            ),
+        ]
+
+
+class SetPartido(models.Model):
+    """
+    Un set de un partido, normalizado desde `Partido.marcador` al cargar el
+    resultado (ver `competitions.marcador`) para poder sumar games y sets en
+    SQL. Los games son los de cada equipo; el tie-break, si lo hubo, en puntos.
+    """
+
+    partido = models.ForeignKey(Partido, on_delete=models.CASCADE, related_name="sets")
+    numero = models.PositiveSmallIntegerField()
+    games_equipo1 = models.PositiveSmallIntegerField()
+    games_equipo2 = models.PositiveSmallIntegerField()
+    tiebreak_equipo1 = models.PositiveSmallIntegerField(null=True, blank=True)
+    tiebreak_equipo2 = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.partido_id} set {self.numero}: {self.games_equipo1}-{self.games_equipo2}"
+
+    class Meta:
+        ordering = ["partido", "numero"]
+        verbose_name = "Set de Partido"
+        verbose_name_plural = "Sets de Partidos"
+        constraints = [
+            models.UniqueConstraint(fields=["partido", "numero"], name="unique_set_partido")
+        ]
+
+
+class ParticipacionPartido(models.Model):
+    """
+    Un jugador en un partido, con su equipo y resultado. Copia desnormalizada
+    de `equipo1`/`equipo2` que las señales de `competitions.signals` mantienen
+    al día, para que "partidos del jugador X" y sus victorias/derrotas sean un
+    único recorrido del índice (jugador, fecha).
+    """
+
+    RESULTADOS = [
+        ("pendiente", "Pendiente"),
+        ("victoria", "Victoria"),
+        ("derrota", "Derrota"),
+    ]
+
+    partido = models.ForeignKey(
+        Partido, on_delete=models.CASCADE, related_name="participaciones"
+    )
+    jugador = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name="participaciones"
+    )
+    equipo = models.PositiveSmallIntegerField(choices=[(1, "Equipo 1"), (2, "Equipo 2")])
+    resultado = models.CharField(max_length=10, choices=RESULTADOS, default="pendiente")
+    # Copia de Partido.fecha para ordenar sin unir con la tabla de partidos
+    fecha = models.DateField()
+
+    def __str__(self):
+        return f"{self.jugador_id} en {self.partido_id} (equipo {self.equipo})"
+
+    class Meta:
+        verbose_name = "Participación en Partido"
+        verbose_name_plural = "Participaciones en Partidos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["partido", "jugador"], name="unique_participacion_partido"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["jugador", "fecha"], name="participacion_jugador_idx"),
+        ]
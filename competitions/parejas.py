@@ -0,0 +1,182 @@
+"""
+Estadísticas por pareja: cómo le va a un jugador junto a cada compañero
+(`EstadisticaPareja`) y contra cada rival (`EstadisticaEnfrentamiento`).
+
+Se actualizan de forma incremental al aplicar o corregir un resultado, de
+modo que comparar a dos jugadores o listar sus mejores compañeros lee unas
+pocas filas en lugar de recorrer todo el historial de partidos.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import EstadisticaEnfrentamiento, EstadisticaPareja, ParticipacionPartido
+
+# Campo del "otro" jugador en cada tabla
+CAMPO_OTRO = {EstadisticaPareja: "companero", EstadisticaEnfrentamiento: "rival"}
+
+
+def _companeros(equipo):
+    return [(a, b) for a in equipo for b in equipo if a != b]
+
+
+def _rivales(equipo, otro):
+    return [(a, b) for a in equipo for b in otro]
+
+
+def _pares(ganadores, perdedores):
+    """
+    Pares (jugador_id, otro_id) que suman una victoria y una derrota en cada
+    tabla, en ambos sentidos.
+
+    Returns:
+        dict: {modelo: (pares_victoria, pares_derrota)}
+    """
+    return {
+        EstadisticaPareja: (_companeros(ganadores), _companeros(perdedores)),
+        EstadisticaEnfrentamiento: (
+            _rivales(ganadores, perdedores),
+            _rivales(perdedores, ganadores),
+        ),
+    }
+
+
+def _filtro(modelo, pares):
+    campo = f"{CAMPO_OTRO[modelo]}_id"
+    filtro = Q(pk__in=[])
+    for jugador_id, otro_id in pares:
+        filtro |= Q(jugador_id=jugador_id, **{campo: otro_id})
+    return filtro
+
+
+def _incrementar(modelo, pares, campo):
+    """
+    Suma un partido ganado o perdido a los pares indicados con un UPDATE
+    atómico y crea en bloque las filas que falten.
+    """
+    filas = modelo.objects.filter(_filtro(modelo, pares))
+    actualizadas = filas.update(
+        partidos_jugados=F("partidos_jugados") + 1, **{campo: F(campo) + 1}
+    )
+    if actualizadas < len(pares):
+        otro = f"{CAMPO_OTRO[modelo]}_id"
+        existentes = set(filas.values_list("jugador_id", otro))
+        modelo.objects.bulk_create(
+            [
+                modelo(jugador_id=jugador_id, partidos_jugados=1, **{otro: otro_id, campo: 1})
+                for jugador_id, otro_id in pares
+                if (jugador_id, otro_id) not in existentes
+            ]
+        )
+
+
+def registrar_parejas(ganadores, perdedores):
+    """
+    Cuenta un resultado en las estadísticas por pareja. Se llama con los
+    participantes ya bloqueados, por lo que no hay carreras al crear filas.
+
+    Args:
+        ganadores, perdedores: ids de los jugadores de cada equipo.
+    """
+    for modelo, (victorias, derrotas) in _pares(ganadores, perdedores).items():
+        for pares, campo in ((victorias, "victorias"), (derrotas, "derrotas")):
+            if pares:
+                _incrementar(modelo, pares, campo)
+
+
+def invertir_parejas(ganadores, perdedores):
+    """
+    Corrige un resultado ya contado cuyo ganador cambió: pasa una derrota a
+    victoria en los nuevos ganadores y al revés en los nuevos perdedores.
+    """
+    for modelo, (victorias, derrotas) in _pares(ganadores, perdedores).items():
+        for pares, suma, resta in (
+            (victorias, "victorias", "derrotas"),
+            (derrotas, "derrotas", "victorias"),
+        ):
+            if pares:
+                modelo.objects.filter(_filtro(modelo, pares)).update(
+                    **{suma: F(suma) + 1, resta: F(resta) - 1}
+                )
+
+
+@transaction.atomic
+def reconstruir_parejas():
+    """Recalcula ambas tablas desde los resultados ya aplicados."""
+    equipos = {}
+    for partido_id, jugador_id, resultado in ParticipacionPartido.objects.filter(
+        partido__resultado_aplicado=True, resultado__in=("victoria", "derrota")
+    ).values_list("partido_id", "jugador_id", "resultado").iterator(chunk_size=1000):
+        ganadores, perdedores = equipos.setdefault(partido_id, ([], []))
+        (ganadores if resultado == "victoria" else perdedores).append(jugador_id)
+
+    totales = {EstadisticaPareja: {}, EstadisticaEnfrentamiento: {}}
+    for ganadores, perdedores in equipos.values():
+        if not ganadores or not perdedores:
+            continue
+        for modelo, (victorias, derrotas) in _pares(ganadores, perdedores).items():
+            for pares, indice in ((victorias, 0), (derrotas, 1)):
+                for par in pares:
+                    conteo = totales[modelo].setdefault(par, [0, 0])
+                    conteo[indice] += 1
+
+    for modelo, conteos in totales.items():
+        otro = f"{CAMPO_OTRO[modelo]}_id"
+        modelo.objects.all().delete()
+        modelo.objects.bulk_create(
+            [
+                modelo(
+                    jugador_id=jugador_id,
+                    partidos_jugados=victorias + derrotas,
+                    victorias=victorias,
+                    derrotas=derrotas,
+                    **{otro: otro_id},
+                )
+                for (jugador_id, otro_id), (victorias, derrotas) in conteos.items()
+            ],
+            batch_size=1000,
+        )
+
+
+def comparar_jugadores(jugador_id, otro_id):
+    """
+    Historial de dos jugadores como pareja y como rivales, visto desde
+    `jugador_id`, leído de las tablas precalculadas.
+
+    Returns:
+        dict: {"como_pareja": {...}, "enfrentamientos": {...}}
+    """
+    vacio = {"partidos_jugados": 0, "victorias": 0, "derrotas": 0}
+    campos = list(vacio)
+    pareja = (
+        EstadisticaPareja.objects.filter(jugador_id=jugador_id, companero_id=otro_id)
+        .values(*campos)
+        .first()
+    )
+    enfrentamiento = (
+        EstadisticaEnfrentamiento.objects.filter(jugador_id=jugador_id, rival_id=otro_id)
+        .values(*campos)
+        .first()
+    )
+    return {
+        "como_pareja": pareja or dict(vacio),
+        "enfrentamientos": enfrentamiento or dict(vacio),
+    }
+
+
+def mejores_companeros(jugador, limite=5):
+    """Compañeros con más victorias junto al jugador."""
+    return (
+        EstadisticaPareja.objects.filter(jugador=jugador)
+        .select_related("companero")
+        .order_by("-victorias", "-partidos_jugados")[:limite]
+    )
+
+
+def rivalidades(jugador, limite=5):
+    """Rivales contra los que el jugador más ha jugado."""
+    return (
+        EstadisticaEnfrentamiento.objects.filter(jugador=jugador)
+        .select_related("rival")
+        .order_by("-partidos_jugados", "-victorias")[:limite]
+    )
@@ -0,0 +1,66 @@
+"""
+Mantenimiento de `ParticipacionPartido`, la copia desnormalizada de los
+equipos de cada partido.
+
+Las señales de `competitions.signals` llaman a estas funciones al cambiar
+`equipo1`/`equipo2` y al guardar un partido; quien escribe las tablas
+intermedias con `bulk_create` (que no dispara señales) debe llamar a
+`sincronizar_participaciones` él mismo.
+"""
+
+from django.db.models import Case, Value, When
+
+from .models import ParticipacionPartido, Partido
+
+
+def resultado_participacion(estado, equipo_ganador, equipo):
+    if estado != "finalizado" or not equipo_ganador:
+        return "pendiente"
+    return "victoria" if equipo == equipo_ganador else "derrota"
+
+
+def sincronizar_participaciones(partido_ids):
+    """Rehace las participaciones de los partidos indicados desde sus equipos."""
+    partido_ids = list(partido_ids)
+    if not partido_ids:
+        return
+    partidos = {
+        pk: (fecha, estado, equipo_ganador)
+        for pk, fecha, estado, equipo_ganador in Partido.objects.filter(
+            pk__in=partido_ids
+        ).values_list("pk", "fecha", "estado", "equipo_ganador")
+    }
+    filas = []
+    for equipo, relacion in ((1, Partido.equipo1.through), (2, Partido.equipo2.through)):
+        miembros = relacion.objects.filter(partido_id__in=partidos).values_list(
+            "partido_id", "usuario_id"
+        )
+        for partido_id, jugador_id in miembros:
+            fecha, estado, equipo_ganador = partidos[partido_id]
+            filas.append(
+                ParticipacionPartido(
+                    partido_id=partido_id,
+                    jugador_id=jugador_id,
+                    equipo=equipo,
+                    resultado=resultado_participacion(estado, equipo_ganador, equipo),
+                    fecha=fecha,
+                )
+            )
+    ParticipacionPartido.objects.filter(partido_id__in=partido_ids).delete()
+    # Un jugador cargado en ambos equipos cuenta una sola vez
+    ParticipacionPartido.objects.bulk_create(filas, ignore_conflicts=True)
+
+
+def actualizar_participaciones(partido):
+    """Copia la fecha y el resultado de un partido a sus participaciones."""
+    fecha = Partido._meta.get_field("fecha").to_python(partido.fecha)
+    if partido.estado == "finalizado" and partido.equipo_ganador:
+        resultado = Case(
+            When(equipo=partido.equipo_ganador, then=Value("victoria")),
+            default=Value("derrota"),
+        )
+    else:
+        resultado = Value("pendiente")
+    ParticipacionPartido.objects.filter(partido_id=partido.pk).update(
+        fecha=fecha, resultado=resultado
+    )
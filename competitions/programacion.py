@@ -0,0 +1,254 @@
+"""
+Programación automática de los partidos de un torneo.
+
+Recibe los emparejamientos y una ventana de fechas y asigna cancha, día y
+hora a todos los partidos a la vez. Las ocupaciones existentes (reservas y
+partidos de las canchas, y los partidos y reservas de cada jugador) se cargan
+con unas pocas consultas en intervalos ordenados; cada partido se coloca de
+forma voraz en el primer hueco en el que la cancha está libre y todos sus
+jugadores están libres y descansados. Los partidos se escriben con
+`bulk_create` dentro de una transacción.
+"""
+
+import datetime
+from collections import defaultdict, namedtuple
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from facilities.broadcast import canal_cancha, get_broadcaster
+from facilities.busqueda import (
+    BLOQUE_MINUTOS,
+    IntervalosOcupados,
+    cargar_ocupacion,
+)
+from facilities.models import Cancha, ReservaCancha
+from facilities.ocupacion import (
+    DURACION_PARTIDO_MINUTOS,
+    a_hora,
+    a_minutos,
+    actualizar_ocupacion,
+    incrementar_version,
+    momento,
+    tramos_partido,
+)
+from .models import Partido
+from .participaciones import sincronizar_participaciones
+
+# Descanso mínimo de un jugador entre dos partidos
+DESCANSO_MINUTOS = 60
+
+Programacion = namedtuple("Programacion", ["partidos", "sin_programar"])
+
+
+def _validar_emparejamientos(emparejamientos):
+    validados = []
+    for equipo1, equipo2 in emparejamientos:
+        equipo1, equipo2 = list(equipo1), list(equipo2)
+        if not equipo1 or len(equipo1) != len(equipo2):
+            raise ValueError("Ambos equipos deben tener la misma cantidad de jugadores.")
+        if set(equipo1) & set(equipo2) or len(set(equipo1 + equipo2)) != 2 * len(equipo1):
+            raise ValueError("Un jugador no puede aparecer dos veces en el mismo partido.")
+        validados.append((equipo1, equipo2))
+    return validados
+
+
+def _ocupacion_jugadores(jugadores_ids, desde, hasta, descanso, excluir=()):
+    """
+    {(jugador_id, fecha): IntervalosOcupados} con los partidos (ampliados con
+    el descanso) y las reservas de los jugadores en la ventana, salvo los
+    partidos `excluir` (los que se están reprogramando).
+    """
+    intervalos = defaultdict(list)
+    partidos = (
+        Partido.objects.activos()
+        .solapados(
+            momento(desde, datetime.time.min),
+            momento(hasta + datetime.timedelta(days=1), datetime.time.min),
+        )
+        .exclude(pk__in=excluir)
+    )
+    for relacion in (Partido.equipo1.through, Partido.equipo2.through):
+        filas = relacion.objects.filter(
+            usuario_id__in=jugadores_ids, partido__in=partidos
+        ).values_list("usuario_id", "partido__fecha", "partido__hora", "partido__fin")
+        for jugador_id, fecha, hora, fin in filas:
+            for dia, inicio, fin_tramo in tramos_partido(fecha, hora, fin):
+                intervalos[(jugador_id, dia)].append((inicio - descanso, fin_tramo + descanso))
+
+    reservas = (
+        ReservaCancha.objects.filter(jugador_id__in=jugadores_ids, fecha__range=[desde, hasta])
+        .exclude(estado="cancelada")
+        .values_list("jugador_id", "fecha", "hora_inicio", "hora_fin")
+    )
+    for jugador_id, fecha, inicio, fin in reservas:
+        intervalos[(jugador_id, fecha)].append((a_minutos(inicio), a_minutos(fin)))
+
+    return defaultdict(
+        lambda: IntervalosOcupados([]),
+        {clave: IntervalosOcupados(valor) for clave, valor in intervalos.items()},
+    )
+
+
+def _candidatos(lista_canchas, fecha, duracion, paso, minimo):
+    """Inicios posibles del día en orden de hora y cancha."""
+    return sorted(
+        (inicio, cancha_id)
+        for cancha_id, apertura, cierre in lista_canchas
+        for inicio in range(
+            a_minutos(apertura) + max(0, -(-(minimo - a_minutos(apertura)) // paso)) * paso,
+            a_minutos(cierre) - duracion + 1,
+            paso,
+        )
+    )
+
+
+def planificar_partidos(
+    torneo,
+    emparejamientos,
+    desde,
+    hasta,
+    canchas=None,
+    duracion=DURACION_PARTIDO_MINUTOS,
+    descanso=DESCANSO_MINUTOS,
+    paso=BLOQUE_MINUTOS,
+    ahora=None,
+    plantillas=None,
+):
+    """
+    Asigna cancha, fecha y hora a cada emparejamiento sin escribir nada.
+
+    Args:
+        emparejamientos: secuencia de (ids equipo 1, ids equipo 2), en el
+            orden en que deben jugarse (p. ej. por ronda).
+        canchas: queryset o lista de ids; por defecto todas salvo las que
+            están en mantenimiento.
+        paso: separación en minutos entre inicios posibles, contados desde
+            la apertura de cada cancha (por defecto los bloques de 2 horas).
+        plantillas: partidos (uno por emparejamiento) a completar en lugar
+            de crear partidos nuevos; si ya existen no cuentan como ocupación
+            de sus jugadores.
+
+    Returns:
+        Programacion: partidos sin guardar (con `equipos` para sus jugadores)
+        y emparejamientos que no caben en la ventana.
+    """
+    emparejamientos = _validar_emparejamientos(emparejamientos)
+    if plantillas is None:
+        plantillas = [Partido(torneo=torneo, arbitro=torneo.arbitro) for _ in emparejamientos]
+    ahora = timezone.localtime(ahora or timezone.now())
+    desde = max(desde, ahora.date())
+
+    lista_canchas = Cancha.objects.exclude(estado="mantenimiento").order_by("id")
+    if canchas is not None:
+        lista_canchas = lista_canchas.filter(id__in=canchas)
+    lista_canchas = list(
+        lista_canchas.values_list("id", "horario_apertura", "horario_cierre")
+    )
+    if not lista_canchas or hasta < desde:
+        return Programacion([], emparejamientos)
+
+    ocupacion_canchas = defaultdict(
+        lambda: IntervalosOcupados([]),
+        cargar_ocupacion([c[0] for c in lista_canchas], desde, hasta),
+    )
+    jugadores_ids = {j for equipo1, equipo2 in emparejamientos for j in equipo1 + equipo2}
+    ocupacion_jugadores = _ocupacion_jugadores(
+        jugadores_ids, desde, hasta, descanso, excluir=[p.pk for p in plantillas if p.pk]
+    )
+
+    dias = []
+    fecha = desde
+    while fecha <= hasta:
+        minimo = a_minutos(ahora.time()) + 1 if fecha == ahora.date() else 0
+        dias.append((fecha, _candidatos(lista_canchas, fecha, duracion, paso, minimo)))
+        fecha += datetime.timedelta(days=1)
+
+    partidos, sin_programar = [], []
+    for (equipo1, equipo2), partido in zip(emparejamientos, plantillas):
+        jugadores = equipo1 + equipo2
+        lugar = next(
+            (
+                (fecha, inicio, cancha_id)
+                for fecha, candidatos in dias
+                for inicio, cancha_id in candidatos
+                if ocupacion_canchas[(cancha_id, fecha)].esta_libre(inicio, inicio + duracion)
+                and all(
+                    ocupacion_jugadores[(j, fecha)].esta_libre(inicio, inicio + duracion)
+                    for j in jugadores
+                )
+            ),
+            None,
+        )
+        if lugar is None:
+            sin_programar.append((equipo1, equipo2))
+            continue
+
+        fecha, inicio, cancha_id = lugar
+        ocupacion_canchas[(cancha_id, fecha)].agregar(inicio, inicio + duracion)
+        for j in jugadores:
+            ocupacion_jugadores[(j, fecha)].agregar(inicio - descanso, inicio + duracion + descanso)
+
+        partido.cancha_id = cancha_id
+        partido.fecha = fecha
+        partido.hora = a_hora(inicio)
+        partido.duracion = duracion
+        partido.calcular_fin()
+        partido.equipos = (equipo1, equipo2)
+        partidos.append(partido)
+
+    return Programacion(partidos, sin_programar)
+
+
+@transaction.atomic
+def guardar_programacion(programacion):
+    """
+    Escribe los partidos planificados y sus equipos con `bulk_create`.
+
+    `bulk_create` no dispara señales, así que aquí se actualizan a mano las
+    participaciones de los jugadores, el índice de ocupación y la versión de
+    las canchas, y se avisa a los calendarios abiertos al confirmar la
+    transacción.
+    """
+    partidos = Partido.objects.bulk_create(programacion.partidos)
+
+    for campo, indice in (("equipo1", 0), ("equipo2", 1)):
+        relacion = getattr(Partido, campo).through
+        relacion.objects.bulk_create(
+            [
+                relacion(partido_id=partido.pk, usuario_id=jugador_id)
+                for partido in partidos
+                for jugador_id in partido.equipos[indice] or []
+            ]
+        )
+
+    sincronizar_participaciones(p.pk for p in partidos)
+
+    dias = sorted({(p.cancha_id, p.fecha) for p in partidos if p.cancha_id})
+    for cancha_id, fecha in dias:
+        actualizar_ocupacion(cancha_id, fecha)
+    incrementar_version(*(cancha_id for cancha_id, _ in dias))
+    for cancha_id, fecha in dias:
+        transaction.on_commit(
+            partial(
+                get_broadcaster().publicar,
+                canal_cancha(cancha_id, fecha),
+                {"tipo": "partido", "accion": "programado", "fecha": fecha.isoformat()},
+            )
+        )
+    return partidos
+
+
+@transaction.atomic
+def programar_torneo(torneo, emparejamientos, desde, hasta, **opciones):
+    """
+    Planifica y guarda los partidos de un torneo en una sola transacción.
+    Acepta las mismas opciones que `planificar_partidos`.
+
+    Returns:
+        Programacion
+    """
+    programacion = planificar_partidos(torneo, emparejamientos, desde, hasta, **opciones)
+    guardar_programacion(programacion)
+    return programacion
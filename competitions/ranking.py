@@ -0,0 +1,578 @@
+"""
+Motor de ranking ELO para partidos por equipos (1v1 o 2v2).
+
+Centraliza las fórmulas de `utils.elo` aplicadas al promedio de cada equipo,
+el registro del historial (`RatingEvent`) y un motor de repetición en memoria
+que recorre los partidos finalizados sin tocar la base de datos por cada
+jugador, con checkpoints periódicos desde los que se puede reanudar.
+"""
+
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Rank
+
+from users.models import Usuario
+from utils.elo import calcular_probabilidad, nuevo_rating
+from .models import EstadisticaJugador, Partido, RatingCheckpoint, RatingEvent
+
+# Los jugadores sin ranking (0 o NULL) entran al cálculo con este rating
+RATING_INICIAL = 1200
+# K-factor 32 es estándar para amateurs/clubes
+K_FACTOR = 32
+# Cada cuántos partidos aplicados se guarda un checkpoint
+CHECKPOINT_CADA = 100
+
+
+def rating_efectivo(rating):
+    """Devuelve el rating con el que un jugador entra al cálculo ELO."""
+    return rating if rating and rating > 0 else RATING_INICIAL
+
+
+def calcular_deltas(ratings_ganadores, ratings_perdedores):
+    """
+    Calcula el delta ELO de cada equipo a partir de los ratings de sus jugadores.
+
+    Se usa el rating promedio de cada equipo; el delta resultante se aplica
+    por igual a todos sus integrantes.
+
+    Returns:
+        tuple: (delta_ganadores, delta_perdedores)
+    """
+    rating_ganadores = sum(rating_efectivo(r) for r in ratings_ganadores) / len(
+        ratings_ganadores
+    )
+    rating_perdedores = sum(rating_efectivo(r) for r in ratings_perdedores) / len(
+        ratings_perdedores
+    )
+
+    probabilidad_ganadores = calcular_probabilidad(rating_ganadores, rating_perdedores)
+
+    nuevo_rating_ganadores = nuevo_rating(
+        rating_ganadores, 1, probabilidad_ganadores, k_factor=K_FACTOR
+    )
+    nuevo_rating_perdedores = nuevo_rating(
+        rating_perdedores, 0, 1 - probabilidad_ganadores, k_factor=K_FACTOR
+    )
+
+    return (
+        nuevo_rating_ganadores - rating_ganadores,
+        nuevo_rating_perdedores - rating_perdedores,
+    )
+
+
+def aplicar_delta(rating, delta):
+    """Aplica un delta ELO sin dejar el ranking por debajo de 0."""
+    return max(0, round(rating_efectivo(rating) + delta))
+
+
+def filtro_posterior(fecha, hora, partido_id, campo_partido="partido"):
+    """
+    Q para registros estrictamente posteriores a la posición (fecha, hora, partido)
+    en el orden cronológico del historial.
+    """
+    return (
+        Q(fecha__gt=fecha)
+        | Q(fecha=fecha, hora__gt=hora)
+        | Q(fecha=fecha, hora=hora, **{f"{campo_partido}__gt": partido_id})
+    )
+
+
+def filtro_anterior(fecha, hora, partido_id, campo_partido="partido"):
+    """Q para registros estrictamente anteriores a la posición dada."""
+    return (
+        Q(fecha__lt=fecha)
+        | Q(fecha=fecha, hora__lt=hora)
+        | Q(fecha=fecha, hora=hora, **{f"{campo_partido}__lt": partido_id})
+    )
+
+
+def iterar_partidos_finalizados(partidos=None):
+    """
+    Recorre los partidos finalizados en orden cronológico con sus equipos.
+
+    Lee los integrantes de ambos equipos en una única consulta ordenada
+    (UNION ALL de las tablas intermedias) y agrupa las filas por partido.
+
+    Yields:
+        tuple: (partido_id, fecha, hora, categoria_id, equipo_ganador,
+        equipo1_ids, equipo2_ids)
+    """
+    if partidos is None:
+        partidos = Partido.objects.all()
+    partidos = partidos.filter(estado="finalizado", equipo_ganador__isnull=False)
+
+    def miembros(relacion, numero):
+        return (
+            relacion.through.objects.filter(partido__in=partidos.values("id"))
+            .annotate(equipo=Value(numero))
+            .values_list(
+                "partido__fecha",
+                "partido__hora",
+                "partido_id",
+                "partido__equipo_ganador",
+                "partido__torneo__categoria_id",
+                "usuario_id",
+                "equipo",
+            )
+        )
+
+    filas = (
+        miembros(Partido.equipo1, 1)
+        .union(miembros(Partido.equipo2, 2), all=True)
+        .order_by("partido__fecha", "partido__hora", "partido_id")
+    )
+
+    for partido_id, grupo in groupby(filas.iterator(), key=lambda fila: fila[2]):
+        equipo1, equipo2 = [], []
+        for fila in grupo:
+            fecha, hora, ganador, categoria_id = fila[0], fila[1], fila[3], fila[4]
+            (equipo1 if fila[6] == 1 else equipo2).append(fila[5])
+        yield partido_id, fecha, hora, categoria_id, ganador, equipo1, equipo2
+
+
+class ReplayRanking:
+    """
+    Acumula ratings, estadísticas e historial en memoria mientras se repite el
+    historial de partidos, para escribir el resultado final en bloque.
+    """
+
+    def __init__(self, ratings=None, estadisticas=None, checkpoint_cada=None):
+        # jugador_id -> rating actual
+        self.ratings = dict(ratings or {})
+        # (jugador_id, categoria_id) -> [partidos_jugados, victorias, derrotas]
+        self.estadisticas = {
+            clave: list(valores) for clave, valores in (estadisticas or {}).items()
+        }
+        self.checkpoint_cada = (
+            CHECKPOINT_CADA if checkpoint_cada is None else checkpoint_cada
+        )
+        self.eventos = []
+        self.checkpoints = []
+        self.partidos_procesados = 0
+
+    @classmethod
+    def desde_checkpoint(cls, checkpoint, **kwargs):
+        """Crea un motor con el estado guardado en un `RatingCheckpoint`."""
+        ratings = {int(j): rating for j, rating in checkpoint.ratings.items()}
+        estadisticas = {
+            (jugador_id, categoria_id): valores
+            for jugador_id, categoria_id, *valores in checkpoint.estadisticas
+        }
+        return cls(ratings=ratings, estadisticas=estadisticas, **kwargs)
+
+    def aplicar(self, partido_id, fecha, hora, categoria_id, equipo_ganador, equipo1, equipo2):
+        """
+        Aplica un partido al estado en memoria y acumula sus `RatingEvent`.
+
+        Returns:
+            dict: jugador_id -> (rating_antes, rating_despues), vacío si el
+            partido no tiene ambos equipos configurados.
+        """
+        if equipo_ganador == 1:
+            ganadores, perdedores = equipo1, equipo2
+        else:
+            ganadores, perdedores = equipo2, equipo1
+
+        if not ganadores or not perdedores:
+            return {}
+
+        for jugador_id in ganadores:
+            stat = self.estadisticas.setdefault((jugador_id, categoria_id), [0, 0, 0])
+            stat[0] += 1
+            stat[1] += 1
+        for jugador_id in perdedores:
+            stat = self.estadisticas.setdefault((jugador_id, categoria_id), [0, 0, 0])
+            stat[0] += 1
+            stat[2] += 1
+
+        delta_ganadores, delta_perdedores = calcular_deltas(
+            [self.ratings.get(j) for j in ganadores],
+            [self.ratings.get(j) for j in perdedores],
+        )
+
+        cambios = {}
+        for jugadores, delta, victoria in (
+            (ganadores, delta_ganadores, True),
+            (perdedores, delta_perdedores, False),
+        ):
+            for jugador_id in jugadores:
+                antes = rating_efectivo(self.ratings.get(jugador_id))
+                despues = aplicar_delta(antes, delta)
+                self.ratings[jugador_id] = despues
+                cambios[jugador_id] = (antes, despues)
+                self.eventos.append(
+                    RatingEvent(
+                        partido_id=partido_id,
+                        jugador_id=jugador_id,
+                        fecha=fecha,
+                        hora=hora,
+                        rating_antes=antes,
+                        rating_despues=despues,
+                        delta=despues - antes,
+                        victoria=victoria,
+                    )
+                )
+
+        self.partidos_procesados += 1
+        if self.checkpoint_cada and self.partidos_procesados % self.checkpoint_cada == 0:
+            self.checkpoints.append(self.checkpoint(partido_id, fecha, hora))
+        return cambios
+
+    def checkpoint(self, partido_id, fecha, hora):
+        """Devuelve un `RatingCheckpoint` (sin guardar) con el estado actual."""
+        return RatingCheckpoint(
+            partido_id=partido_id,
+            fecha=fecha,
+            hora=hora,
+            ratings={str(j): rating for j, rating in self.ratings.items()},
+            estadisticas=[
+                [jugador_id, categoria_id, *valores]
+                for (jugador_id, categoria_id), valores in self.estadisticas.items()
+            ],
+        )
+
+
+def ultimo_checkpoint_antes(partido):
+    """Devuelve el checkpoint más reciente anterior a `partido`, o None."""
+    return (
+        RatingCheckpoint.objects.filter(
+            filtro_anterior(partido.fecha, partido.hora, partido.id)
+        )
+        .order_by("-fecha", "-hora", "-partido_id")
+        .first()
+    )
+
+
+def repetir_historial(checkpoint=None):
+    """
+    Repite en memoria los partidos finalizados, desde el principio o desde
+    la posición de `checkpoint`.
+
+    Returns:
+        ReplayRanking: el motor con el estado final.
+    """
+    partidos = Partido.objects.all()
+    if checkpoint is None:
+        replay = ReplayRanking()
+    else:
+        replay = ReplayRanking.desde_checkpoint(checkpoint)
+        partidos = partidos.filter(
+            filtro_posterior(
+                checkpoint.fecha, checkpoint.hora, checkpoint.partido_id, "id"
+            )
+        )
+
+    for datos in iterar_partidos_finalizados(partidos):
+        replay.aplicar(*datos)
+    return replay
+
+
+def guardar_replay(replay, checkpoint=None, batch_size=1000):
+    """
+    Escribe el estado final de un replay en una sola transacción: rankings,
+    estadísticas, historial y checkpoints (posteriores a `checkpoint`, si se
+    reanudó desde uno).
+    """
+    estadisticas = [
+        EstadisticaJugador(
+            jugador_id=jugador_id,
+            categoria_id=categoria_id,
+            partidos_jugados=jugados,
+            victorias=victorias,
+            derrotas=derrotas,
+        )
+        for (jugador_id, categoria_id), (
+            jugados,
+            victorias,
+            derrotas,
+        ) in replay.estadisticas.items()
+    ]
+    rankings = [
+        Usuario(pk=jugador_id, ranking=rating)
+        for jugador_id, rating in replay.ratings.items()
+    ]
+
+    eventos = RatingEvent.objects.all()
+    checkpoints = RatingCheckpoint.objects.all()
+    if checkpoint is not None:
+        posicion = (checkpoint.fecha, checkpoint.hora, checkpoint.partido_id)
+        eventos = eventos.filter(filtro_posterior(*posicion))
+        checkpoints = checkpoints.filter(filtro_posterior(*posicion))
+
+    with transaction.atomic():
+        # Resetear estadísticas, rankings e historial antes de escribir los nuevos valores.
+        # Al reanudar solo se reescriben los jugadores del replay: el resto
+        # conserva el ranking que ya tenía en el checkpoint
+        EstadisticaJugador.objects.all().delete()
+        if checkpoint is None:
+            Usuario.objects.filter(es_jugador=True).update(ranking=0)
+        eventos.delete()
+        checkpoints.delete()
+
+        EstadisticaJugador.objects.bulk_create(estadisticas, batch_size=batch_size)
+        Usuario.objects.bulk_update(rankings, ["ranking"], batch_size=batch_size)
+        RatingEvent.objects.bulk_create(replay.eventos, batch_size=batch_size)
+        RatingCheckpoint.objects.bulk_create(replay.checkpoints, batch_size=batch_size)
+        Partido.objects.filter(
+            estado="finalizado", equipo_ganador__isnull=False, resultado_aplicado=False
+        ).update(resultado_aplicado=True)
+
+
+def invalidar_checkpoints_posteriores(partido):
+    """
+    Elimina los checkpoints posteriores a `partido`: ya no reflejan el
+    historial si este partido se aplica o corrige fuera de orden.
+    """
+    RatingCheckpoint.objects.filter(
+        filtro_posterior(partido.fecha, partido.hora, partido.id)
+    ).delete()
+
+
+def crear_checkpoint_si_corresponde():
+    """
+    Guarda un checkpoint con el estado actual de la base de datos cuando se
+    han aplicado `CHECKPOINT_CADA` partidos desde el último.
+    """
+    eventos = RatingEvent.objects.all()
+    ultimo = RatingCheckpoint.objects.order_by("-fecha", "-hora", "-partido_id").first()
+    if ultimo is not None:
+        eventos = eventos.filter(
+            filtro_posterior(ultimo.fecha, ultimo.hora, ultimo.partido_id)
+        )
+
+    if eventos.values("partido").distinct().count() < CHECKPOINT_CADA:
+        return None
+
+    posicion = eventos.order_by("-fecha", "-hora", "-partido_id").first()
+    # Todos los rankings, no solo los de jugadores con historial: quien sumó
+    # puntos antes de que existiera `RatingEvent` debe reanudar con ellos
+    ratings = Usuario.objects.filter(ranking__gt=0)
+    return RatingCheckpoint.objects.create(
+        partido_id=posicion.partido_id,
+        fecha=posicion.fecha,
+        hora=posicion.hora,
+        ratings={str(j): rating for j, rating in ratings.values_list("id", "ranking")},
+        estadisticas=[
+            list(fila)
+            for fila in EstadisticaJugador.objects.values_list(
+                "jugador_id", "categoria_id", "partidos_jugados", "victorias", "derrotas"
+            )
+        ],
+    )
+
+
+def _ajustar_checkpoint(checkpoint, diferencias, jugadores_invertidos, categoria_id):
+    """Corrige un checkpoint posterior con las diferencias acumuladas hasta su posición."""
+    for jugador_id, diferencia in diferencias.items():
+        clave = str(jugador_id)
+        if clave in checkpoint.ratings:
+            checkpoint.ratings[clave] += diferencia
+    for fila in checkpoint.estadisticas:
+        jugador_id, categoria = fila[0], fila[1]
+        if categoria == categoria_id and jugador_id in jugadores_invertidos:
+            # [jugador, categoria, jugados, victorias, derrotas]
+            signo = jugadores_invertidos[jugador_id]
+            fila[3] += signo
+            fila[4] -= signo
+
+
+def propagar_correccion(partido):
+    """
+    Corrige el ranking tras cambiar el ganador de un partido ya aplicado.
+    Debe llamarse dentro de una transacción con el partido bloqueado.
+
+    En lugar de repetir todo el historial aplica un delta compensatorio:
+    recalcula el partido con los mismos ratings de entrada, invierte sus
+    victorias/derrotas y propaga la diferencia de rating solo a los partidos
+    posteriores en los que participa algún jugador afectado. Las escrituras
+    quedan acotadas a los eventos, jugadores y checkpoints que cambian.
+
+    Si el partido no tiene historial registrado, reanuda la repetición desde
+    el último checkpoint anterior.
+    """
+    eventos = list(RatingEvent.objects.filter(partido=partido))
+    if not eventos:
+        checkpoint = ultimo_checkpoint_antes(partido)
+        guardar_replay(repetir_historial(checkpoint), checkpoint)
+        return
+
+    equipo_ganador = partido.equipo1 if partido.equipo_ganador == 1 else partido.equipo2
+    ganadores = set(equipo_ganador.values_list("id", flat=True))
+    if {e.jugador_id for e in eventos if e.victoria} == ganadores:
+        return  # El ganador no cambió
+
+    # 1. Recalcular el partido corregido con los mismos ratings de entrada
+    delta_ganadores, delta_perdedores = calcular_deltas(
+        [e.rating_antes for e in eventos if e.jugador_id in ganadores],
+        [e.rating_antes for e in eventos if e.jugador_id not in ganadores],
+    )
+    diferencias = {}
+    # jugador_id -> +1 si pasa de derrota a victoria, -1 en caso contrario
+    invertidos = {}
+    for evento in eventos:
+        victoria = evento.jugador_id in ganadores
+        despues = aplicar_delta(
+            evento.rating_antes, delta_ganadores if victoria else delta_perdedores
+        )
+        diferencias[evento.jugador_id] = despues - evento.rating_despues
+        invertidos[evento.jugador_id] = 1 if victoria else -1
+        evento.rating_despues = despues
+        evento.delta = despues - evento.rating_antes
+        evento.victoria = victoria
+    modificados = list(eventos)
+
+    categoria_id = partido.torneo.categoria_id if partido.torneo_id else None
+
+    # 2. Propagar la diferencia a los partidos posteriores afectados
+    checkpoints = list(
+        RatingCheckpoint.objects.filter(
+            filtro_posterior(partido.fecha, partido.hora, partido.id)
+        ).order_by("fecha", "hora", "partido_id")
+    )
+    pendientes = list(checkpoints)
+    posteriores = (
+        RatingEvent.objects.filter(
+            filtro_posterior(partido.fecha, partido.hora, partido.id)
+        )
+        .order_by("fecha", "hora", "partido_id")
+        .iterator()
+    )
+    for _, grupo in groupby(posteriores, key=lambda e: e.partido_id):
+        grupo = list(grupo)
+        posicion = (grupo[0].fecha, grupo[0].hora, grupo[0].partido_id)
+        while pendientes and (
+            pendientes[0].fecha,
+            pendientes[0].hora,
+            pendientes[0].partido_id,
+        ) < posicion:
+            _ajustar_checkpoint(pendientes.pop(0), diferencias, invertidos, categoria_id)
+
+        if not diferencias:
+            break
+        if not any(e.jugador_id in diferencias for e in grupo):
+            continue
+
+        for evento in grupo:
+            evento.rating_antes += diferencias.get(evento.jugador_id, 0)
+        delta_ganadores, delta_perdedores = calcular_deltas(
+            [e.rating_antes for e in grupo if e.victoria],
+            [e.rating_antes for e in grupo if not e.victoria],
+        )
+        for evento in grupo:
+            despues = aplicar_delta(
+                evento.rating_antes,
+                delta_ganadores if evento.victoria else delta_perdedores,
+            )
+            diferencia = despues - evento.rating_despues
+            if diferencia:
+                diferencias[evento.jugador_id] = diferencia
+            else:
+                diferencias.pop(evento.jugador_id, None)
+            evento.rating_despues = despues
+            evento.delta = despues - evento.rating_antes
+        modificados.extend(grupo)
+
+    for checkpoint in pendientes:
+        _ajustar_checkpoint(checkpoint, diferencias, invertidos, categoria_id)
+
+    with transaction.atomic():
+        # Bloquear a todos los jugadores cuyo ranking o estadísticas cambian
+        list(
+            Usuario.objects.select_for_update()
+            .filter(pk__in=set(diferencias) | set(invertidos))
+            .order_by("pk")
+            .values_list("pk")
+        )
+        RatingEvent.objects.bulk_update(
+            modificados, ["rating_antes", "rating_despues", "delta", "victoria"]
+        )
+        RatingCheckpoint.objects.bulk_update(checkpoints, ["ratings", "estadisticas"])
+
+        for signo in (1, -1):
+            jugadores = [j for j, s in invertidos.items() if s == signo]
+            EstadisticaJugador.objects.filter(
+                jugador_id__in=jugadores, categoria_id=categoria_id
+            ).update(
+                victorias=F("victorias") + signo, derrotas=F("derrotas") - signo
+            )
+
+        # Una actualización por valor de diferencia: ranking = ranking + diferencia
+        por_diferencia = {}
+        for jugador_id, diferencia in diferencias.items():
+            por_diferencia.setdefault(diferencia, []).append(jugador_id)
+        for diferencia, jugadores in por_diferencia.items():
+            Usuario.objects.filter(pk__in=jugadores).update(
+                ranking=F("ranking") + diferencia
+            )
+
+
+def leaderboard_a_fecha(jugadores, fecha):
+    """
+    Anota `ranking_historico` (rating tras el último partido hasta `fecha`)
+    y ordena por él; una sola consulta con subconsulta indexada por jugador.
+    """
+    ultimo_evento = RatingEvent.objects.filter(
+        jugador=OuterRef("pk"), fecha__lte=fecha
+    ).order_by("-fecha", "-hora", "-partido_id")
+    return (
+        jugadores.annotate(
+            ranking_historico=Subquery(ultimo_evento.values("rating_despues")[:1])
+        )
+        .filter(ranking_historico__isnull=False)
+        .order_by("-ranking_historico")
+    )
+
+
+def leaderboard(jugadores, campo="ranking"):
+    """
+    Tabla de ranking en una sola consulta: `posicion` es el RANK() del
+    jugador dentro de su categoría (los empatados comparten puesto) y
+    `stats_jugados`/`stats_victorias` vienen de su `EstadisticaJugador` en la
+    categoría de torneo con el mismo nombre que la suya ("adulto" / "Adulto").
+
+    Args:
+        campo: "ranking" o una anotación previa, como `ranking_historico`.
+    """
+    orden = F(campo).desc(nulls_last=True)
+    estadistica = EstadisticaJugador.objects.filter(
+        jugador=OuterRef("pk"), categoria__nombre__iexact=OuterRef("categoria_jugador")
+    )
+    return jugadores.annotate(
+        posicion=Window(Rank(), partition_by=F("categoria_jugador"), order_by=orden),
+        stats_jugados=Subquery(estadistica.values("partidos_jugados")[:1]),
+        stats_victorias=Subquery(estadistica.values("victorias")[:1]),
+    ).order_by(orden, "pk")
+
+
+def posicion_en_leaderboard(jugadores, jugador, campo="ranking"):
+    """
+    Puesto de `jugador` en su categoría y su índice (base 0) en el listado de
+    `jugadores`, contando en SQL a quién tiene por delante en lugar de
+    recorrer la tabla.
+
+    Returns:
+        tuple: (posicion, indice), o None si el jugador no está en el listado.
+    """
+    valor = jugadores.filter(pk=jugador.pk).values_list(campo, flat=True).first()
+    if valor is None and not jugadores.filter(pk=jugador.pk).exists():
+        return None
+    if valor is None:
+        # Sin rating: empatado con todos los demás sin rating, al final
+        por_delante = Q(**{f"{campo}__isnull": False})
+        empatados = Q(**{f"{campo}__isnull": True})
+    else:
+        por_delante = Q(**{f"{campo}__gt": valor})
+        empatados = Q(**{campo: valor})
+    if jugador.categoria_jugador is None:
+        misma_categoria = Q(categoria_jugador__isnull=True)
+    else:
+        misma_categoria = Q(categoria_jugador=jugador.categoria_jugador)
+    conteo = jugadores.aggregate(
+        delante_en_categoria=Count("pk", filter=misma_categoria & por_delante),
+        delante_en_listado=Count(
+            "pk", filter=por_delante | (empatados & Q(pk__lt=jugador.pk))
+        ),
+    )
+    return conteo["delante_en_categoria"] + 1, conteo["delante_en_listado"]
@@ -0,0 +1,189 @@
+"""
+Servicio único para aplicar resultados de partidos.
+
+Todas las vistas que finalizan o corrigen un partido pasan por aquí, de modo
+que estadísticas, ranking e historial se actualizan una sola vez, dentro de
+una transacción y con los participantes bloqueados.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from users.models import Usuario
+from .clasificacion import actualizar_clasificacion
+from .cuadros import avanzar_ganador
+from .marcador import guardar_sets
+from .models import EstadisticaJugador, Partido, RatingEvent
+from .parejas import invertir_parejas, registrar_parejas
+from .ranking import (
+    aplicar_delta,
+    calcular_deltas,
+    crear_checkpoint_si_corresponde,
+    invalidar_checkpoints_posteriores,
+    propagar_correccion,
+    rating_efectivo,
+)
+
+
+def _bloquear_participantes(partido):
+    """
+    Bloquea (SELECT ... FOR UPDATE) a los jugadores de ambos equipos en orden
+    de id para evitar interbloqueos entre árbitros concurrentes.
+
+    Returns:
+        tuple: (equipo1, equipo2) como listas de Usuario.
+    """
+    equipo1_ids = set(partido.equipo1.values_list("id", flat=True))
+    equipo2_ids = set(partido.equipo2.values_list("id", flat=True))
+    jugadores = list(
+        Usuario.objects.select_for_update()
+        .filter(pk__in=equipo1_ids | equipo2_ids)
+        .order_by("pk")
+    )
+    equipo1 = [j for j in jugadores if j.pk in equipo1_ids]
+    equipo2 = [j for j in jugadores if j.pk in equipo2_ids]
+    return equipo1, equipo2
+
+
+def _incrementar_estadisticas(jugadores, categoria_id, victoria):
+    """
+    Suma un partido (ganado o perdido) a las estadísticas de un equipo con
+    un UPDATE atómico usando F() y crea en bloque las filas que falten.
+    """
+    campo = "victorias" if victoria else "derrotas"
+    ids = [j.pk for j in jugadores]
+    estadisticas = EstadisticaJugador.objects.filter(
+        jugador_id__in=ids, categoria_id=categoria_id
+    )
+    actualizadas = estadisticas.update(
+        partidos_jugados=F("partidos_jugados") + 1, **{campo: F(campo) + 1}
+    )
+    if actualizadas < len(ids):
+        existentes = set(estadisticas.values_list("jugador_id", flat=True))
+        EstadisticaJugador.objects.bulk_create(
+            [
+                EstadisticaJugador(
+                    jugador_id=jugador_id,
+                    categoria_id=categoria_id,
+                    partidos_jugados=1,
+                    **{campo: 1},
+                )
+                for jugador_id in ids
+                if jugador_id not in existentes
+            ]
+        )
+
+
+def aplicar_resultado(partido):
+    """
+    Aplica el resultado de un partido finalizado: sets del marcador,
+    estadísticas, ranking ELO de cada jugador e historial en `RatingEvent`.
+    En los partidos de un cuadro, además, el ganador pasa al siguiente.
+
+    Es idempotente: el partido queda marcado con `resultado_aplicado` y una
+    segunda llamada no vuelve a contarlo.
+
+    Returns:
+        bool: True si el resultado se aplicó en esta llamada.
+    """
+    original = partido
+    with transaction.atomic():
+        partido = (
+            Partido.objects.select_for_update()
+            .select_related("torneo")
+            .get(pk=partido.pk)
+        )
+        if (
+            partido.resultado_aplicado
+            or partido.estado != "finalizado"
+            or not partido.equipo_ganador
+        ):
+            return False
+
+        equipo1, equipo2 = _bloquear_participantes(partido)
+        if partido.equipo_ganador == 1:
+            ganadores, perdedores = equipo1, equipo2
+        else:
+            ganadores, perdedores = equipo2, equipo1
+
+        partido.resultado_aplicado = True
+        partido.save(update_fields=["resultado_aplicado"])
+        # Evita que un save() posterior de la instancia del llamador borre la marca
+        original.resultado_aplicado = True
+        guardar_sets(partido)
+        avanzar_ganador(partido)
+
+        # Si no hay ambos equipos no hay nada que contar
+        if not ganadores or not perdedores:
+            return True
+
+        actualizar_clasificacion(partido)
+        categoria_id = partido.torneo.categoria_id if partido.torneo else None
+        _incrementar_estadisticas(ganadores, categoria_id, victoria=True)
+        _incrementar_estadisticas(perdedores, categoria_id, victoria=False)
+        registrar_parejas([g.pk for g in ganadores], [p.pk for p in perdedores])
+
+        delta_ganadores, delta_perdedores = calcular_deltas(
+            [g.ranking for g in ganadores], [p.ranking for p in perdedores]
+        )
+        eventos = []
+        for jugadores, delta, victoria in (
+            (ganadores, delta_ganadores, True),
+            (perdedores, delta_perdedores, False),
+        ):
+            for jugador in jugadores:
+                antes = rating_efectivo(jugador.ranking)
+                jugador.ranking = aplicar_delta(antes, delta)
+                eventos.append(
+                    RatingEvent(
+                        partido=partido,
+                        jugador=jugador,
+                        fecha=partido.fecha,
+                        hora=partido.hora,
+                        rating_antes=antes,
+                        rating_despues=jugador.ranking,
+                        delta=jugador.ranking - antes,
+                        victoria=victoria,
+                    )
+                )
+        Usuario.objects.bulk_update(ganadores + perdedores, ["ranking"])
+        RatingEvent.objects.bulk_create(eventos)
+
+        invalidar_checkpoints_posteriores(partido)
+        crear_checkpoint_si_corresponde()
+        return True
+
+
+def corregir_resultado(partido, anterior=None):
+    """
+    Corrige un partido ya aplicado cuyo ganador o marcador cambió, con un
+    delta compensatorio en lugar de sumar un segundo resultado. Si el partido
+    aún no estaba aplicado, simplemente lo aplica. El nuevo ganador reemplaza
+    al anterior en el siguiente partido del cuadro si este aún no se decidió.
+
+    Args:
+        anterior: (equipo_ganador, marcador) ya contados en la clasificación
+            del torneo y en las estadísticas por pareja, que se reemplazan
+            por los nuevos.
+    """
+    with transaction.atomic():
+        partido = (
+            Partido.objects.select_for_update()
+            .select_related("torneo")
+            .get(pk=partido.pk)
+        )
+        if not partido.resultado_aplicado:
+            return aplicar_resultado(partido)
+        propagar_correccion(partido)
+        guardar_sets(partido)
+        if anterior is not None:
+            actualizar_clasificacion(partido, anterior)
+            if anterior[0] and partido.equipo_ganador != anterior[0]:
+                equipo1 = list(partido.equipo1.values_list("id", flat=True))
+                equipo2 = list(partido.equipo2.values_list("id", flat=True))
+                if partido.equipo_ganador == 1:
+                    invertir_parejas(equipo1, equipo2)
+                else:
+                    invertir_parejas(equipo2, equipo1)
+        avanzar_ganador(partido)
+        return True
@@ -1,102 +1,49 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Partido, EstadisticaJugador
+"""
+Señales que mantienen `ParticipacionPartido` al día cuando cambian los
+equipos de un partido (desde el partido o desde el jugador) o su fecha y
+resultado.
+"""
 
+from django.db.models.signals import m2m_changed, post_save
 
-@receiver(post_save, sender=Partido)
-def actualizar_ranking_tras_partido(sender, instance, created, **kwargs):
-    """
-    Señal que se ejecuta cuando se guarda un Partido.
-    Actualiza las estadísticas y el ranking de los jugadores cuando el partido finaliza.
+from .models import Partido
+from .participaciones import actualizar_participaciones, sincronizar_participaciones
 
-    Prioriza el campo 'equipo_ganador' (1 o 2) para partidos por equipos.
-    Fallback: usa campo 'ganador' individual o parsea el marcador para compatibilidad.
-    """
-    # Solo procesar si el partido está finalizado
-    if instance.estado != "finalizado":
-        return
-
-    # Obtener jugadores de cada equipo
-    equipo1_jugadores = list(instance.equipo1.all())
-    equipo2_jugadores = list(instance.equipo2.all())
-
-    # Determinar ganadoresganadores = []
-    perdedores = []
-
-    # OPCIÓN 1: Usar equipo_ganador (sistema de equipos nuevo)
-    if instance.equipo_ganador:
-        if instance.equipo_ganador == 1:
-            ganadores = equipo1_jugadores
-            perdedores = equipo2_jugadores
-        elif instance.equipo_ganador == 2:
-            ganadores = equipo2_jugadores
-            perdedores = equipo1_jugadores
+# Campos de Partido copiados en las participaciones
+CAMPOS_PARTICIPACION = {"fecha", "estado", "equipo_ganador"}
 
-    # Si no pudimos determinar ganadores, salir
-    if not ganadores or not perdedores:
-        return
+ACCESO_INVERSO = {
+    Partido.equipo1.through: "partidos_equipo1",
+    Partido.equipo2.through: "partidos_equipo2",
+}
 
-    # Actualizar estadísticas para CADA jugador ganador
-    for ganador in ganadores:
-        estadistica_ganador, _ = EstadisticaJugador.objects.get_or_create(
-            jugador=ganador,
-            categoria=instance.torneo.categoria if instance.torneo else None,
-            defaults={"partidos_jugados": 0, "victorias": 0, "derrotas": 0},
-        )
-        estadistica_ganador.partidos_jugados += 1
-        estadistica_ganador.victorias += 1
-        estadistica_ganador.save()
 
-    # Actualizar estadísticas para CADA jugador perdedor
-    for perdedor in perdedores:
-        estadistica_perdedor, _ = EstadisticaJugador.objects.get_or_create(
-            jugador=perdedor,
-            categoria=instance.torneo.categoria if instance.torneo else None,
-            defaults={"partidos_jugados": 0, "victorias": 0, "derrotas": 0},
+def _equipos_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # Tras vaciar ya no se sabe de qué partidos se quitó al jugador
+        instance._partidos_vaciados = list(
+            getattr(instance, ACCESO_INVERSO[sender]).values_list("pk", flat=True)
         )
-        estadistica_perdedor.partidos_jugados += 1
-        estadistica_perdedor.derrotas += 1
-        estadistica_perdedor.save()
-
-    # Actualizar puntos de ranking usando ELO (promedio de equipo)
-    from utils.elo import calcular_probabilidad, nuevo_rating
-
-    # Calcular rating promedio de cada equipo
-    rating_ganadores = sum(
-        [g.ranking if g.ranking and g.ranking > 0 else 1200 for g in ganadores]
-    ) / len(ganadores)
-    rating_perdedores = sum(
-        [p.ranking if p.ranking and p.ranking > 0 else 1200 for p in perdedores]
-    ) / len(perdedores)
-
-    # Calcular probabilidad de victoria del equipo ganador
-    probabilidad_ganadores = calcular_probabilidad(rating_ganadores, rating_perdedores)
-
-    # Calcular nuevos ratings (S=1 para ganadores, S=0 para perdedores)
-    # K-factor 32 es estándar para amateurs/clubes
-    nuevo_rating_ganadores = nuevo_rating(
-        rating_ganadores, 1, probabilidad_ganadores, k_factor=32
-    )
-    nuevo_rating_perdedores = nuevo_rating(
-        rating_perdedores, 0, 1 - probabilidad_ganadores, k_factor=32
-    )
-
-    # Calcular delta de rating
-    delta_ganadores = nuevo_rating_ganadores - rating_ganadores
-    delta_perdedores = nuevo_rating_perdedores - rating_perdedores
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        partido_ids = [instance.pk]
+    elif action == "post_clear":
+        partido_ids = getattr(instance, "_partidos_vaciados", [])
+    else:
+        partido_ids = pk_set
+    sincronizar_participaciones(partido_ids)
+
+
+def _partido_guardado(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return  # Aún no tiene equipos
+    if update_fields is not None and not set(update_fields) & CAMPOS_PARTICIPACION:
+        return
+    actualizar_participaciones(instance)
 
-    # Aplicar delta a cada jugador del equipo ganador
-    for ganador in ganadores:
-        rating_actual = (
-            ganador.ranking if ganador.ranking and ganador.ranking > 0 else 1200
-        )
-        ganador.ranking = max(0, rating_actual + delta_ganadores)
-        ganador.save(update_fields=["ranking"])
 
-    # Aplicar delta a cada jugador del equipo perdedor
-    for perdedor in perdedores:
-        rating_actual = (
-            perdedor.ranking if perdedor.ranking and perdedor.ranking > 0 else 1200
-        )
-        perdedor.ranking = max(0, rating_actual + delta_perdedores)
-        perdedor.save(update_fields=["ranking"])
+for relacion in ACCESO_INVERSO:
+    m2m_changed.connect(_equipos_cambiados, sender=relacion)
+post_save.connect(_partido_guardado, sender=Partido)
@@ -0,0 +1,119 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from competitions.clasificacion import reconstruir_clasificacion
+from competitions.cuadros import generar_cuadro
+from competitions.models import Categoria, Clasificacion, Partido, Torneo
+from competitions.services import aplicar_resultado, corregir_resultado
+from facilities.models import Cancha
+from users.models import Usuario
+
+
+class ClasificacionTestCase(TestCase):
+    """Tests for the incrementally maintained standings"""
+
+    def setUp(self):
+        self.torneo = Torneo.objects.create(
+            nombre="Liga",
+            descripcion="",
+            categoria=Categoria.objects.create(nombre="Adulto"),
+            fecha_inicio=datetime.date(2025, 5, 1),
+            fecha_fin=datetime.date(2025, 5, 31),
+        )
+        self.a, self.b, self.c = Usuario.objects.bulk_create(
+            Usuario(cedula=f"9400000{i}", email=f"9400000{i}@example.com", es_jugador=True)
+            for i in range(3)
+        )
+
+    def jugar(self, equipo1, equipo2, ganador, marcador, dia=1):
+        partido = Partido.objects.create(
+            torneo=self.torneo,
+            fecha=datetime.date(2025, 5, dia),
+            hora=datetime.time(10, 0),
+            estado="finalizado",
+            equipo_ganador=ganador,
+            marcador=marcador,
+        )
+        partido.equipo1.set([equipo1])
+        partido.equipo2.set([equipo2])
+        aplicar_resultado(partido)
+        return partido
+
+    def tabla(self):
+        return [
+            (f.clave, f.posicion, f.jugados, f.ganados, f.sets_favor, f.games_favor, f.puntos)
+            for f in Clasificacion.objects.filter(torneo=self.torneo).order_by("posicion")
+        ]
+
+    def test_results_update_rows_incrementally(self):
+        """Test that each result updates both teams and the positions"""
+        self.jugar(self.a, self.b, 1, "6-4, 6-2")
+        self.jugar(self.b, self.c, 1, "6-0, 6-0", dia=2)
+        self.assertEqual(
+            self.tabla(),
+            [
+                (str(self.a.pk), 1, 1, 1, 2, 12, 3),
+                (str(self.b.pk), 2, 2, 1, 2, 18, 3),
+                (str(self.c.pk), 3, 1, 0, 0, 0, 0),
+            ],
+        )
+
+    def test_head_to_head_breaks_ties(self):
+        """Test that head-to-head beats set difference among tied teams"""
+        self.jugar(self.a, self.b, 1, "7-6, 7-6")
+        self.jugar(self.b, self.c, 1, "6-0, 6-0", dia=2)
+        self.jugar(self.c, self.a, 1, "6-0, 6-0", dia=3)
+        # Triple empate en puntos y en enfrentamientos: decide la diferencia de sets
+        self.assertEqual([f[0] for f in self.tabla()], [str(self.b.pk), str(self.c.pk), str(self.a.pk)])
+
+        Clasificacion.objects.filter(torneo=self.torneo).delete()
+        self.jugar(self.a, self.b, 1, "2-1", dia=4)
+        self.jugar(self.b, self.c, 1, "6-0, 6-0", dia=5)
+        # a y b empatan en puntos y sets; b tiene más games pero a ganó el directo
+        self.assertEqual([f[0] for f in self.tabla()][:2], [str(self.a.pk), str(self.b.pk)])
+
+    def test_correction_replaces_previous_result(self):
+        """Test that a correction subtracts the old result and matches a rebuild"""
+        partido = self.jugar(self.a, self.b, 1, "6-4, 6-4")
+        self.jugar(self.a, self.c, 2, "6-3, 6-3", dia=2)
+
+        partido.equipo_ganador = 2
+        partido.marcador = "4-6, 4-6"
+        partido.save()
+        corregir_resultado(partido, anterior=(1, "6-4, 6-4"))
+        corregida = self.tabla()
+        self.assertEqual(corregida[-1], (str(self.a.pk), 3, 2, 0, 0, 14, 0))
+
+        reconstruir_clasificacion(self.torneo)
+        self.assertEqual(self.tabla(), corregida)
+        call_command("recalcular_clasificacion", stdout=StringIO())
+        self.assertEqual(self.tabla(), corregida)
+
+    def test_team_rows_in_another_group(self):
+        """Test that a result counts when team rows live in other groups than the match"""
+        Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        # Partido suelto antes del cuadro: a y b quedan en el grupo ""
+        self.jugar(self.a, self.b, 1, "6-4, 6-4")
+        self.torneo.jugadores_inscritos.add(self.a, self.b, self.c)
+        generar_cuadro(self.torneo, "todos_contra_todos", jugadores_por_equipo=1)
+        grupos = dict(Clasificacion.objects.filter(torneo=self.torneo).values_list("clave", "grupo"))
+        self.assertEqual(grupos, {str(self.a.pk): "", str(self.b.pk): "", str(self.c.pk): "A"})
+
+        # Partido suelto con un equipo del cuadro: filas en "" y en "A"
+        self.jugar(self.c, self.a, 1, "6-0, 6-0", dia=2)
+        filas = {f.clave: f for f in Clasificacion.objects.filter(torneo=self.torneo)}
+        self.assertEqual((filas[str(self.c.pk)].jugados, filas[str(self.c.pk)].ganados), (1, 1))
+        self.assertEqual((filas[str(self.a.pk)].jugados, filas[str(self.a.pk)].ganados), (2, 1))
+        self.assertEqual(filas[str(self.c.pk)].posicion, 1)
+        self.assertEqual([filas[str(j.pk)].posicion for j in (self.a, self.b)], [1, 2])
+
+    def test_standings_view(self):
+        """Test that the public standings page is served from the table"""
+        self.jugar(self.a, self.b, 1, "6-4, 6-2")
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/torneos/{self.torneo.pk}/clasificacion/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "12-6")
@@ -0,0 +1,207 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from competitions.cuadros import generar_cuadro, orden_siembra
+from competitions.models import Categoria, Clasificacion, Partido, Torneo
+from competitions.services import aplicar_resultado, corregir_resultado
+from facilities.models import Cancha
+from users.models import Usuario
+
+
+def crear_inscritos(torneo, cantidad):
+    """Players ranked from best (index 0) to worst"""
+    jugadores = Usuario.objects.bulk_create(
+        Usuario(
+            cedula=f"9300{i:04d}",
+            email=f"9300{i:04d}@example.com",
+            es_jugador=True,
+            ranking=2000 - 10 * i,
+        )
+        for i in range(cantidad)
+    )
+    torneo.jugadores_inscritos.add(*jugadores)
+    return [j.pk for j in jugadores]
+
+
+def equipos(partido):
+    return (
+        sorted(partido.equipo1.values_list("pk", flat=True)),
+        sorted(partido.equipo2.values_list("pk", flat=True)),
+    )
+
+
+class CuadroTorneoTestCase(TestCase):
+    """Tests for bracket and round-robin generation"""
+
+    def setUp(self):
+        self.fecha = datetime.date(2099, 1, 5)
+        self.torneo = Torneo.objects.create(
+            nombre="Apertura",
+            descripcion="",
+            categoria=Categoria.objects.create(nombre="Adulto"),
+            fecha_inicio=self.fecha,
+            fecha_fin=self.fecha + datetime.timedelta(days=2),
+        )
+        self.cancha = Cancha.objects.create(
+            nombre="Central",
+            ubicacion="A",
+            estado="disponible",
+            horario_apertura=datetime.time(8, 0),
+            horario_cierre=datetime.time(20, 0),
+        )
+
+    def partido(self, fase, ronda, posicion):
+        return Partido.objects.get(torneo=self.torneo, fase=fase, ronda=ronda, posicion=posicion)
+
+    def ganar(self, partido, equipo_ganador, corregir=False, marcador=""):
+        partido.estado = "finalizado"
+        partido.equipo_ganador = equipo_ganador
+        partido.marcador = marcador
+        partido.save()
+        (corregir_resultado if corregir else aplicar_resultado)(partido)
+
+    def test_seeding_order(self):
+        """Test that top seeds are spread so they can only meet late"""
+        self.assertEqual(orden_siembra(2), [1, 2])
+        self.assertEqual(orden_siembra(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_single_elimination_with_byes(self):
+        """Test that the best seeds skip round one when teams are not a power of 2"""
+        j = crear_inscritos(self.torneo, 6)
+        partidos = generar_cuadro(self.torneo, "eliminacion", jugadores_por_equipo=1)
+
+        self.assertEqual(len(partidos), 5)
+        self.assertEqual(Partido.objects.filter(torneo=self.torneo, ronda=1).count(), 2)
+        # Semilla 1 pasa directo a la semifinal; 4 y 5 juegan la primera ronda
+        self.assertEqual(equipos(self.partido("eliminacion", 2, 0)), ([j[0]], []))
+        primera = self.partido("eliminacion", 1, 1)
+        self.assertEqual(equipos(primera), ([j[3]], [j[4]]))
+        self.assertEqual(primera.cancha, self.cancha)
+        self.assertEqual(
+            (primera.siguiente_partido, primera.siguiente_equipo),
+            (self.partido("eliminacion", 2, 0), 2),
+        )
+        self.torneo.refresh_from_db()
+        self.assertEqual(self.torneo.formato, "eliminacion")
+
+        with self.assertRaises(ValueError):
+            generar_cuadro(self.torneo, "eliminacion", jugadores_por_equipo=1)
+
+    def test_winners_advance_and_are_scheduled(self):
+        """Test that results fill and schedule the next match, and corrections replace the winner"""
+        j = crear_inscritos(self.torneo, 4)
+        generar_cuadro(self.torneo, "eliminacion", jugadores_por_equipo=1)
+        final = self.partido("eliminacion", 2, 0)
+        self.assertIsNone(final.cancha)
+        self.assertEqual(final.estado, "por_programar")
+
+        self.ganar(self.partido("eliminacion", 1, 0), 1)
+        final.refresh_from_db()
+        self.assertEqual(equipos(final), ([j[0]], []))
+        self.assertIsNone(final.cancha)
+
+        self.ganar(self.partido("eliminacion", 1, 1), 2)
+        final.refresh_from_db()
+        self.assertEqual(equipos(final), ([j[0]], [j[2]]))
+        # Después del segundo semifinal (10:00-12:00) y del descanso
+        self.assertEqual((final.cancha, final.fecha), (self.cancha, self.fecha))
+        self.assertEqual(final.hora, datetime.time(14, 0))
+        self.assertEqual(final.estado, "pendiente")
+
+        self.ganar(self.partido("eliminacion", 1, 0), 2, corregir=True)
+        self.assertEqual(equipos(final), ([j[3]], [j[2]]))
+
+    def test_unscheduled_matches_stay_out_of_listings(self):
+        """Test that knockout placeholders are not listed as if played at midnight"""
+        crear_inscritos(self.torneo, 4)
+        generar_cuadro(self.torneo, "eliminacion", jugadores_por_equipo=1)
+        final = self.partido("eliminacion", 2, 0)
+
+        listados = [
+            self.client.get(reverse("core:public_match_list")).context["partidos"],
+            self.client.get(reverse("core:home")).context["partidos"],
+        ]
+        admin = Usuario.objects.create(cedula="93100000", email="a@example.com", es_admin_aso=True)
+        self.client.force_login(admin)
+        url = reverse("core:admin_partidos_list")
+        listados.append(self.client.get(url).context["partidos"])
+        for partidos in listados:
+            self.assertNotIn(final, list(partidos))
+        self.assertIn(final, list(self.client.get(url, {"estado": "por_programar"}).context["partidos"]))
+
+    def test_round_robin(self):
+        """Test that every team plays every other team once, once per round"""
+        crear_inscritos(self.torneo, 10)
+        partidos = generar_cuadro(self.torneo, "todos_contra_todos")
+
+        self.assertEqual(len(partidos), 10)
+        parejas = {frozenset(map(tuple, equipos(p))) for p in Partido.objects.all()}
+        self.assertEqual(len(parejas), 10)
+        for ronda in range(1, 6):
+            jugadores = [
+                j
+                for p in Partido.objects.filter(ronda=ronda)
+                for equipo in equipos(p)
+                for j in equipo
+            ]
+            self.assertEqual(len(jugadores), len(set(jugadores)))
+
+    def test_groups_fill_the_knockout(self):
+        """Test that group winners and runners-up are seeded when the group stage ends"""
+        j = crear_inscritos(self.torneo, 8)
+        generar_cuadro(
+            self.torneo, "grupos_eliminacion", jugadores_por_equipo=1, grupos=2
+        )
+        grupos = Partido.objects.filter(torneo=self.torneo, fase="grupos")
+        self.assertEqual(grupos.count(), 12)
+        self.assertEqual(Partido.objects.filter(fase="eliminacion").count(), 3)
+
+        # Siempre gana el mejor sembrado: A = semillas 1, 4, 5, 8; B = 2, 3, 6, 7
+        for partido in grupos.order_by("pk"):
+            equipo1, equipo2 = equipos(partido)
+            self.ganar(partido, 1 if j.index(equipo1[0]) < j.index(equipo2[0]) else 2)
+
+        self.assertEqual(equipos(self.partido("eliminacion", 1, 0)), ([j[0]], [j[2]]))
+        self.assertEqual(equipos(self.partido("eliminacion", 1, 1)), ([j[1]], [j[3]]))
+        self.assertIsNotNone(self.partido("eliminacion", 1, 0).cancha)
+
+    def test_knockout_follows_the_standings_table(self):
+        """Test that the knockout is seeded from Clasificacion.posicion, tie-breakers included"""
+        j = crear_inscritos(self.torneo, 8)
+        generar_cuadro(
+            self.torneo, "grupos_eliminacion", jugadores_por_equipo=1, grupos=2
+        )
+        tabla = Clasificacion.objects.filter(torneo=self.torneo, grupo="A").order_by("posicion")
+        self.assertEqual([f.clave for f in tabla], [str(j[i]) for i in (0, 3, 4, 7)])
+
+        # En A, 4, 5 y 8 empatan a una victoria; desempata la diferencia de
+        # games: 8 (-2) queda segundo por delante de 4 y 5
+        resultados = {
+            (j[3], j[7]): "7-6, 7-6",
+            (j[4], j[3]): "6-4, 6-4",
+            (j[7], j[4]): "6-0, 6-0",
+        }
+        for partido in Partido.objects.filter(torneo=self.torneo, fase="grupos").order_by("pk"):
+            equipo1, equipo2 = equipos(partido)
+            par = (equipo1[0], equipo2[0])
+            if par in resultados:
+                self.ganar(partido, 1, marcador=resultados[par])
+            elif par[::-1] in resultados:
+                self.ganar(partido, 2, marcador=resultados[par[::-1]])
+            else:
+                ganador = 1 if j.index(par[0]) < j.index(par[1]) else 2
+                self.ganar(partido, ganador, marcador="6-0, 6-0")
+
+        self.assertEqual(equipos(self.partido("eliminacion", 1, 0)), ([j[0]], [j[2]]))
+        self.assertEqual(equipos(self.partido("eliminacion", 1, 1)), ([j[1]], [j[7]]))
+
+    def test_command(self):
+        """Test that the management command generates the bracket"""
+        crear_inscritos(self.torneo, 8)
+        salida = StringIO()
+        call_command("generar_cuadro", self.torneo.pk, "eliminacion", stdout=salida)
+        self.assertIn("✓ 3 partidos creados (2 programados)", salida.getvalue())
@@ -0,0 +1,97 @@
+import datetime
+
+from django.test import TestCase
+
+from competitions.marcador import parsear_marcador, parsear_sets, totales_jugador
+from competitions.models import Partido, SetPartido
+from competitions.services import aplicar_resultado, corregir_resultado
+from users.models import Usuario
+
+
+class ParsearMarcadorTestCase(TestCase):
+    """Tests for the score string parser"""
+
+    def test_sets_and_set_counts(self):
+        """Test that set scores and simple set counts are both understood"""
+        self.assertEqual(parsear_marcador("6-4, 3-6, 7-5"), (2, 1, 16, 15))
+        self.assertEqual(parsear_marcador("2-1"), (2, 1, 0, 0))
+        self.assertEqual(parsear_marcador("6-4"), (1, 0, 6, 4))
+        self.assertIsNone(parsear_marcador(""))
+
+    def test_winner_first_scores_are_flipped(self):
+        """Test that a score contradicting the winner is read from the winner"""
+        self.assertEqual(parsear_marcador("6-4, 6-3", equipo_ganador=2), (0, 2, 7, 12))
+        self.assertEqual(parsear_marcador("2-0", equipo_ganador=2), (0, 2, 0, 0))
+
+    def test_tiebreaks(self):
+        """Test that the loser's tie-break points give both tie-break scores"""
+        self.assertEqual(
+            parsear_sets("7-6(5), 6-7(10)"), [(7, 6, 7, 5), (6, 7, 10, 12)]
+        )
+        self.assertEqual(parsear_sets("2-1"), [])
+
+
+class SetPartidoTestCase(TestCase):
+    """Tests for the normalized per-set scores"""
+
+    def setUp(self):
+        self.a, self.b = Usuario.objects.bulk_create(
+            Usuario(cedula=f"9500000{i}", email=f"9500000{i}@example.com", es_jugador=True)
+            for i in range(2)
+        )
+
+    def jugar(self, ganador, marcador):
+        partido = Partido.objects.create(
+            fecha=datetime.date(2025, 5, 1),
+            hora=datetime.time(10, 0),
+            estado="finalizado",
+            equipo_ganador=ganador,
+            marcador=marcador,
+        )
+        partido.equipo1.set([self.a])
+        partido.equipo2.set([self.b])
+        aplicar_resultado(partido)
+        return partido
+
+    def test_sets_are_stored_and_corrected(self):
+        """Test that results fill SetPartido and corrections replace the rows"""
+        partido = self.jugar(1, "6-4, 7-6(3)")
+        self.assertEqual(
+            list(partido.sets.values_list("numero", "games_equipo1", "games_equipo2", "tiebreak_equipo1")),
+            [(1, 6, 4, None), (2, 7, 6, 7)],
+        )
+
+        partido.marcador = "4-6, 6-4, 6-2"
+        partido.save()
+        corregir_resultado(partido, anterior=(1, "6-4, 7-6(3)"))
+        self.assertEqual(partido.sets.count(), 3)
+
+    def test_player_totals_are_aggregated_in_sql(self):
+        """Test that games, sets and tie-breaks are summed per player"""
+        self.jugar(1, "6-4, 7-6(3)")
+        self.jugar(2, "6-3, 6-2")
+        with self.assertNumQueries(1):
+            totales = totales_jugador(self.a)
+        self.assertEqual(
+            totales,
+            {
+                "sets_ganados": 2,
+                "sets_perdidos": 2,
+                "games_favor": 18,
+                "games_contra": 22,
+                "tiebreaks_ganados": 1,
+                "tiebreaks_perdidos": 0,
+            },
+        )
+        self.assertEqual(
+            totales_jugador(self.b),
+            {
+                "sets_ganados": 2,
+                "sets_perdidos": 2,
+                "games_favor": 22,
+                "games_contra": 18,
+                "tiebreaks_ganados": 0,
+                "tiebreaks_perdidos": 1,
+            },
+        )
+        self.assertEqual(SetPartido.objects.count(), 4)
@@ -0,0 +1,116 @@
+import datetime
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from competitions.models import EstadisticaEnfrentamiento, EstadisticaPareja, Partido
+from competitions.parejas import comparar_jugadores
+from competitions.services import aplicar_resultado, corregir_resultado
+from users.models import Usuario
+
+
+class EstadisticasParejaTestCase(TestCase):
+    """Tests for the precomputed partner and opponent statistics"""
+
+    def setUp(self):
+        self.a, self.b, self.c, self.d = Usuario.objects.bulk_create(
+            Usuario(cedula=f"9700000{i}", email=f"9700000{i}@example.com", es_jugador=True)
+            for i in range(4)
+        )
+
+    def jugar(self, equipo1, equipo2, ganador, dia=1):
+        partido = Partido.objects.create(
+            fecha=datetime.date(2025, 6, dia),
+            hora=datetime.time(10, 0),
+            estado="finalizado",
+            equipo_ganador=ganador,
+            marcador="6-4, 6-4",
+        )
+        partido.equipo1.set(equipo1)
+        partido.equipo2.set(equipo2)
+        aplicar_resultado(partido)
+        return partido
+
+    def pareja(self, jugador, companero):
+        return EstadisticaPareja.objects.values_list(
+            "partidos_jugados", "victorias", "derrotas"
+        ).get(jugador=jugador, companero=companero)
+
+    def enfrentamiento(self, jugador, rival):
+        return EstadisticaEnfrentamiento.objects.values_list(
+            "partidos_jugados", "victorias", "derrotas"
+        ).get(jugador=jugador, rival=rival)
+
+    def test_results_update_both_directions(self):
+        """Test that each result counts for partners and opponents both ways"""
+        self.jugar([self.a, self.b], [self.c, self.d], ganador=1)
+        self.jugar([self.a, self.b], [self.c, self.d], ganador=2, dia=2)
+        self.jugar([self.a, self.c], [self.b, self.d], ganador=1, dia=3)
+
+        self.assertEqual(self.pareja(self.a, self.b), (2, 1, 1))
+        self.assertEqual(self.pareja(self.b, self.a), (2, 1, 1))
+        self.assertEqual(self.pareja(self.a, self.c), (1, 1, 0))
+        self.assertEqual(self.enfrentamiento(self.a, self.d), (3, 2, 1))
+        self.assertEqual(self.enfrentamiento(self.d, self.a), (3, 1, 2))
+        self.assertEqual(self.enfrentamiento(self.b, self.a), (1, 0, 1))
+        self.assertEqual(EstadisticaPareja.objects.count(), 8)
+        self.assertEqual(EstadisticaEnfrentamiento.objects.count(), 12)
+
+    def test_winner_correction_swaps_results(self):
+        """Test that changing the winner moves the victory to the other team"""
+        partido = self.jugar([self.a, self.b], [self.c, self.d], ganador=1)
+        partido.equipo_ganador = 2
+        partido.save()
+        corregir_resultado(partido, anterior=(1, "6-4, 6-4"))
+
+        self.assertEqual(self.pareja(self.a, self.b), (1, 0, 1))
+        self.assertEqual(self.pareja(self.c, self.d), (1, 1, 0))
+        self.assertEqual(self.enfrentamiento(self.c, self.a), (1, 1, 0))
+
+    def test_rebuild_matches_incremental_totals(self):
+        """Test that the rebuild command reproduces the incremental rows"""
+        self.jugar([self.a, self.b], [self.c, self.d], ganador=1)
+        self.jugar([self.a, self.c], [self.b, self.d], ganador=2, dia=2)
+        antes = sorted(
+            EstadisticaEnfrentamiento.objects.values_list(
+                "jugador_id", "rival_id", "partidos_jugados", "victorias", "derrotas"
+            )
+        )
+        EstadisticaPareja.objects.all().delete()
+        call_command("recalcular_parejas", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(self.pareja(self.b, self.d), (1, 1, 0))
+        self.assertEqual(
+            sorted(
+                EstadisticaEnfrentamiento.objects.values_list(
+                    "jugador_id", "rival_id", "partidos_jugados", "victorias", "derrotas"
+                )
+            ),
+            antes,
+        )
+
+    def test_compare_api_and_profile(self):
+        """Test that the comparison API and the profile read the rollups"""
+        self.jugar([self.a, self.b], [self.c, self.d], ganador=1)
+        self.client.force_login(self.a)
+
+        with self.assertNumQueries(2):
+            comparar_jugadores(self.a.pk, self.c.pk)
+        response = self.client.get(f"/api/jugadores/{self.a.pk}/comparar/{self.c.pk}/")
+        self.assertEqual(
+            response.json(),
+            {
+                "jugador": self.a.pk,
+                "otro": self.c.pk,
+                "como_pareja": {"partidos_jugados": 0, "victorias": 0, "derrotas": 0},
+                "enfrentamientos": {"partidos_jugados": 1, "victorias": 1, "derrotas": 0},
+            },
+        )
+        response = self.client.get(f"/api/jugadores/{self.a.pk}/comparar/{self.a.pk}/")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(f"/jugador/{self.a.pk}/")
+        self.assertEqual(
+            [p.companero_id for p in response.context["mejores_companeros"]], [self.b.pk]
+        )
+        self.assertEqual(len(response.context["rivalidades"]), 2)
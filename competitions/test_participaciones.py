@@ -0,0 +1,88 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from competitions.models import ParticipacionPartido, Partido
+from users.models import Usuario
+
+
+class ParticipacionPartidoTestCase(TestCase):
+    """Tests for the denormalized match participant table"""
+
+    def setUp(self):
+        self.a, self.b, self.c = Usuario.objects.bulk_create(
+            Usuario(cedula=f"9600000{i}", email=f"9600000{i}@example.com", es_jugador=True)
+            for i in range(3)
+        )
+        self.partido = Partido.objects.create(
+            fecha=datetime.date(2025, 5, 1), hora=datetime.time(10, 0)
+        )
+
+    def filas(self):
+        return sorted(
+            ParticipacionPartido.objects.filter(partido=self.partido).values_list(
+                "jugador_id", "equipo", "resultado", "fecha"
+            )
+        )
+
+    def test_team_changes_are_synced(self):
+        """Test that adding, removing and clearing team members keeps rows in sync"""
+        self.partido.equipo1.set([self.a])
+        self.partido.equipo2.add(self.b)
+        fecha = self.partido.fecha
+        self.assertEqual(
+            self.filas(), [(self.a.pk, 1, "pendiente", fecha), (self.b.pk, 2, "pendiente", fecha)]
+        )
+
+        # Desde el lado del jugador
+        self.b.partidos_equipo2.clear()
+        self.c.partidos_equipo2.add(self.partido)
+        self.assertEqual(
+            self.filas(), [(self.a.pk, 1, "pendiente", fecha), (self.c.pk, 2, "pendiente", fecha)]
+        )
+
+        self.partido.equipo1.clear()
+        self.assertEqual(self.filas(), [(self.c.pk, 2, "pendiente", fecha)])
+
+    def test_results_and_dates_are_copied(self):
+        """Test that saving a result or moving the match updates the rows"""
+        self.partido.equipo1.set([self.a])
+        self.partido.equipo2.set([self.b])
+
+        self.partido.fecha = datetime.date(2025, 5, 3)
+        self.partido.estado = "finalizado"
+        self.partido.equipo_ganador = 2
+        self.partido.save()
+        self.assertEqual(
+            self.filas(),
+            [
+                (self.a.pk, 1, "derrota", datetime.date(2025, 5, 3)),
+                (self.b.pk, 2, "victoria", datetime.date(2025, 5, 3)),
+            ],
+        )
+
+    def test_profile_history_does_not_query_per_match(self):
+        """Test that the public profile renders results without per-row team lookups"""
+
+        def consultas():
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.get(f"/jugador/{self.a.pk}/")
+            self.assertEqual(response.status_code, 200)
+            return len(capturadas)
+
+        self.partido.equipo1.set([self.a])
+        self.partido.estado = "finalizado"
+        self.partido.equipo_ganador = 1
+        self.partido.save()
+        con_uno = consultas()
+        for dia in range(2, 7):
+            partido = Partido.objects.create(
+                fecha=datetime.date(2025, 5, dia),
+                hora=datetime.time(10, 0),
+                estado="finalizado",
+                equipo_ganador=2,
+            )
+            partido.equipo1.set([self.a])
+        self.assertEqual(consultas(), con_uno)
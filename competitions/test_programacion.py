@@ -0,0 +1,194 @@
+import datetime
+import json
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from competitions.models import Categoria, Partido, Torneo
+from competitions.programacion import planificar_partidos, programar_torneo
+from facilities.models import Cancha, ReservaCancha
+from facilities.ocupacion import mascara, obtener_slots
+from users.models import Usuario
+
+
+def hora(texto):
+    return datetime.datetime.strptime(texto, "%H:%M").time()
+
+
+def crear_jugadores(prefijo, cantidad):
+    return [
+        u.pk
+        for u in Usuario.objects.bulk_create(
+            Usuario(
+                cedula=f"{prefijo}{i:04d}",
+                email=f"{prefijo}{i:04d}@example.com",
+                es_jugador=True,
+            )
+            for i in range(cantidad)
+        )
+    ]
+
+
+class ProgramacionTorneoTestCase(TestCase):
+    """Tests for the automatic tournament match scheduler"""
+
+    def setUp(self):
+        self.ahora = timezone.make_aware(datetime.datetime(2025, 6, 1, 7, 0))
+        self.fecha = datetime.date(2025, 6, 2)
+        categoria = Categoria.objects.create(nombre="Adulto")
+        self.torneo = Torneo.objects.create(
+            nombre="Apertura",
+            descripcion="",
+            categoria=categoria,
+            fecha_inicio=self.fecha,
+            fecha_fin=self.fecha + datetime.timedelta(days=6),
+        )
+        self.jugadores = crear_jugadores("9100", 8)
+        self.cancha = Cancha.objects.create(
+            nombre="Central",
+            ubicacion="A",
+            estado="disponible",
+            horario_apertura=hora("08:00"),
+            horario_cierre=hora("14:00"),
+        )
+
+    def planificar(self, emparejamientos, **opciones):
+        opciones.setdefault("ahora", self.ahora)
+        return planificar_partidos(
+            self.torneo, emparejamientos, self.fecha, self.fecha, **opciones
+        )
+
+    def horarios(self, programacion):
+        return [(p.cancha_id, p.hora.strftime("%H:%M")) for p in programacion.partidos]
+
+    def test_existing_bookings_and_opening_hours(self):
+        """Test that reservations are skipped and no match ends after closing"""
+        ReservaCancha.objects.create(
+            cancha=self.cancha,
+            jugador_id=self.jugadores[7],
+            fecha=self.fecha,
+            hora_inicio=hora("08:00"),
+            hora_fin=hora("09:00"),
+            estado="confirmada",
+        )
+        j = self.jugadores
+        programacion = self.planificar(
+            [([j[0]], [j[1]]), ([j[2]], [j[3]]), ([j[4]], [j[5]])]
+        )
+        self.assertEqual(
+            self.horarios(programacion),
+            [(self.cancha.pk, "10:00"), (self.cancha.pk, "12:00")],
+        )
+        self.assertEqual(programacion.sin_programar, [([j[4]], [j[5]])])
+
+    def test_players_are_not_double_booked_and_rest(self):
+        """Test that a player's second match waits for the rest time"""
+        otra = Cancha.objects.create(
+            nombre="Norte",
+            ubicacion="B",
+            estado="disponible",
+            horario_apertura=hora("08:00"),
+            horario_cierre=hora("22:00"),
+        )
+        j = self.jugadores
+        programacion = self.planificar(
+            [([j[0], j[1]], [j[2], j[3]]), ([j[0], j[4]], [j[5], j[6]])],
+            descanso=60,
+            paso=30,
+        )
+        self.assertEqual(
+            self.horarios(programacion),
+            [(self.cancha.pk, "08:00"), (self.cancha.pk, "11:00")],
+        )
+
+        programacion = self.planificar(
+            [([j[0], j[1]], [j[2], j[3]]), ([j[4], j[5]], [j[6], j[7]])]
+        )
+        self.assertEqual(
+            self.horarios(programacion), [(self.cancha.pk, "08:00"), (otra.pk, "08:00")]
+        )
+
+    def test_existing_player_matches_are_respected(self):
+        """Test that a player already playing elsewhere is not scheduled then"""
+        j = self.jugadores
+        partido = Partido.objects.create(fecha=self.fecha, hora=hora("08:00"))
+        partido.equipo1.add(j[0])
+        programacion = self.planificar([([j[0]], [j[1]])], descanso=0)
+        self.assertEqual(self.horarios(programacion), [(self.cancha.pk, "10:00")])
+
+    def test_schedule_is_bulk_written(self):
+        """Test that matches, teams and the occupancy index are written at once"""
+        j = self.jugadores
+        with self.captureOnCommitCallbacks(execute=True):
+            programacion = programar_torneo(
+                self.torneo,
+                [([j[0], j[1]], [j[2], j[3]]), ([j[4], j[5]], [j[6], j[7]])],
+                self.fecha,
+                self.fecha,
+                ahora=self.ahora,
+            )
+        partidos = list(Partido.objects.filter(torneo=self.torneo).order_by("hora"))
+        self.assertEqual(len(partidos), 2)
+        self.assertEqual(sorted(partidos[0].equipo1.values_list("pk", flat=True)), j[:2])
+        self.assertEqual(
+            sorted(partidos[1].participaciones.values_list("jugador_id", "equipo")),
+            [(j[4], 1), (j[5], 1), (j[6], 2), (j[7], 2)],
+        )
+        self.assertEqual(partidos[1].fin, programacion.partidos[1].fin)
+        self.assertEqual(
+            obtener_slots(self.cancha.pk, self.fecha), mascara(hora("08:00"), hora("12:00"))
+        )
+        self.assertEqual(Cancha.objects.get(pk=self.cancha.pk).version, 1)
+
+    def test_invalid_pairings(self):
+        """Test that unbalanced teams and repeated players are rejected"""
+        j = self.jugadores
+        with self.assertRaises(ValueError):
+            self.planificar([([j[0], j[1]], [j[2]])])
+        with self.assertRaises(ValueError):
+            self.planificar([([j[0]], [j[0]])])
+
+    def test_large_tournament_is_fast(self):
+        """Test that 200+ matches on 5 courts are scheduled in seconds"""
+        for i in range(4):
+            Cancha.objects.create(nombre=f"Cancha {i}", ubicacion="C", estado="disponible")
+        jugadores = crear_jugadores("9200", 64)
+        emparejamientos = [
+            ([jugadores[(r + k) % 64]], [jugadores[(r + k + 32) % 64]])
+            for r in range(7)
+            for k in range(32)
+        ]
+        inicio = time.perf_counter()
+        programacion = planificar_partidos(
+            self.torneo,
+            emparejamientos,
+            self.fecha,
+            self.fecha + datetime.timedelta(days=13),
+            ahora=self.ahora,
+        )
+        self.assertLess(time.perf_counter() - inicio, 5)
+        self.assertEqual(len(programacion.partidos), 224)
+        self.assertEqual(programacion.sin_programar, [])
+
+    def test_command_simulation_writes_nothing(self):
+        """Test that the management command can preview a schedule"""
+        j = self.jugadores
+        salida = StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as archivo:
+            json.dump([[[j[0]], [j[1]]]], archivo)
+            archivo.flush()
+            call_command(
+                "programar_torneo",
+                self.torneo.pk,
+                archivo.name,
+                "--desde=2099-01-05",
+                "--hasta=2099-01-05",
+                "--simular",
+                stdout=salida,
+            )
+        self.assertIn("2099-01-05 08:00", salida.getvalue())
+        self.assertFalse(Partido.objects.exists())
@@ -0,0 +1,446 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from competitions.models import (
+    Categoria,
+    EstadisticaJugador,
+    Partido,
+    RatingCheckpoint,
+    RatingEvent,
+    Torneo,
+)
+from competitions.ranking import (
+    calcular_deltas,
+    iterar_partidos_finalizados,
+    leaderboard,
+    leaderboard_a_fecha,
+    posicion_en_leaderboard,
+)
+from competitions.services import (
+    aplicar_resultado as registrar_resultado,
+    corregir_resultado,
+)
+from users.models import Usuario
+
+
+def crear_jugador(cedula, ranking=0):
+    return Usuario.objects.create_user(
+        cedula=cedula,
+        password="testpass123",
+        email=f"{cedula}@test.com",
+        first_name="Jugador",
+        last_name=cedula,
+        es_jugador=True,
+        ranking=ranking,
+    )
+
+
+def crear_partido(equipo1, equipo2, ganador, fecha, hora="10:00", torneo=None):
+    partido = Partido.objects.create(
+        torneo=torneo,
+        fecha=fecha,
+        hora=hora,
+        estado="finalizado",
+        equipo_ganador=ganador,
+    )
+    partido.equipo1.set(equipo1)
+    partido.equipo2.set(equipo2)
+    return partido
+
+
+class CalcularDeltasTestCase(TestCase):
+    """Tests for the team ELO delta helper"""
+
+    def test_equal_ratings_split_k_factor(self):
+        """Test that equal teams exchange half the K-factor"""
+        delta_ganadores, delta_perdedores = calcular_deltas([1200, 1200], [1200, 1200])
+        self.assertEqual(delta_ganadores, 16)
+        self.assertEqual(delta_perdedores, -16)
+
+    def test_unranked_players_start_at_initial_rating(self):
+        """Test that players with ranking 0 are treated as 1200"""
+        self.assertEqual(calcular_deltas([0], [None]), calcular_deltas([1200], [1200]))
+
+
+class RecalculateStatsTestCase(TestCase):
+    """Tests for the bulk recalculate_stats command"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Adulto")
+        self.torneo = Torneo.objects.create(
+            nombre="Torneo Apertura",
+            descripcion="Torneo de prueba",
+            fecha_inicio=datetime.date(2025, 1, 1),
+            fecha_fin=datetime.date(2025, 12, 31),
+            categoria=self.categoria,
+        )
+        self.a = crear_jugador("10000001", ranking=999)
+        self.b = crear_jugador("10000002")
+        self.c = crear_jugador("10000003")
+        self.d = crear_jugador("10000004")
+        self.idle = crear_jugador("10000005", ranking=500)
+
+    def run_command(self):
+        out = StringIO()
+        call_command("recalculate_stats", stdout=out)
+        return out.getvalue()
+
+    def test_matches_are_streamed_in_chronological_order(self):
+        """Test that finalized matches are yielded ordered with both teams"""
+        tarde = crear_partido([self.c], [self.d], 2, datetime.date(2025, 2, 1))
+        temprano = crear_partido(
+            [self.a, self.b], [self.c, self.d], 1, datetime.date(2025, 1, 1)
+        )
+        Partido.objects.create(fecha=datetime.date(2025, 1, 2), hora="10:00")
+
+        partidos = list(iterar_partidos_finalizados())
+
+        self.assertEqual([p[0] for p in partidos], [temprano.id, tarde.id])
+        self.assertCountEqual(partidos[0][5], [self.a.id, self.b.id])
+        self.assertCountEqual(partidos[0][6], [self.c.id, self.d.id])
+
+    def test_replay_uses_elo_and_resets_previous_values(self):
+        """Test that the replay applies real ELO from scratch"""
+        crear_partido(
+            [self.a, self.b],
+            [self.c, self.d],
+            1,
+            datetime.date(2025, 1, 1),
+            torneo=self.torneo,
+        )
+        crear_partido([self.a], [self.c], 2, datetime.date(2025, 1, 8))
+        EstadisticaJugador.objects.create(jugador=self.d, victorias=50)
+
+        output = self.run_command()
+
+        for jugador in (self.a, self.b, self.c, self.d, self.idle):
+            jugador.refresh_from_db()
+        # Partido 1: 1200 vs 1200 -> +16/-16
+        self.assertEqual(self.b.ranking, 1216)
+        self.assertEqual(self.d.ranking, 1184)
+        # Partido 2: 1216 (A) pierde contra 1184 (C)
+        delta_c, delta_a = calcular_deltas([1184], [1216])
+        self.assertEqual(self.a.ranking, 1216 + delta_a)
+        self.assertEqual(self.c.ranking, 1184 + delta_c)
+        self.assertEqual(self.idle.ranking, 0)
+
+        stat_a = EstadisticaJugador.objects.get(jugador=self.a, categoria=self.categoria)
+        self.assertEqual((stat_a.partidos_jugados, stat_a.victorias), (1, 1))
+        stat_c = EstadisticaJugador.objects.get(jugador=self.c, categoria=None)
+        self.assertEqual((stat_c.partidos_jugados, stat_c.victorias), (1, 1))
+        self.assertFalse(EstadisticaJugador.objects.filter(victorias=50).exists())
+        self.assertIn("partidos/s", output)
+
+    def test_replay_issues_constant_number_of_queries(self):
+        """Test that the replay does not issue queries per match"""
+        for dia in range(1, 21):
+            crear_partido(
+                [self.a, self.b], [self.c, self.d], 1 + dia % 2, datetime.date(2025, 1, dia)
+            )
+
+        with self.assertNumQueries(11):
+            self.run_command()
+
+    def test_replay_writes_history_and_checkpoints(self):
+        """Test that the replay records one event per player and periodic checkpoints"""
+        for dia in range(1, 6):
+            crear_partido([self.a], [self.b], 1, datetime.date(2025, 1, dia))
+
+        with mock.patch("competitions.ranking.CHECKPOINT_CADA", 2):
+            self.run_command()
+
+        self.assertEqual(RatingEvent.objects.count(), 10)
+        self.assertEqual(RatingCheckpoint.objects.count(), 2)
+        ultimo = RatingEvent.objects.filter(jugador=self.a).last()
+        self.a.refresh_from_db()
+        self.assertEqual(ultimo.rating_despues, self.a.ranking)
+
+    def test_resume_from_checkpoint_matches_full_replay(self):
+        """Test that resuming from a checkpoint gives the same result as a full replay"""
+        partidos = [
+            crear_partido([self.a], [self.b], 1 + dia % 2, datetime.date(2025, 1, dia))
+            for dia in range(1, 8)
+        ]
+        with mock.patch("competitions.ranking.CHECKPOINT_CADA", 3):
+            self.run_command()
+            esperado = dict(Usuario.objects.values_list("id", "ranking"))
+
+            out = StringIO()
+            call_command(
+                "recalculate_stats", desde_partido=partidos[5].id, stdout=out
+            )
+
+        self.assertIn("Reanudando desde el checkpoint", out.getvalue())
+        self.assertEqual(dict(Usuario.objects.values_list("id", "ranking")), esperado)
+        self.assertEqual(RatingEvent.objects.count(), 14)
+
+
+class RatingHistoryTestCase(TestCase):
+    """Tests for the match-result path history and point-in-time leaderboards"""
+
+    def setUp(self):
+        self.a = crear_jugador("20000001")
+        self.b = crear_jugador("20000002")
+
+    def test_result_records_rating_events(self):
+        """Test that recording a result stores before/after ratings per player"""
+        partido = crear_partido([self.a], [self.b], 1, datetime.date(2025, 3, 1))
+        registrar_resultado(partido)
+
+        evento_a = RatingEvent.objects.get(partido=partido, jugador=self.a)
+        evento_b = RatingEvent.objects.get(partido=partido, jugador=self.b)
+        self.assertEqual((evento_a.rating_antes, evento_a.rating_despues), (1200, 1216))
+        self.assertEqual((evento_b.delta, evento_b.victoria), (-16, False))
+
+    def test_leaderboard_as_of_date(self):
+        """Test that the historical leaderboard uses the last rating up to the date"""
+        primero = crear_partido([self.a], [self.b], 1, datetime.date(2025, 3, 1))
+        registrar_resultado(primero)
+        segundo = crear_partido([self.a], [self.b], 2, datetime.date(2025, 3, 10))
+        registrar_resultado(segundo)
+
+        jugadores = Usuario.objects.filter(es_jugador=True)
+        antes = list(leaderboard_a_fecha(jugadores, datetime.date(2025, 3, 5)))
+        self.assertEqual([j.id for j in antes], [self.a.id, self.b.id])
+        self.assertEqual(antes[0].ranking_historico, 1216)
+        self.assertEqual(list(leaderboard_a_fecha(jugadores, datetime.date(2025, 2, 1))), [])
+
+    def test_ranking_view_serves_historical_leaderboard(self):
+        """Test that the ranking view accepts a date parameter"""
+        registrar_resultado(
+            crear_partido([self.a], [self.b], 1, datetime.date(2025, 3, 1))
+        )
+        response = self.client.get("/ranking/", {"fecha": "2025-03-02"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["fecha_historica"], datetime.date(2025, 3, 2))
+        self.assertContains(response, "1216")
+
+
+class LeaderboardTestCase(TestCase):
+    """Tests for the per-category leaderboard query"""
+
+    def setUp(self):
+        self.adultos = Usuario.objects.bulk_create(
+            Usuario(
+                cedula=f"4000000{i}",
+                email=f"4000000{i}@test.com",
+                es_jugador=True,
+                categoria_jugador="adulto",
+                ranking=ranking,
+            )
+            for i, ranking in enumerate([1300, 1250, 1250, 1100])
+        )
+        self.juvenil = Usuario.objects.create(
+            cedula="40000010", email="40000010@test.com", es_jugador=True,
+            categoria_jugador="juvenil", ranking=1280,
+        )
+        adulto = Categoria.objects.create(nombre="Adulto")
+        otra = Categoria.objects.create(nombre="Senior")
+        EstadisticaJugador.objects.create(
+            jugador=self.adultos[0], categoria=otra, partidos_jugados=9, victorias=1
+        )
+        EstadisticaJugador.objects.create(
+            jugador=self.adultos[0], categoria=adulto, partidos_jugados=4, victorias=3
+        )
+
+    def test_rank_is_partitioned_by_category_with_ties(self):
+        """Test that positions restart per category and ties share a position"""
+        with self.assertNumQueries(1):
+            filas = [
+                (j.pk, j.posicion, j.stats_jugados, j.stats_victorias)
+                for j in leaderboard(Usuario.objects.filter(es_jugador=True))
+            ]
+        a, b, c, d = (j.pk for j in self.adultos)
+        self.assertEqual(
+            filas,
+            [
+                (a, 1, 4, 3),
+                (self.juvenil.pk, 1, None, None),
+                (b, 2, None, None),
+                (c, 2, None, None),
+                (d, 4, None, None),
+            ],
+        )
+
+    def test_position_lookup_and_view(self):
+        """Test that the logged-in player's position and page are looked up in SQL"""
+        jugadores = Usuario.objects.filter(es_jugador=True)
+        with self.assertNumQueries(2):
+            self.assertEqual(posicion_en_leaderboard(jugadores, self.adultos[2]), (2, 3))
+        self.assertEqual(posicion_en_leaderboard(jugadores, self.adultos[3]), (4, 4))
+
+        self.client.force_login(self.adultos[3])
+        with mock.patch("core.views.JUGADORES_POR_PAGINA_RANKING", 2):
+            response = self.client.get("/ranking/", {"categoria": "adulto"})
+        self.assertEqual(response.context["mi_posicion"], 4)
+        self.assertEqual(response.context["mi_pagina"], 2)
+        self.assertEqual(len(response.context["jugadores"]), 2)
+        self.assertEqual(response.context["jugadores"][0].stats_display.promedio_victorias, 75)
+
+
+class CorregirResultadoTestCase(TestCase):
+    """Tests for incremental correction of an already applied result"""
+
+    def setUp(self):
+        self.a = crear_jugador("30000001")
+        self.b = crear_jugador("30000002")
+        self.c = crear_jugador("30000003")
+        self.d = crear_jugador("30000004")
+        self.partidos = [
+            crear_partido([self.a], [self.b], 1, datetime.date(2025, 4, 1)),
+            crear_partido([self.b], [self.c], 1, datetime.date(2025, 4, 2)),
+            crear_partido([self.c], [self.d], 2, datetime.date(2025, 4, 3)),
+            crear_partido([self.a], [self.c], 1, datetime.date(2025, 4, 4)),
+        ]
+        with mock.patch("competitions.ranking.CHECKPOINT_CADA", 2):
+            for partido in self.partidos:
+                registrar_resultado(partido)
+
+    def snapshot(self):
+        return (
+            dict(Usuario.objects.values_list("id", "ranking")),
+            sorted(
+                RatingEvent.objects.values_list(
+                    "partido_id", "jugador_id", "rating_antes", "rating_despues", "victoria"
+                )
+            ),
+            sorted(
+                EstadisticaJugador.objects.values_list(
+                    "jugador_id", "partidos_jugados", "victorias", "derrotas"
+                )
+            ),
+        )
+
+    def test_correction_matches_full_replay(self):
+        """Test that a compensating delta gives the same state as a full replay"""
+        primero = self.partidos[0]
+        primero.equipo_ganador = 2
+        primero.save()
+
+        corregir_resultado(primero)
+        corregido = self.snapshot()
+
+        call_command("recalculate_stats", stdout=StringIO())
+        self.assertEqual(corregido, self.snapshot())
+
+    def test_correction_patches_later_checkpoints(self):
+        """Test that later checkpoints are corrected so resuming stays consistent"""
+        primero = self.partidos[0]
+        primero.equipo_ganador = 2
+        primero.save()
+        corregir_resultado(primero)
+        esperado = dict(Usuario.objects.values_list("id", "ranking"))
+
+        checkpoints = list(RatingCheckpoint.objects.values_list("partido_id", flat=True))
+        self.assertEqual(checkpoints, [self.partidos[1].id, self.partidos[3].id])
+        call_command(
+            "recalculate_stats", desde_partido=self.partidos[2].id, stdout=StringIO()
+        )
+        self.assertEqual(dict(Usuario.objects.values_list("id", "ranking")), esperado)
+
+    def test_resume_keeps_rankings_from_before_history(self):
+        """Test that players rated before any rating event survive a resumed replay"""
+        veterano = crear_jugador("30000005", ranking=1500)
+        nuevos = [
+            crear_partido([self.a], [self.b], 1, datetime.date(2025, 4, 5)),
+            crear_partido([self.c], [self.d], 1, datetime.date(2025, 4, 6)),
+            crear_partido([veterano], [self.a], 1, datetime.date(2025, 4, 7)),
+        ]
+        with mock.patch("competitions.ranking.CHECKPOINT_CADA", 2):
+            for partido in nuevos:
+                registrar_resultado(partido)
+        esperado = dict(Usuario.objects.values_list("id", "ranking"))
+        self.assertGreater(esperado[veterano.id], 1500)
+
+        call_command("recalculate_stats", desde_partido=nuevos[2].id, stdout=StringIO())
+        self.assertEqual(dict(Usuario.objects.values_list("id", "ranking")), esperado)
+
+    def test_correction_only_rewrites_affected_matches(self):
+        """Test that matches without affected players are left untouched"""
+        ultimo = self.partidos[3]
+        ultimo.equipo_ganador = 2
+        ultimo.save()
+        eventos_previos = list(
+            RatingEvent.objects.exclude(partido=ultimo).values_list("rating_despues")
+        )
+        self.d.refresh_from_db()
+        ranking_d = self.d.ranking
+
+        corregir_resultado(ultimo)
+
+        self.assertEqual(
+            list(RatingEvent.objects.exclude(partido=ultimo).values_list("rating_despues")),
+            eventos_previos,
+        )
+        self.d.refresh_from_db()
+        self.assertEqual(self.d.ranking, ranking_d)
+
+    def test_edit_result_view_applies_compensating_delta(self):
+        """Test that admin_edit_result corrects instead of double counting"""
+        admin = Usuario.objects.create_user(
+            cedula="30000099",
+            password="testpass123",
+            email="admin@test.com",
+            es_admin_aso=True,
+            is_staff=True,
+        )
+        self.client.force_login(admin)
+        primero = self.partidos[0]
+
+        response = self.client.post(
+            f"/admin-gestion/partidos/{primero.id}/editar-resultado/",
+            {"marcador": "4-6, 3-6", "equipo_ganador": "2"},
+        )
+        self.assertEqual(response.status_code, 302)
+        corregido = self.snapshot()
+
+        call_command("recalculate_stats", stdout=StringIO())
+        self.assertEqual(corregido, self.snapshot())
+        stat_a = EstadisticaJugador.objects.get(jugador=self.a)
+        self.assertEqual((stat_a.partidos_jugados, stat_a.victorias), (2, 1))
+
+
+class AplicarResultadoTestCase(TestCase):
+    """Tests for the transactional result-application service"""
+
+    def setUp(self):
+        self.a = crear_jugador("40000001")
+        self.b = crear_jugador("40000002")
+        self.partido = crear_partido([self.a], [self.b], 1, datetime.date(2025, 5, 1))
+
+    def test_applying_twice_counts_once(self):
+        """Test that a second application of the same result is a no-op"""
+        self.assertTrue(registrar_resultado(self.partido))
+        self.assertFalse(registrar_resultado(self.partido))
+
+        self.partido.refresh_from_db()
+        self.assertTrue(self.partido.resultado_aplicado)
+        self.assertEqual(RatingEvent.objects.filter(partido=self.partido).count(), 2)
+        stats = EstadisticaJugador.objects.get(jugador=self.a)
+        self.assertEqual((stats.partidos_jugados, stats.victorias), (1, 1))
+
+    def test_statistics_are_incremented_in_place(self):
+        """Test that existing statistics rows are incremented, not recreated"""
+        EstadisticaJugador.objects.create(
+            jugador=self.a, categoria=None, partidos_jugados=3, victorias=1, derrotas=2
+        )
+        registrar_resultado(self.partido)
+
+        stats = EstadisticaJugador.objects.get(jugador=self.a)
+        self.assertEqual(
+            (stats.partidos_jugados, stats.victorias, stats.derrotas), (4, 2, 2)
+        )
+        self.assertEqual(EstadisticaJugador.objects.filter(jugador=self.b).count(), 1)
+
+    def test_unfinished_match_is_not_applied(self):
+        """Test that a match without a winner is left untouched"""
+        self.partido.estado = "pendiente"
+        self.partido.equipo_ganador = None
+        self.partido.save()
+
+        self.assertFalse(registrar_resultado(self.partido))
+        self.assertFalse(RatingEvent.objects.exists())
@@ -1,4 +1,20 @@
 from django.contrib import admin
-from competitions.models import Torneo
+from competitions.models import EstadisticaJugador, Partido, Torneo
 
-admin.site.register(Torneo)
+
+@admin.register(Torneo)
+class TorneoAdmin(admin.ModelAdmin):
+    # El __str__ del torneo muestra su categoría
+    list_select_related = ["categoria"]
+
+
+@admin.register(Partido)
+class PartidoAdmin(admin.ModelAdmin):
+    # El __str__ del partido muestra el nombre de su torneo
+    list_select_related = ["torneo"]
+
+
+@admin.register(EstadisticaJugador)
+class EstadisticaJugadorAdmin(admin.ModelAdmin):
+    # El __str__ de la estadística muestra la cédula del jugador
+    list_select_related = ["jugador"]
@@ -6,7 +6,10 @@ from django.utils import timezone
 from users.models import Usuario
 from competitions.models import Torneo, Partido
 from facilities.models import Cancha, ReservaCancha
+from facilities.estado import cargar_estados
+from facilities.ocupacion import buscar_conflicto, fin_partido
 from blog.models import Noticia
+from .widgets import AutocompleteJugador, AutocompleteJugadores
 
 
 class TorneoForm(forms.ModelForm):
@@ -54,8 +57,12 @@ class TorneoForm(forms.ModelForm):
                     "placeholder": "Ej: 1er Lugar: Trofeo + $100...",
                 }
             ),
-            "jugadores_inscritos": forms.SelectMultiple(
-                attrs={"class": "form-control"}
+            "jugadores_inscritos": AutocompleteJugadores(
+                attrs={
+                    "class": "form-select border-0 py-2 bg-transparent",
+                    "style": "min-height: 150px",
+                    "data-categoria-input": "[name=categoria]",
+                }
             ),
         }
 
@@ -99,6 +106,9 @@ class TorneoForm(forms.ModelForm):
         self.fields["jugadores_inscritos"].queryset = Usuario.objects.filter(
             es_jugador=True
         )
+        self.fields["jugadores_inscritos"].label_from_instance = (
+            lambda jugador: f"{jugador.first_name} {jugador.last_name} (C.I-{jugador.cedula})"
+        )
 
         # Validación HTML5: Bloquear fechas pasadas en el calendario
         today_str = timezone.now().date().isoformat()
@@ -279,6 +289,23 @@ class UsuarioMultipleChoiceField(forms.ModelMultipleChoiceField):
         return f"{obj.first_name} {obj.last_name} (C.I-{obj.cedula})"
 
 
+class CanchaChoiceIterator(forms.models.ModelChoiceIterator):
+    """Carga el estado en vivo de todas las opciones de una vez (caché o una consulta)."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in cargar_estados(self.queryset):
+            yield self.choice(obj)
+
+
+def usar_estados_en_cache(campo):
+    # El iterador debe asignarse antes del queryset, que fija las opciones del widget
+    campo.iterator = CanchaChoiceIterator
+    campo.queryset = Cancha.objects.all()
+    campo.label_from_instance = lambda cancha: f"{cancha.nombre} ({cancha.get_estado_actual()})"
+
+
 class PartidoSchedulingForm(forms.ModelForm):
     es_casual = forms.BooleanField(
         required=False,
@@ -298,13 +325,13 @@ class PartidoSchedulingForm(forms.ModelForm):
         queryset=Usuario.objects.filter(es_jugador=True),
         label="Equipo 1 - Jugador 1",
         required=True,
-        widget=forms.Select(attrs={"class": "form-control"}),
+        widget=AutocompleteJugador(attrs={"class": "form-control"}),
     )
     equipo1_jugador2 = UsuarioChoiceField(
         queryset=Usuario.objects.filter(es_jugador=True),
         label="Equipo 1 - Jugador 2 (Opcional para dobles)",
         required=False,
-        widget=forms.Select(attrs={"class": "form-control"}),
+        widget=AutocompleteJugador(attrs={"class": "form-control"}),
     )
 
     # Team 2 Players
@@ -312,13 +339,13 @@ class PartidoSchedulingForm(forms.ModelForm):
         queryset=Usuario.objects.filter(es_jugador=True),
         label="Equipo 2 - Jugador 1",
         required=True,
-        widget=forms.Select(attrs={"class": "form-control"}),
+        widget=AutocompleteJugador(attrs={"class": "form-control"}),
     )
     equipo2_jugador2 = UsuarioChoiceField(
         queryset=Usuario.objects.filter(es_jugador=True),
         label="Equipo 2 - Jugador 2 (Opcional para dobles)",
         required=False,
-        widget=forms.Select(attrs={"class": "form-control"}),
+        widget=AutocompleteJugador(attrs={"class": "form-control"}),
     )
 
     HORARIOS_DISPONIBLES = [
@@ -353,6 +380,12 @@ class PartidoSchedulingForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Estado actual de las etiquetas desde la caché de estados
+        usar_estados_en_cache(self.fields["cancha"])
+
+        # Las etiquetas de los torneos muestran su categoría
+        self.fields["torneo"].queryset = Torneo.objects.select_related("categoria")
+
         # Restaurar etiqueta por defecto y hacer requerido inicialmente
         self.fields["torneo"].required = False
         self.fields["torneo"].empty_label = "Seleccione un Torneo"
@@ -440,34 +473,29 @@ class PartidoSchedulingForm(forms.ModelForm):
         if cancha and fecha and hora_str:
             import datetime
             
-            # El sistema asume que un partido dura 2 horas
+            # Cada partido guarda su duración (2 horas por defecto)
             hora_inicio = datetime.datetime.strptime(hora_str, "%H:%M").time()
-            dummy_date = datetime.date.today()
-            dt_inicio = datetime.datetime.combine(dummy_date, hora_inicio)
-            dt_fin = dt_inicio + datetime.timedelta(hours=2)
-            hora_fin = dt_fin.time()
-
-            # Verificar otros partidos
-            partidos_conflicto = Partido.objects.filter(
-                cancha=cancha, fecha=fecha, hora=hora_str
-            ).exclude(estado="cancelado")
-            
-            if self.instance and self.instance.pk:
-                partidos_conflicto = partidos_conflicto.exclude(pk=self.instance.pk)
-            
-            if partidos_conflicto.exists():
-                raise forms.ValidationError(f"La cancha ya tiene un partido programado a las {hora_str}")
-
-            # Verificar reservas de jugadores
-            reservas_conflicto = ReservaCancha.objects.filter(
-                cancha=cancha, fecha=fecha
-            ).exclude(estado="cancelada")
-
-            for r in reservas_conflicto:
-                if hora_inicio < r.hora_fin and hora_fin > r.hora_inicio:
+            hora_fin = timezone.localtime(
+                fin_partido(fecha, hora_inicio, self.instance.duracion)
+            ).time()
+
+            # Filtro rápido con el índice de ocupación y detalle exacto si hay choque
+            conflicto = buscar_conflicto(
+                cancha.pk,
+                fecha,
+                hora_inicio,
+                hora_fin,
+                excluir_partido=self.instance.pk if self.instance else None,
+            )
+            if conflicto:
+                tipo, c_inicio, c_fin = conflicto
+                if tipo == "partido":
                     raise forms.ValidationError(
-                        f"Hay una reserva de jugador de {r.hora_inicio.strftime('%H:%M')} a {r.hora_fin.strftime('%H:%M')} en esta cancha."
+                        f"La cancha ya tiene un partido programado de {c_inicio.strftime('%H:%M')} a {c_fin.strftime('%H:%M')}"
                     )
+                raise forms.ValidationError(
+                    f"Hay una reserva de jugador de {c_inicio.strftime('%H:%M')} a {c_fin.strftime('%H:%M')} en esta cancha."
+                )
 
         return cleaned_data
 
@@ -483,6 +511,9 @@ class PartidoSchedulingForm(forms.ModelForm):
 
     def save(self, commit=True):
         instance = super().save(commit=False)
+        # Un partido del cuadro por programar queda programado al darle cancha
+        if instance.estado == "por_programar" and instance.cancha_id:
+            instance.estado = "pendiente"
 
         def save_m2m():
             # Clear and populate team fields
@@ -524,9 +555,9 @@ class PartidoResultForm(forms.ModelForm):
         widgets = {
             "marcador": forms.TextInput(
                 attrs={
-                    "pattern": r"^(\d+-\d+)(,?\s*\d+-\d+)*$",
-                    "title": "Formato: Sets separados por coma (Ej: 6-4, 6-3) o conteo simple de sets ganados (Ej: 2-1)",
-                    "placeholder": "Ej: 6-4, 6-3 o 2-1",
+                    "pattern": r"^(\d+-\d+(\(\d+\))?)(,?\s*\d+-\d+(\(\d+\))?)*$",
+                    "title": "Formato: Sets separados por coma (Ej: 6-4, 7-6(5)) o conteo simple de sets ganados (Ej: 2-1)",
+                    "placeholder": "Ej: 6-4, 7-6(5) o 2-1",
                     "class": "form-control",
                     "required": "required",
                 }
@@ -544,9 +575,9 @@ class PartidoResultForm(forms.ModelForm):
 
         import re
 
-        if not re.match(r"^(\d+-\d+)(,?\s*\d+-\d+)*$", marcador):
+        if not re.match(r"^(\d+-\d+(\(\d+\))?)(,?\s*\d+-\d+(\(\d+\))?)*$", marcador):
             raise forms.ValidationError(
-                "Formato inválido. Use formato de sets: 6-4, 6-3 o conteo simple: 2-1"
+                "Formato inválido. Use formato de sets: 6-4, 7-6(5) o conteo simple: 2-1"
             )
         return marcador
 
@@ -624,8 +655,11 @@ class ReservaCanchaForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Estado actual de las etiquetas desde la caché de estados
+        usar_estados_en_cache(self.fields["cancha"])
+
         # Validación HTML5: Bloquear fechas pasadas
-        today_str = timezone.now().date().isoformat()
+        today_str = timezone.localdate().isoformat()
         if "fecha" in self.fields:
             self.fields["fecha"].widget.attrs["min"] = today_str
 
@@ -634,7 +668,7 @@ class ReservaCanchaForm(forms.ModelForm):
         if not fecha:
             return fecha
 
-        if fecha < timezone.now().date():
+        if fecha < timezone.localdate():
             raise forms.ValidationError(
                 "La fecha de reserva no puede estar en el pasado"
             )
@@ -650,7 +684,7 @@ class ReservaCanchaForm(forms.ModelForm):
         if hora_inicio_str and hora_fin_str and fecha:
             import datetime
             from django.utils import timezone
-            now = timezone.now()
+            now = timezone.localtime()
 
             hora_inicio = datetime.datetime.strptime(hora_inicio_str, "%H:%M").time()
             hora_fin = datetime.datetime.strptime(hora_fin_str, "%H:%M").time()
@@ -687,37 +721,23 @@ class ReservaCanchaForm(forms.ModelForm):
 
             # 3. Conflictos de Solapamiento
             if cancha and fecha:
-                # Verificar otras reservas
-                reservas = ReservaCancha.objects.filter(
-                    cancha=cancha, fecha=fecha
-                ).exclude(estado="cancelada")
-
-                if self.instance and self.instance.pk:
-                    reservas = reservas.exclude(pk=self.instance.pk)
-
-                for r in reservas:
-                    if hora_inicio < r.hora_fin and hora_fin > r.hora_inicio:
-                        raise forms.ValidationError(
-                            f"Conflicto: Ya existe una reserva de {r.hora_inicio.strftime('%H:%M')} a {r.hora_fin.strftime('%H:%M')}"
-                        )
-
-                # Verificar partidos programados
-                from competitions.models import Partido
-                partidos = Partido.objects.filter(
-                    cancha=cancha, fecha=fecha
-                ).exclude(estado="cancelado")
-
-                for p in partidos:
-                    p_inicio = p.hora
-                    dummy_date = datetime.date.today()
-                    p_dt_inicio = datetime.datetime.combine(dummy_date, p_inicio)
-                    p_dt_fin = p_dt_inicio + datetime.timedelta(hours=2)
-                    p_fin = p_dt_fin.time()
-
-                    if hora_inicio < p_fin and hora_fin > p_inicio:
+                # Filtro rápido con el índice de ocupación y detalle exacto si hay choque
+                conflicto = buscar_conflicto(
+                    cancha.pk,
+                    fecha,
+                    hora_inicio,
+                    hora_fin,
+                    excluir_reserva=self.instance.pk if self.instance else None,
+                )
+                if conflicto:
+                    tipo, c_inicio, c_fin = conflicto
+                    if tipo == "reserva":
                         raise forms.ValidationError(
-                            f"Conflicto: Hay un partido programado de {p_inicio.strftime('%H:%M')} a {p_fin.strftime('%H:%M')}"
+                            f"Conflicto: Ya existe una reserva de {c_inicio.strftime('%H:%M')} a {c_fin.strftime('%H:%M')}"
                         )
+                    raise forms.ValidationError(
+                        f"Conflicto: Hay un partido programado de {c_inicio.strftime('%H:%M')} a {c_fin.strftime('%H:%M')}"
+                    )
 
             cleaned_data["hora_inicio"] = hora_inicio
             cleaned_data["hora_fin"] = hora_fin
@@ -736,6 +756,62 @@ class ReservaCanchaForm(forms.ModelForm):
 # core/forms.py  crear formularios de registro para árbitros y jugadores
 
 
+class BuscarHuecoForm(forms.Form):
+    """Búsqueda de los próximos huecos libres en todas (o algunas) canchas."""
+
+    DURACIONES = [
+        (30, "30 minutos"),
+        (60, "1 hora"),
+        (90, "1 hora 30 minutos"),
+        (120, "2 horas"),
+    ]
+    # Días máximos que abarca una búsqueda
+    MAX_DIAS = 14
+
+    desde = forms.DateField(
+        label="Desde",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control bg-light border-0 py-2"}),
+    )
+    hasta = forms.DateField(
+        label="Hasta",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control bg-light border-0 py-2"}),
+    )
+    duracion = forms.TypedChoiceField(
+        choices=DURACIONES,
+        coerce=int,
+        initial=120,
+        label="Duración",
+        widget=forms.Select(attrs={"class": "form-select bg-light border-0 py-2"}),
+    )
+    canchas = forms.ModelMultipleChoiceField(
+        queryset=Cancha.objects.exclude(estado="mantenimiento").order_by("nombre"),
+        required=False,
+        label="Canchas",
+        help_text="Déjalo vacío para buscar en todas las canchas.",
+        widget=forms.SelectMultiple(attrs={"class": "form-select bg-light border-0 py-2"}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Las etiquetas solo necesitan el nombre, sin el estado en tiempo real
+        self.fields["canchas"].label_from_instance = lambda cancha: cancha.nombre
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get("desde")
+        hasta = cleaned_data.get("hasta")
+        if desde and hasta:
+            if hasta < desde:
+                self.add_error("hasta", "La fecha final debe ser posterior a la inicial.")
+            elif (hasta - desde).days > self.MAX_DIAS:
+                self.add_error(
+                    "hasta", f"La búsqueda puede abarcar como máximo {self.MAX_DIAS} días."
+                )
+            elif hasta < timezone.localdate():
+                self.add_error("hasta", "El rango de búsqueda ya pasó.")
+        return cleaned_data
+
+
 class ArbitroForm(forms.ModelForm):
     password = forms.CharField(
         widget=forms.PasswordInput(
@@ -0,0 +1,201 @@
+"""
+Instrumentación opcional por petición (`settings.INSTRUMENTACION`).
+
+Por cada petición mide las consultas SQL (cantidad, tiempo total y las más
+lentas), el tiempo de render de plantillas y el de la vista, y lo publica:
+
+- como cabecera `Server-Timing` (visible en las herramientas del navegador),
+- como una línea JSON en el logger `core.instrumentacion`,
+- en un resumen móvil por vista que ven los administradores.
+
+Desactivada, el middleware lanza `MiddlewareNotUsed` al arrancar: Django lo
+quita de la cadena y no queda ningún costo por petición. El resumen vive en
+memoria de cada proceso.
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Consultas más lentas que se conservan de cada petición
+CONSULTAS_LENTAS = 3
+# Peticiones recientes por vista que entran en el resumen
+MUESTRAS_POR_VISTA = 200
+# Largo máximo del SQL que se escribe en el log
+LARGO_MAXIMO_SQL = 500
+
+_medicion_actual = ContextVar("medicion_actual", default=None)
+_muestras = defaultdict(lambda: deque(maxlen=MUESTRAS_POR_VISTA))
+_candado = threading.Lock()
+_render_original = Template.render
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 2)
+
+
+class Medicion:
+    """Lo medido durante una petición. Se usa como `execute_wrapper`."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.tiempo_vista = 0.0
+        self.inicio_vista = None
+        # Montículo de (duración, sql) con las consultas más lentas
+        self.lentas = []
+        self._profundidad_plantillas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_sql += duracion
+            if len(self.lentas) < CONSULTAS_LENTAS:
+                heapq.heappush(self.lentas, (duracion, sql))
+            else:
+                heapq.heappushpop(self.lentas, (duracion, sql))
+
+    def consultas_lentas(self):
+        """[(ms, sql)] de la más lenta a la más rápida."""
+        return [(_ms(duracion), sql) for duracion, sql in sorted(self.lentas, reverse=True)]
+
+    def server_timing(self, total):
+        return ", ".join(
+            [
+                f'sql;dur={_ms(self.tiempo_sql)};desc="{self.consultas} consultas"',
+                f"plantillas;dur={_ms(self.tiempo_plantillas)}",
+                f"vista;dur={_ms(self.tiempo_vista)}",
+                f"total;dur={_ms(total)}",
+            ]
+        )
+
+
+def _render_medido(self, context):
+    """`Template.render` que suma su tiempo a la medición en curso, si la hay."""
+    medicion = _medicion_actual.get()
+    # Los {% include %} se renderizan dentro de otra plantilla: ya se cuentan
+    if medicion is None or medicion._profundidad_plantillas:
+        return _render_original(self, context)
+    medicion._profundidad_plantillas += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        medicion.tiempo_plantillas += time.perf_counter() - inicio
+        medicion._profundidad_plantillas -= 1
+
+
+def registrar(vista, medicion, total):
+    with _candado:
+        _muestras[vista].append(
+            (medicion.consultas, medicion.tiempo_sql, medicion.tiempo_plantillas, total)
+        )
+
+
+def resumen_por_vista():
+    """
+    Promedios de las últimas `MUESTRAS_POR_VISTA` peticiones de cada vista,
+    de la que más tiempo acumula a la que menos.
+    """
+    with _candado:
+        copia = {vista: list(muestras) for vista, muestras in _muestras.items()}
+
+    resumen = []
+    for vista, muestras in copia.items():
+        cantidad = len(muestras)
+        consultas, sql, plantillas, totales = zip(*muestras)
+        ordenados = sorted(totales)
+        resumen.append(
+            {
+                "vista": vista,
+                "peticiones": cantidad,
+                "consultas_promedio": round(sum(consultas) / cantidad, 1),
+                "consultas_max": max(consultas),
+                "sql_ms_promedio": _ms(sum(sql) / cantidad),
+                "plantillas_ms_promedio": _ms(sum(plantillas) / cantidad),
+                "total_ms_promedio": _ms(sum(totales) / cantidad),
+                "total_ms_p95": _ms(ordenados[min(cantidad - 1, int(cantidad * 0.95))]),
+                "_acumulado": sum(totales),
+            }
+        )
+    resumen.sort(key=lambda fila: fila.pop("_acumulado"), reverse=True)
+    return resumen
+
+
+def reiniciar_resumen():
+    with _candado:
+        _muestras.clear()
+
+
+class InstrumentacionMiddleware:
+    """
+    Debe ir primero en `MIDDLEWARE` para que el total cubra toda la petición.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTACION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        Template.render = _render_medido
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        fin = time.perf_counter()
+        total = fin - inicio
+        if medicion.inicio_vista is not None:
+            medicion.tiempo_vista = fin - medicion.inicio_vista
+
+        vista = request.resolver_match.view_name if request.resolver_match else "(sin vista)"
+        response["Server-Timing"] = medicion.server_timing(total)
+        registrar(vista, medicion, total)
+        logger.info(
+            json.dumps(
+                {
+                    "vista": vista,
+                    "metodo": request.method,
+                    "ruta": request.path,
+                    "estado": response.status_code,
+                    "consultas": medicion.consultas,
+                    "sql_ms": _ms(medicion.tiempo_sql),
+                    "plantillas_ms": _ms(medicion.tiempo_plantillas),
+                    "vista_ms": _ms(medicion.tiempo_vista),
+                    "total_ms": _ms(total),
+                    "consultas_lentas": [
+                        {"ms": ms, "sql": sql[:LARGO_MAXIMO_SQL]}
+                        for ms, sql in medicion.consultas_lentas()
+                    ],
+                },
+                ensure_ascii=False,
+            )
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # La vista (con las plantillas que renderice) corre desde aquí
+        _medicion_actual.get().inicio_vista = time.perf_counter()
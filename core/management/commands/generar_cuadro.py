@@ -0,0 +1,107 @@
+"""
+Comando de Django para generar de una vez el cuadro de un torneo.
+Uso: python manage.py generar_cuadro TORNEO_ID FORMATO
+         [--jugadores-por-equipo 2] [--grupos 4] [--clasificados 2]
+         [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD] [--canchas 1,2]
+         [--duracion 120] [--descanso 60]
+
+FORMATO es eliminacion, todos_contra_todos o grupos_eliminacion. Los equipos
+se forman con los jugadores inscritos ordenados por ranking; los partidos con
+ambos equipos se programan en la ventana indicada (por defecto las fechas del
+torneo) y los ganadores avanzan solos al cargar cada resultado.
+"""
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from competitions.cuadros import FORMATOS, generar_cuadro
+from competitions.models import Torneo
+from competitions.programacion import DESCANSO_MINUTOS
+from facilities.ocupacion import DURACION_PARTIDO_MINUTOS
+
+
+def _fecha(valor):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor}")
+
+
+class Command(BaseCommand):
+    help = "Crea y programa todos los partidos del cuadro de un torneo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("torneo", type=int, help="Id del torneo")
+        parser.add_argument("formato", choices=FORMATOS, help="Formato del torneo")
+        parser.add_argument(
+            "--jugadores-por-equipo",
+            type=int,
+            default=2,
+            help="Jugadores por equipo (1 o 2)",
+        )
+        parser.add_argument("--grupos", type=int, help="Cantidad de grupos")
+        parser.add_argument(
+            "--clasificados",
+            type=int,
+            default=2,
+            help="Equipos que pasan de cada grupo a la eliminación",
+        )
+        parser.add_argument("--desde", help="Primer día (AAAA-MM-DD)")
+        parser.add_argument("--hasta", help="Último día (AAAA-MM-DD)")
+        parser.add_argument(
+            "--canchas", help="Ids de canchas separados por coma (por defecto todas)"
+        )
+        parser.add_argument(
+            "--duracion",
+            type=int,
+            default=DURACION_PARTIDO_MINUTOS,
+            help="Duración de cada partido en minutos",
+        )
+        parser.add_argument(
+            "--descanso",
+            type=int,
+            default=DESCANSO_MINUTOS,
+            help="Descanso mínimo de un jugador entre partidos, en minutos",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            torneo = Torneo.objects.get(id=options["torneo"])
+        except Torneo.DoesNotExist:
+            raise CommandError(f"No existe el torneo {options['torneo']}")
+
+        canchas = None
+        if options["canchas"]:
+            canchas = [int(i) for i in options["canchas"].split(",") if i]
+
+        inicio = time.perf_counter()
+        try:
+            partidos = generar_cuadro(
+                torneo,
+                options["formato"],
+                jugadores_por_equipo=options["jugadores_por_equipo"],
+                grupos=options["grupos"],
+                clasificados_por_grupo=options["clasificados"],
+                desde=_fecha(options["desde"]) if options["desde"] else None,
+                hasta=_fecha(options["hasta"]) if options["hasta"] else None,
+                canchas=canchas,
+                duracion=options["duracion"],
+                descanso=options["descanso"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+
+        programados = sum(1 for p in partidos if p.cancha_id)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {len(partidos)} partidos creados ({programados} programados) "
+                f"en {duracion:.2f}s."
+            )
+        )
+        if programados < len(partidos):
+            self.stdout.write(
+                f"{len(partidos) - programados} partidos quedan sin cancha hasta "
+                "conocer sus equipos o encontrar hueco."
+            )
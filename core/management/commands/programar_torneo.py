@@ -0,0 +1,119 @@
+"""
+Comando de Django para programar de una vez los partidos de un torneo.
+Uso: python manage.py programar_torneo TORNEO_ID EMPAREJAMIENTOS.json
+         --desde AAAA-MM-DD --hasta AAAA-MM-DD [--canchas 1,2] [--duracion 120]
+         [--descanso 60] [--paso 120] [--simular]
+
+El archivo de emparejamientos es una lista JSON de partidos, cada uno con
+los ids de los jugadores de ambos equipos: [[[1, 2], [3, 4]], [[5], [6]]].
+Se respetan el horario de cada cancha, las reservas y partidos existentes,
+y que ningún jugador juegue dos partidos sin el descanso indicado.
+"""
+
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from competitions.models import Torneo
+from competitions.programacion import (
+    DESCANSO_MINUTOS,
+    guardar_programacion,
+    planificar_partidos,
+)
+from facilities.busqueda import BLOQUE_MINUTOS
+from facilities.ocupacion import DURACION_PARTIDO_MINUTOS
+
+
+def _fecha(valor):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor}")
+
+
+class Command(BaseCommand):
+    help = "Asigna cancha, fecha y hora a todos los partidos de un torneo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("torneo", type=int, help="Id del torneo")
+        parser.add_argument("emparejamientos", help="Archivo JSON con los emparejamientos")
+        parser.add_argument("--desde", required=True, help="Primer día (AAAA-MM-DD)")
+        parser.add_argument("--hasta", required=True, help="Último día (AAAA-MM-DD)")
+        parser.add_argument(
+            "--canchas", help="Ids de canchas separados por coma (por defecto todas)"
+        )
+        parser.add_argument(
+            "--duracion",
+            type=int,
+            default=DURACION_PARTIDO_MINUTOS,
+            help="Duración de cada partido en minutos",
+        )
+        parser.add_argument(
+            "--descanso",
+            type=int,
+            default=DESCANSO_MINUTOS,
+            help="Descanso mínimo de un jugador entre partidos, en minutos",
+        )
+        parser.add_argument(
+            "--paso",
+            type=int,
+            default=BLOQUE_MINUTOS,
+            help="Minutos entre inicios posibles desde la apertura de la cancha",
+        )
+        parser.add_argument(
+            "--simular",
+            action="store_true",
+            help="Muestra la programación sin guardarla",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            torneo = Torneo.objects.select_related("arbitro").get(id=options["torneo"])
+        except Torneo.DoesNotExist:
+            raise CommandError(f"No existe el torneo {options['torneo']}")
+        try:
+            with open(options["emparejamientos"], encoding="utf-8") as archivo:
+                emparejamientos = json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer el archivo de emparejamientos: {e}")
+
+        canchas = None
+        if options["canchas"]:
+            canchas = [int(i) for i in options["canchas"].split(",") if i]
+
+        inicio = time.perf_counter()
+        try:
+            programacion = planificar_partidos(
+                torneo,
+                emparejamientos,
+                _fecha(options["desde"]),
+                _fecha(options["hasta"]),
+                canchas=canchas,
+                duracion=options["duracion"],
+                descanso=options["descanso"],
+                paso=options["paso"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for partido in programacion.partidos:
+            equipo1, equipo2 = partido.equipos
+            self.stdout.write(
+                f"{partido.fecha} {partido.hora:%H:%M} cancha {partido.cancha_id}: "
+                f"{equipo1} vs {equipo2}"
+            )
+        if not options["simular"]:
+            guardar_programacion(programacion)
+        duracion = time.perf_counter() - inicio
+
+        accion = "simulados" if options["simular"] else "programados"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {len(programacion.partidos)} partidos {accion} en {duracion:.2f}s."
+            )
+        )
+        for equipo1, equipo2 in programacion.sin_programar:
+            self.stdout.write(
+                self.style.WARNING(f"Sin hueco en la ventana: {equipo1} vs {equipo2}")
+            )
@@ -0,0 +1,42 @@
+"""
+Comando de Django para rehacer las tablas de posiciones de los torneos.
+Uso: python manage.py recalcular_clasificacion [--torneo ID]
+
+La clasificación se mantiene sola al cargar y corregir resultados; este
+comando la reconstruye desde los partidos finalizados para los torneos con
+resultados anteriores a ella o tras una reparación manual de datos.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from competitions.clasificacion import reconstruir_clasificacion
+from competitions.models import Torneo
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla de posiciones de los torneos desde sus partidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--torneo", type=int, help="Id del torneo (por defecto todos)")
+
+    def handle(self, *args, **options):
+        torneos = Torneo.objects.order_by("id")
+        if options["torneo"]:
+            torneos = torneos.filter(id=options["torneo"])
+            if not torneos.exists():
+                raise CommandError(f"No existe el torneo {options['torneo']}")
+
+        inicio = time.perf_counter()
+        cantidad = filas = 0
+        for torneo in torneos:
+            filas += reconstruir_clasificacion(torneo)
+            cantidad += 1
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Clasificación rehecha para {cantidad} torneos ({filas} equipos) "
+                f"en {duracion:.2f}s."
+            )
+        )
@@ -0,0 +1,30 @@
+"""
+Comando de Django para rehacer las estadísticas por pareja y por rival.
+Uso: python manage.py recalcular_parejas
+
+Las tablas se mantienen solas al cargar y corregir resultados; este comando
+las reconstruye desde los resultados aplicados tras una reparación manual de
+datos.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from competitions.models import EstadisticaEnfrentamiento, EstadisticaPareja
+from competitions.parejas import reconstruir_parejas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye las estadísticas por pareja y por rival desde los partidos"
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        reconstruir_parejas()
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Estadísticas rehechas: {EstadisticaPareja.objects.count()} parejas y "
+                f"{EstadisticaEnfrentamiento.objects.count()} enfrentamientos en {duracion:.2f}s."
+            )
+        )
@@ -1,77 +1,72 @@
 """
 Comando de Django para recalcular estadísticas de todos los partidos finalizados.
-Uso: python manage.py recalculate_stats
+Uso: python manage.py recalculate_stats [--desde-partido ID]
+
+Repite el historial en memoria (ELO real de `utils.elo`) y escribe el
+resultado final con operaciones en bloque dentro de una sola transacción.
+Con --desde-partido reanuda desde el último checkpoint anterior a ese partido
+en lugar de repetir todo el historial.
 """
 
-from django.core.management.base import BaseCommand
-from competitions.models import Partido, EstadisticaJugador
-from users.models import Usuario
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from competitions.models import Partido
+from competitions.ranking import (
+    guardar_replay,
+    repetir_historial,
+    ultimo_checkpoint_antes,
+)
 
 
 class Command(BaseCommand):
     help = "Recalcula las estadísticas de todos los jugadores basado en partidos finalizados"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde-partido",
+            type=int,
+            help="Reanuda desde el último checkpoint anterior a este partido",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Tamaño de lote para las escrituras en bloque (por defecto 1000)",
+        )
+
     def handle(self, *args, **options):
         self.stdout.write("Iniciando recálculo de estadísticas...")
-
-        # Resetear todas las estadísticas
-        EstadisticaJugador.objects.all().delete()
-        self.stdout.write("Estadísticas anteriores eliminadas.")
-
-        # Resetear rankings de todos los jugadores
-        Usuario.objects.filter(es_jugador=True).update(ranking=0)
-        self.stdout.write("Rankings reseteados a 0.")
-
-        # Obtener todos los partidos finalizados ordenados por fecha
-        partidos = Partido.objects.filter(
-            estado="finalizado", equipo_ganador__isnull=False
-        ).order_by("fecha", "hora")
-
-        total = partidos.count()
-        self.stdout.write(f"Procesando {total} partidos finalizados...")
-
-        elo_base = 25
-
-        for i, partido in enumerate(partidos, 1):
-            # Obtener jugadores de cada equipo
-            equipo1_jugadores = list(partido.equipo1.all())
-            equipo2_jugadores = list(partido.equipo2.all())
-
-            if partido.equipo_ganador == 1:
-                ganadores = equipo1_jugadores
-                perdedores = equipo2_jugadores
-            else:
-                ganadores = equipo2_jugadores
-                perdedores = equipo1_jugadores
-
-            # Actualizar estadísticas de ganadores
-            for jugador in ganadores:
-                stat, _ = EstadisticaJugador.objects.get_or_create(
-                    jugador=jugador, categoria=None
+        inicio = time.perf_counter()
+
+        checkpoint = None
+        if options["desde_partido"]:
+            try:
+                partido = Partido.objects.get(id=options["desde_partido"])
+            except Partido.DoesNotExist:
+                raise CommandError(f"No existe el partido {options['desde_partido']}")
+            checkpoint = ultimo_checkpoint_antes(partido)
+            if checkpoint:
+                self.stdout.write(
+                    f"Reanudando desde el checkpoint del {checkpoint.fecha} {checkpoint.hora}."
                 )
-                stat.partidos_jugados += 1
-                stat.victorias += 1
-                stat.save()
-
-                jugador.ranking = (jugador.ranking or 0) + elo_base
-                jugador.save(update_fields=["ranking"])
+            else:
+                self.stdout.write("No hay checkpoint previo; se repite todo el historial.")
 
-            # Actualizar estadísticas de perdedores
-            for jugador in perdedores:
-                stat, _ = EstadisticaJugador.objects.get_or_create(
-                    jugador=jugador, categoria=None
-                )
-                stat.partidos_jugados += 1
-                stat.derrotas += 1
-                stat.save()
+        # Repetir los partidos en memoria, en orden cronológico
+        replay = repetir_historial(checkpoint)
+        total = replay.partidos_procesados
+        self.stdout.write(f"Procesados {total} partidos finalizados en memoria.")
 
-                nuevo_ranking = (jugador.ranking or 0) - (elo_base // 2)
-                jugador.ranking = max(0, nuevo_ranking)
-                jugador.save(update_fields=["ranking"])
+        guardar_replay(replay, checkpoint, batch_size=options["batch_size"])
 
-            if i % 10 == 0 or i == total:
-                self.stdout.write(f"  Procesados {i}/{total} partidos...")
+        duracion = time.perf_counter() - inicio
+        throughput = total / duracion if duracion > 0 else 0
 
         self.stdout.write(
-            self.style.SUCCESS(f"✓ Estadísticas recalculadas para {total} partidos.")
+            self.style.SUCCESS(
+                f"✓ Estadísticas recalculadas para {total} partidos "
+                f"({len(replay.ratings)} jugadores, {len(replay.checkpoints)} checkpoints) "
+                f"en {duracion:.2f}s — {throughput:.1f} partidos/s."
+            )
         )
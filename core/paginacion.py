@@ -0,0 +1,145 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+En lugar de `OFFSET`, cada página continúa desde los valores de orden de la
+última fila mostrada: `WHERE (fecha, hora, id) < (...)` con el mismo
+`ORDER BY`, de modo que cualquier página cuesta lo mismo que la primera y
+las filas insertadas mientras se navega no desplazan los resultados.
+
+El cursor viaja firmado en la query string (`?cursor=...`); los demás
+parámetros (filtros, búsqueda) se conservan en los enlaces.
+"""
+
+from django.core import signing
+from django.db.models import Q
+
+# Filas por página si la vista no indica otra cantidad
+POR_PAGINA = 25
+PARAMETRO_CURSOR = "cursor"
+_SAL = "core.paginacion"
+
+
+class PaginaCursor:
+    """
+    Una página de resultados. Se itera como la lista de filas y expone
+    `url_siguiente`/`url_anterior` (query strings listas para un href).
+    """
+
+    def __init__(self, filas, request, siguiente=None, anterior=None):
+        self.filas = filas
+        self.url_siguiente = self._url(request, siguiente)
+        self.url_anterior = self._url(request, anterior)
+
+    @staticmethod
+    def _url(request, cursor):
+        if cursor is None:
+            return None
+        parametros = request.GET.copy()
+        parametros[PARAMETRO_CURSOR] = cursor
+        return f"?{parametros.urlencode()}"
+
+    @property
+    def has_next(self):
+        return self.url_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.url_anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def __bool__(self):
+        return bool(self.filas)
+
+    def __getitem__(self, indice):
+        return self.filas[indice]
+
+
+def _campos_orden(orden):
+    """[("fecha", True), ("id", True)] para ("-fecha", "-id")."""
+    return [(campo.lstrip("-"), campo.startswith("-")) for campo in orden]
+
+
+def _filtro_desde(campos, valores, hacia_atras):
+    """
+    Filas estrictamente después (o antes, `hacia_atras`) de `valores` en el
+    orden dado, como una disyunción de prefijos iguales que el motor
+    resuelve con el índice del orden.
+    """
+    filtro = Q()
+    iguales = Q()
+    for (campo, descendente), valor in zip(campos, valores):
+        despues = "lt" if descendente != hacia_atras else "gt"
+        filtro |= iguales & Q(**{f"{campo}__{despues}": valor})
+        iguales &= Q(**{campo: valor})
+    return filtro
+
+
+def _codificar(modelo, campos, fila, hacia_atras):
+    valores = [
+        modelo._meta.get_field(campo).value_to_string(fila) for campo, _ in campos
+    ]
+    return signing.dumps({"v": valores, "a": hacia_atras}, salt=_SAL, compress=True)
+
+
+def _decodificar(modelo, campos, cursor):
+    """(valores, hacia_atras), o (None, False) si el cursor no es válido."""
+    try:
+        datos = signing.loads(cursor, salt=_SAL)
+        valores = [
+            modelo._meta.get_field(campo).to_python(valor)
+            for (campo, _), valor in zip(campos, datos["v"], strict=True)
+        ]
+        return valores, bool(datos["a"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None, False
+
+
+def paginar_por_cursor(request, queryset, orden, por_pagina=POR_PAGINA):
+    """
+    Devuelve la página de `queryset` indicada por `?cursor=`, en una sola
+    consulta (más los `prefetch_related` del queryset).
+
+    Args:
+        orden: campos del modelo que determinan un orden total; el último
+            debe ser único (normalmente "id" o "-id").
+
+    Returns:
+        PaginaCursor
+    """
+    modelo = queryset.model
+    campos = _campos_orden(orden)
+    valores, hacia_atras = None, False
+    if request.GET.get(PARAMETRO_CURSOR):
+        valores, hacia_atras = _decodificar(modelo, campos, request.GET[PARAMETRO_CURSOR])
+
+    if hacia_atras:
+        # Se recorre al revés desde el cursor y luego se restablece el orden
+        orden_consulta = [campo[1:] if campo.startswith("-") else f"-{campo}" for campo in orden]
+    else:
+        orden_consulta = list(orden)
+    if valores is not None:
+        queryset = queryset.filter(_filtro_desde(campos, valores, hacia_atras))
+    filas = list(queryset.order_by(*orden_consulta)[: por_pagina + 1])
+
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+
+    siguiente = anterior = None
+    if filas:
+        # Hacia donde se viene siempre hay filas; hacia donde se va, si sobró una
+        if hay_mas or hacia_atras:
+            siguiente = _codificar(modelo, campos, filas[-1], hacia_atras=False)
+        if (hay_mas and hacia_atras) or (valores is not None and not hacia_atras):
+            anterior = _codificar(modelo, campos, filas[0], hacia_atras=True)
+    return PaginaCursor(filas, request, siguiente, anterior)
@@ -0,0 +1,173 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from competitions.models import Categoria, EstadisticaJugador, Partido, Torneo
+from core.forms import PartidoSchedulingForm, ReservaCanchaForm, TorneoForm
+from facilities.models import Cancha
+from users.models import Usuario
+
+
+class EtiquetasFormulariosTestCase(TestCase):
+    """Tests that rendering choice fields does not query once per option"""
+
+    def setUp(self):
+        self.creados = 0
+
+    def agregar_opciones(self, cantidad):
+        """Adds players, referees, tournaments and courts to every select"""
+        inicio = self.creados
+        self.creados += cantidad
+        Usuario.objects.bulk_create(
+            Usuario(
+                cedula=f"8800{i:04d}",
+                email=f"8800{i:04d}@example.com",
+                first_name="Jugador",
+                last_name=str(i),
+                es_jugador=i % 2 == 0,
+                es_arbitro=i % 2 == 1,
+            )
+            for i in range(inicio, self.creados)
+        )
+        for i in range(inicio, self.creados):
+            categoria = Categoria.objects.create(nombre=f"Categoría {i}")
+            Torneo.objects.create(
+                nombre=f"Torneo {i}",
+                descripcion="Torneo de prueba",
+                fecha_inicio=datetime.date(2025, 1, 1),
+                fecha_fin=datetime.date(2025, 1, 2),
+                categoria=categoria,
+            )
+            Cancha.objects.create(nombre=f"Cancha {i}", ubicacion="A", estado="disponible")
+
+    def consultas(self, form_class):
+        cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            html = str(form_class())
+        self.assertIn("option", html)
+        return len(capturadas)
+
+    def test_forms_render_in_constant_queries(self):
+        """Test that each form costs the same with 3 or 9 options per select"""
+        self.agregar_opciones(3)
+        antes = {form: self.consultas(form) for form in (TorneoForm, ReservaCanchaForm, PartidoSchedulingForm)}
+        self.agregar_opciones(6)
+        for form, cantidad in antes.items():
+            with self.subTest(form=form.__name__):
+                self.assertEqual(self.consultas(form), cantidad)
+
+    def test_tournament_labels_come_preloaded(self):
+        """Test that tournament labels show the category without querying"""
+        self.agregar_opciones(2)
+        campo = PartidoSchedulingForm().fields["torneo"]
+        with self.assertNumQueries(1):
+            etiquetas = [etiqueta for _, etiqueta in campo.choices]
+        self.assertIn("Torneo 1 (Categoría 1)", etiquetas)
+
+
+    def test_admin_lists_preload_str_relations(self):
+        """Test that match and statistics admin lists do not query per row"""
+        admin = Usuario.objects.create_superuser(cedula="88100000", password="x", email="s@example.com")
+        self.client.force_login(admin)
+        urls = ("/admin/competitions/partido/", "/admin/competitions/estadisticajugador/")
+
+        def medir():
+            for torneo in Torneo.objects.filter(partidos__isnull=True):
+                Partido.objects.create(torneo=torneo, fecha=datetime.date(2025, 1, 1), hora=datetime.time(9, 0))
+            for jugador in Usuario.objects.filter(es_jugador=True, estadisticas__isnull=True):
+                EstadisticaJugador.objects.create(jugador=jugador, partidos_jugados=2, victorias=1)
+            cantidades = {}
+            for url in urls:
+                with CaptureQueriesContext(connection) as capturadas:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                cantidades[url] = len(capturadas)
+            return cantidades
+
+        self.agregar_opciones(3)
+        antes = medir()
+        self.agregar_opciones(6)
+        self.assertEqual(medir(), antes)
+        self.assertContains(self.client.get(urls[1]), "88000008 - 50.0%")
+
+
+class SelectorJugadoresTestCase(TestCase):
+    """Tests for the server-side autocomplete player pickers"""
+
+    def setUp(self):
+        self.jugadores = Usuario.objects.bulk_create(
+            Usuario(
+                cedula=f"8900{i:04d}",
+                email=f"8900{i:04d}@example.com",
+                first_name="Jugador",
+                last_name=str(i),
+                es_jugador=True,
+            )
+            for i in range(4)
+        )
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+
+    def agregar_jugadores(self, cantidad):
+        Usuario.objects.bulk_create(
+            Usuario(cedula=f"8910{i:04d}", email=f"8910{i:04d}@example.com", es_jugador=True)
+            for i in range(cantidad)
+        )
+
+    def test_only_selected_players_are_rendered(self):
+        """Test that player selects render the chosen players and nothing else"""
+        a, b = self.jugadores[:2]
+        form = PartidoSchedulingForm(initial={"equipo1_jugador1": a.pk, "equipo2_jugador1": b.pk})
+        html = str(form["equipo1_jugador1"])
+        self.assertIn(f'value="{a.pk}" selected', html)
+        self.assertNotIn(f'value="{b.pk}"', html)
+        self.assertIn('data-autocomplete="jugadores"', html)
+        self.assertIn("/api/jugadores-por-categoria/", html)
+
+        html = str(TorneoForm(initial={"jugadores_inscritos": [a.pk, b.pk]})["jugadores_inscritos"])
+        self.assertEqual(html.count("<option"), 2)
+
+    def test_submitted_ids_are_resolved(self):
+        """Test that the form validates the submitted ids without listing every player"""
+        a, b, c, d = self.jugadores
+        datos = {
+            "es_casual": "on",
+            "cancha": self.cancha.pk,
+            "fecha": (datetime.date.today() + datetime.timedelta(days=1)).isoformat(),
+            "hora": "10:00",
+            "equipo1_jugador1": a.pk,
+            "equipo1_jugador2": b.pk,
+            "equipo2_jugador1": c.pk,
+            "equipo2_jugador2": d.pk,
+        }
+        self.agregar_jugadores(30)
+        form = PartidoSchedulingForm(datos)
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertTrue(form.is_valid(), form.errors)
+        # Una consulta por jugador enviado, ninguna que liste a todos
+        consultas_jugadores = [
+            q["sql"] for q in capturadas if 'FROM "users_usuario"' in q["sql"]
+        ]
+        self.assertEqual(len(consultas_jugadores), 4)
+        self.assertTrue(all("LIMIT" in sql for sql in consultas_jugadores))
+
+        form = PartidoSchedulingForm({**datos, "equipo2_jugador2": "999999"})
+        self.assertFalse(form.is_valid())
+        self.assertIn("equipo2_jugador2", form.errors)
+
+    def test_match_admin_page_size_is_flat(self):
+        """Test that the match pages do not grow with the number of players"""
+        admin = Usuario.objects.create(cedula="89990000", email="admin@example.com", es_admin_aso=True)
+        arbitro = Usuario.objects.create(cedula="89990001", email="arbitro@example.com", es_arbitro=True)
+
+        def tamanos():
+            self.client.force_login(admin)
+            partidos = len(self.client.get("/admin-gestion/partidos/").content)
+            self.client.force_login(arbitro)
+            panel = len(self.client.get("/arbitro-dashboard/").content)
+            return partidos, panel
+
+        antes = tamanos()
+        self.agregar_jugadores(30)
+        self.assertEqual(tamanos(), antes)
@@ -0,0 +1,60 @@
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.instrumentacion import reiniciar_resumen, resumen_por_vista
+from users.models import Usuario
+
+
+@override_settings(INSTRUMENTACION=True)
+class InstrumentacionTestCase(TestCase):
+    """Tests for the opt-in per-request instrumentation middleware"""
+
+    def setUp(self):
+        reiniciar_resumen()
+        self.addCleanup(reiniciar_resumen)
+
+    def test_server_timing_header_counts_queries(self):
+        """Test that the header reports every query and each timing phase"""
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get("/partidos/")
+        cabecera = response["Server-Timing"]
+        self.assertIn(f'desc="{len(capturadas)} consultas"', cabecera)
+        for fase in ("sql;dur=", "plantillas;dur=", "vista;dur=", "total;dur="):
+            self.assertIn(fase, cabecera)
+
+    def test_structured_log_line(self):
+        """Test that each request logs one JSON line with the slowest statements"""
+        with self.assertLogs("core.instrumentacion", "INFO") as logs:
+            self.client.get("/partidos/")
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos["vista"], "core:public_match_list")
+        self.assertEqual(datos["estado"], 200)
+        self.assertGreater(datos["consultas"], 0)
+        self.assertTrue(all("SELECT" in lenta["sql"] for lenta in datos["consultas_lentas"]))
+        self.assertLessEqual(len(datos["consultas_lentas"]), 3)
+
+    def test_rolling_summary_for_admins(self):
+        """Test that the per-view summary accumulates and is admin-only"""
+        self.client.get("/partidos/")
+        self.client.get("/partidos/")
+        fila = next(f for f in resumen_por_vista() if f["vista"] == "core:public_match_list")
+        self.assertEqual(fila["peticiones"], 2)
+
+        jugador = Usuario.objects.create(cedula="86000000", email="j@example.com", es_jugador=True)
+        self.client.force_login(jugador)
+        self.assertEqual(self.client.get("/admin-gestion/rendimiento/").status_code, 302)
+
+        admin = Usuario.objects.create(cedula="86000001", email="a@example.com", es_admin_aso=True)
+        self.client.force_login(admin)
+        response = self.client.get("/admin-gestion/rendimiento/")
+        self.assertContains(response, "core:public_match_list")
+
+    @override_settings(INSTRUMENTACION=False)
+    def test_disabled_adds_nothing(self):
+        """Test that the middleware drops out of the chain when disabled"""
+        response = self.client.get("/partidos/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(resumen_por_vista(), [])
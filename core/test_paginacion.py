@@ -0,0 +1,124 @@
+import datetime
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from competitions.models import Partido
+from core.paginacion import paginar_por_cursor
+from users.models import Usuario
+
+ORDEN = ("-fecha", "-hora", "-id")
+
+
+class PaginacionCursorTestCase(TestCase):
+    """Tests for keyset pagination of the list views"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.creados = 0
+
+    def agregar_partidos(self, cantidad):
+        inicio = self.creados
+        self.creados += cantidad
+        partidos = [
+            Partido(
+                # Varios partidos por día y hora para ejercitar el desempate por id
+                fecha=datetime.date(2025, 1, 1) + datetime.timedelta(days=i // 6),
+                hora=datetime.time(8 + (i % 3), 0),
+                estado="pendiente",
+            )
+            for i in range(inicio, self.creados)
+        ]
+        for partido in partidos:
+            partido.calcular_fin()
+        Partido.objects.bulk_create(partidos)
+
+    def pagina(self, cursor=None, **parametros):
+        if cursor:
+            parametros["cursor"] = cursor
+        request = self.factory.get("/partidos/", parametros)
+        return paginar_por_cursor(request, Partido.objects.all(), ORDEN, por_pagina=7)
+
+    @staticmethod
+    def cursor(url):
+        return QueryDict(url.lstrip("?"))["cursor"]
+
+    def test_walks_forward_and_back(self):
+        """Test that next/previous cursors cover the ordering without gaps"""
+        self.agregar_partidos(30)
+        esperado = list(Partido.objects.order_by(*ORDEN).values_list("id", flat=True))
+
+        pagina = self.pagina()
+        self.assertFalse(pagina.has_previous)
+        paginas = [[p.id for p in pagina]]
+        while pagina.has_next:
+            pagina = self.pagina(self.cursor(pagina.url_siguiente))
+            paginas.append([p.id for p in pagina])
+        self.assertEqual(sum(paginas, []), esperado)
+        self.assertEqual([len(p) for p in paginas], [7, 7, 7, 7, 2])
+
+        # Volviendo desde la última página se recorren las mismas páginas
+        for anterior in reversed(paginas[:-1]):
+            pagina = self.pagina(self.cursor(pagina.url_anterior))
+            self.assertEqual([p.id for p in pagina], anterior)
+        self.assertFalse(pagina.has_previous)
+        self.assertTrue(pagina.has_next)
+
+    def test_links_keep_filters_and_reject_bad_cursors(self):
+        """Test that links keep other parameters and a tampered cursor restarts"""
+        self.agregar_partidos(10)
+        pagina = self.pagina(estado="pendiente")
+        self.assertIn("estado=pendiente", pagina.url_siguiente)
+
+        primera = [p.id for p in pagina]
+        self.assertEqual([p.id for p in self.pagina("no-es-un-cursor")], primera)
+
+    def test_pages_cost_one_query_without_offset(self):
+        """Test that deep pages cost the same single query and never use OFFSET"""
+        self.agregar_partidos(20)
+        with CaptureQueriesContext(connection) as capturadas:
+            pagina = self.pagina()
+            pagina = self.pagina(self.cursor(pagina.url_siguiente))
+            self.pagina(self.cursor(pagina.url_siguiente))
+        self.assertEqual(len(capturadas), 3)
+        self.assertFalse(any("OFFSET" in q["sql"] for q in capturadas))
+
+    def test_views_query_count_does_not_grow(self):
+        """Test that the paginated views cost the same on small and large tables"""
+        admin = Usuario.objects.create(cedula="87000000", email="admin@example.com", es_admin_aso=True)
+        self.client.force_login(admin)
+        urls = ["/partidos/", "/admin-gestion/partidos/", "/admin-gestion/jugadores/"]
+
+        def consultas():
+            resultado = {}
+            for url in urls:
+                with CaptureQueriesContext(connection) as capturadas:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                resultado[url] = len(capturadas)
+            return resultado
+
+        self.agregar_partidos(30)
+        antes = consultas()
+        self.agregar_partidos(60)
+        Usuario.objects.bulk_create(
+            Usuario(cedula=f"8701{i:04d}", email=f"8701{i:04d}@example.com", es_jugador=True)
+            for i in range(60)
+        )
+        self.assertEqual(consultas(), antes)
+
+    def test_player_search_runs_in_sql(self):
+        """Test that the player list filters by name or cedula in the database"""
+        admin = Usuario.objects.create(cedula="87000001", email="admin2@example.com", es_admin_aso=True)
+        Usuario.objects.bulk_create(
+            [
+                Usuario(cedula="87100001", email="a@example.com", first_name="Ana", es_jugador=True),
+                Usuario(cedula="87100002", email="b@example.com", first_name="Bruno", es_jugador=True),
+            ]
+        )
+        self.client.force_login(admin)
+        response = self.client.get("/admin-gestion/jugadores/", {"q": "ana"})
+        self.assertEqual([j.first_name for j in response.context["jugadores"]], ["Ana"])
+        response = self.client.get("/admin-gestion/jugadores/", {"q": "87100002"})
+        self.assertEqual([j.first_name for j in response.context["jugadores"]], ["Bruno"])
@@ -0,0 +1,188 @@
+import datetime
+from collections import namedtuple
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Noticia
+from competitions.models import Categoria, Partido, Torneo
+from competitions.participaciones import sincronizar_participaciones
+from facilities.models import Cancha, ReservaCancha
+from facilities.ocupacion import actualizar_ocupacion, incrementar_version
+from users.models import Usuario
+
+# Tamaños (jugadores y partidos) con los que se mide cada vista
+TAMANOS = (10, 100, 1000)
+# Días alrededor de hoy sobre los que se reparten partidos y reservas
+DIAS = 30
+
+# Cada vista declara su presupuesto: consultas máximas por petición, iguales
+# para cualquier tamaño. `usuario` es el atributo del test con quien se entra.
+Presupuesto = namedtuple("Presupuesto", ["vista", "url", "usuario", "consultas"])
+
+
+class PresupuestoConsultasTestCase(TestCase):
+    """Tests that hot views issue a constant, budgeted number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.localdate()
+        cls.categoria = Categoria.objects.create(nombre="Adulto")
+        cls.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        cls.torneo = Torneo.objects.create(
+            nombre="Abierto",
+            descripcion="Torneo de prueba",
+            fecha_inicio=cls.hoy - datetime.timedelta(days=DIAS),
+            fecha_fin=cls.hoy + datetime.timedelta(days=DIAS),
+            categoria=cls.categoria,
+        )
+        cls.admin = Usuario.objects.create(cedula="85000000", email="admin@example.com", es_admin_aso=True)
+        cls.arbitro = Usuario.objects.create(cedula="85000001", email="arbitro@example.com", es_arbitro=True)
+        cls.protagonista = Usuario.objects.create(
+            cedula="85000002",
+            email="protagonista@example.com",
+            first_name="Pro",
+            last_name="Tagonista",
+            es_jugador=True,
+            categoria_jugador="adulto",
+            ranking=1500,
+        )
+        cls.torneo.jugadores_inscritos.add(cls.protagonista)
+        cls.jugadores = [cls.protagonista]
+        cls.partidos = 0
+
+    def presupuestos(self):
+        desde = self.hoy - datetime.timedelta(days=DIAS)
+        hasta = self.hoy + datetime.timedelta(days=DIAS)
+        return [
+            Presupuesto("home", "/", None, 14),
+            Presupuesto("ranking", "/ranking/", None, 2),
+            Presupuesto("public_match_list", "/partidos/", None, 3),
+            Presupuesto("admin_match_list", "/admin-gestion/partidos/", "admin", 12),
+            Presupuesto("jugador_dashboard", "/jugador-dashboard/", "protagonista", 12),
+            Presupuesto("player_public_profile", f"/jugador/{self.protagonista.pk}/", None, 6),
+            Presupuesto(
+                "get_court_availability",
+                f"/api/cancha/{self.cancha.pk}/disponibilidad/?start={desde}&end={hasta}",
+                "protagonista",
+                10,
+            ),
+        ]
+
+    def sembrar(self, cantidad):
+        """Lleva jugadores, partidos y reservas hasta `cantidad` de cada uno."""
+        inicio = len(self.jugadores) - 1
+        nuevos = Usuario.objects.bulk_create(
+            Usuario(
+                cedula=f"851{i:05d}",
+                email=f"851{i:05d}@example.com",
+                first_name="Jugador",
+                last_name=str(i),
+                es_jugador=True,
+                categoria_jugador=("adulto", "juvenil", "senior")[i % 3],
+                ranking=1000 + i,
+            )
+            for i in range(inicio, cantidad)
+        )
+        self.jugadores.extend(nuevos)
+        Torneo.jugadores_inscritos.through.objects.bulk_create(
+            Torneo.jugadores_inscritos.through(torneo_id=self.torneo.pk, usuario_id=j.pk)
+            for j in nuevos
+        )
+
+        partidos = []
+        for i in range(self.partidos, cantidad):
+            # Saltos de una semana: cualquier tamaño tiene partidos pasados y futuros
+            fecha = self.hoy + datetime.timedelta(days=(i * 7) % (2 * DIAS) - DIAS)
+            finalizado = fecha < self.hoy
+            partido = Partido(
+                torneo=self.torneo if i % 2 else None,
+                cancha=self.cancha,
+                arbitro=self.arbitro,
+                fecha=fecha,
+                hora=datetime.time(8 + (i // (2 * DIAS)) % 12, 0),
+                estado="finalizado" if finalizado else "pendiente",
+                equipo_ganador=(i % 2) + 1 if finalizado else None,
+                marcador="6-4, 6-3" if finalizado else "",
+            )
+            partido.calcular_fin()
+            partidos.append(partido)
+        partidos = Partido.objects.bulk_create(partidos)
+
+        # Cuatro jugadores por partido; el protagonista juega uno de cada cinco
+        equipo1, equipo2 = [], []
+        for i, partido in enumerate(partidos, start=self.partidos):
+            a, b, c, d = (self.jugadores[1 + (i + k) % (len(self.jugadores) - 1)] for k in range(4))
+            if i % 5 == 0:
+                a = self.protagonista
+            equipo1 += [Partido.equipo1.through(partido_id=partido.pk, usuario_id=j.pk) for j in (a, b)]
+            equipo2 += [Partido.equipo2.through(partido_id=partido.pk, usuario_id=j.pk) for j in (c, d)]
+        Partido.equipo1.through.objects.bulk_create(equipo1, ignore_conflicts=True)
+        Partido.equipo2.through.objects.bulk_create(equipo2, ignore_conflicts=True)
+        sincronizar_participaciones(p.pk for p in partidos)
+
+        ReservaCancha.objects.bulk_create(
+            ReservaCancha(
+                cancha=self.cancha,
+                jugador=self.protagonista if i % 5 == 0 else self.jugadores[1 + i % (len(self.jugadores) - 1)],
+                fecha=p.fecha,
+                hora_inicio=datetime.time(20, 0),
+                hora_fin=datetime.time(21, 0),
+                estado="confirmada",
+            )
+            for i, p in enumerate(partidos, start=self.partidos)
+        )
+        Noticia.objects.bulk_create(
+            Noticia(titulo=f"Noticia {i}", cuerpo="Texto", autor=self.admin)
+            for i in range(self.partidos, cantidad)
+        )
+        self.partidos = cantidad
+
+        for fecha in {p.fecha for p in partidos}:
+            actualizar_ocupacion(self.cancha.pk, fecha)
+        incrementar_version(self.cancha.pk)
+        call_command("recalculate_stats", stdout=StringIO())
+        call_command("recalcular_parejas", stdout=StringIO())
+
+    def medir(self, presupuesto):
+        """(cantidad de consultas, SQL numerado) de una petición en frío."""
+        self.client.logout()
+        if presupuesto.usuario:
+            self.client.force_login(getattr(self, presupuesto.usuario))
+        cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(presupuesto.url)
+        self.assertEqual(response.status_code, 200, presupuesto.vista)
+        sql = "\n".join(f"{n}. {q['sql']}" for n, q in enumerate(capturadas, start=1))
+        return len(capturadas), sql
+
+    def test_hot_views_stay_within_budget(self):
+        """Test that each hot view costs the same queries at 10, 100 and 1000 rows"""
+        medidas = {}
+        for cantidad in TAMANOS:
+            self.sembrar(cantidad)
+            for presupuesto in self.presupuestos():
+                medidas[presupuesto, cantidad] = self.medir(presupuesto)
+
+        for presupuesto in self.presupuestos():
+            with self.subTest(vista=presupuesto.vista):
+                base, _ = medidas[presupuesto, TAMANOS[0]]
+                for cantidad in TAMANOS:
+                    consultas, sql = medidas[presupuesto, cantidad]
+                    self.assertLessEqual(
+                        consultas,
+                        presupuesto.consultas,
+                        f"{presupuesto.vista} con {cantidad} filas superó su presupuesto "
+                        f"de {presupuesto.consultas} consultas:\n{sql}",
+                    )
+                    self.assertEqual(
+                        consultas,
+                        base,
+                        f"{presupuesto.vista} pasó de {base} a {consultas} consultas "
+                        f"con {cantidad} filas:\n{sql}",
+                    )
@@ -0,0 +1,385 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from competitions.models import Categoria, Partido, Torneo
+from facilities import broadcast
+from facilities.broadcast import canal_cancha, get_broadcaster
+from facilities.models import Cancha, ReservaCancha
+from users.models import Usuario
+
+
+class DisponibilidadCanchasTestCase(TestCase):
+    """Tests for the multi-court availability endpoint"""
+
+    def setUp(self):
+        self.fecha = datetime.date(2025, 6, 14)
+        self.jugador = Usuario.objects.create_user(
+            cedula="70000001",
+            password="testpass123",
+            email="70000001@example.com",
+            es_jugador=True,
+        )
+        self.otro = Usuario.objects.create_user(
+            cedula="70000002",
+            password="testpass123",
+            email="70000002@example.com",
+            es_jugador=True,
+        )
+        self.client.force_login(self.jugador)
+        self.canchas = [
+            Cancha.objects.create(nombre=f"Cancha {i}", ubicacion="A", estado="disponible")
+            for i in range(3)
+        ]
+        self.url = reverse("core:api_courts_availability")
+
+    def reservar(self, cancha, inicio, fin, jugador=None, estado="confirmada"):
+        ReservaCancha.objects.create(
+            cancha=cancha,
+            jugador=jugador or self.otro,
+            fecha=self.fecha,
+            hora_inicio=inicio,
+            hora_fin=fin,
+            estado=estado,
+        )
+
+    def consultar(self, **params):
+        params.setdefault("start", self.fecha.isoformat())
+        params.setdefault("end", self.fecha.isoformat())
+        return self.client.get(self.url, params)
+
+    def test_compact_intervals(self):
+        """Test that busy intervals are encoded as [start, end, type] in minutes"""
+        cancha = self.canchas[0]
+        self.reservar(cancha, datetime.time(8, 0), datetime.time(9, 30))
+        self.reservar(cancha, datetime.time(10, 0), datetime.time(11, 0), jugador=self.jugador)
+        Partido.objects.create(cancha=cancha, fecha=self.fecha, hora=datetime.time(14, 0))
+
+        datos = self.consultar().json()["canchas"]
+        self.assertEqual(
+            datos[str(cancha.id)]["ocupado"],
+            {
+                "2025-06-14": [
+                    [480, 570, "reserva"],
+                    [600, 660, "propia"],
+                    [840, 960, "partido"],
+                ]
+            },
+        )
+        self.assertEqual(datos[str(self.canchas[1].id)]["ocupado"], {})
+        self.assertEqual(
+            datos[str(cancha.id)]["businessHours"], {"start": "08:00", "end": "22:00"}
+        )
+
+    def test_subset_of_courts(self):
+        """Test that the canchas parameter limits the response"""
+        ids = f"{self.canchas[0].id},{self.canchas[2].id}"
+        datos = self.consultar(canchas=ids).json()["canchas"]
+        self.assertEqual(
+            set(datos), {str(self.canchas[0].id), str(self.canchas[2].id)}
+        )
+
+    def test_query_count_does_not_grow_with_data(self):
+        """Test that the endpoint runs one query per table however many rows exist"""
+        with CaptureQueriesContext(connection) as vacio:
+            self.consultar()
+
+        for cancha in self.canchas:
+            self.reservar(cancha, datetime.time(8, 0), datetime.time(10, 0))
+            Partido.objects.create(cancha=cancha, fecha=self.fecha, hora=datetime.time(12, 0))
+        Cancha.objects.create(nombre="Extra", ubicacion="B", estado="disponible")
+
+        with CaptureQueriesContext(connection) as lleno:
+            respuesta = self.consultar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(lleno), len(vacio))
+
+    def test_match_crossing_midnight_is_split(self):
+        """Test that a late match is reported on both days it occupies"""
+        cancha = self.canchas[0]
+        Partido.objects.create(
+            cancha=cancha, fecha=self.fecha, hora=datetime.time(22, 30), duracion=150
+        )
+        siguiente = self.fecha + datetime.timedelta(days=1)
+        datos = self.consultar(end=siguiente.isoformat()).json()["canchas"]
+        self.assertEqual(
+            datos[str(cancha.id)]["ocupado"],
+            {
+                "2025-06-14": [[1350, 1440, "partido"]],
+                "2025-06-15": [[0, 60, "partido"]],
+            },
+        )
+
+    def test_invalid_range(self):
+        """Test that inverted or too long ranges are rejected"""
+        self.assertEqual(self.consultar(end="2025-06-01").status_code, 400)
+        self.assertEqual(self.consultar(end="2025-12-31").status_code, 400)
+
+
+class DisponibilidadCanchaTestCase(TestCase):
+    """Tests for the single-court calendar endpoint"""
+
+    def setUp(self):
+        self.fecha = datetime.date(2025, 6, 14)
+        self.jugador = Usuario.objects.create_user(
+            cedula="70000003",
+            password="testpass123",
+            email="70000003@example.com",
+            es_jugador=True,
+        )
+        self.client.force_login(self.jugador)
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        categoria = Categoria.objects.create(nombre="Adulto")
+        self.torneo = Torneo.objects.create(
+            nombre="Apertura",
+            categoria=categoria,
+            fecha_inicio=self.fecha,
+            fecha_fin=self.fecha,
+        )
+
+    def test_match_titles_do_not_query_per_match(self):
+        """Test that tournament names are loaded with the matches"""
+        url = reverse("core:api_court_availability", args=[self.cancha.id])
+        params = {"start": self.fecha.isoformat(), "end": self.fecha.isoformat()}
+        Partido.objects.create(
+            cancha=self.cancha, fecha=self.fecha, hora=datetime.time(8, 0), torneo=self.torneo
+        )
+        with CaptureQueriesContext(connection) as uno:
+            self.client.get(url, params)
+
+        for hora in (10, 12, 14):
+            Partido.objects.create(
+                cancha=self.cancha,
+                fecha=self.fecha,
+                hora=datetime.time(hora, 0),
+                torneo=self.torneo,
+            )
+        with CaptureQueriesContext(connection) as varios:
+            respuesta = self.client.get(url, params)
+
+        self.assertEqual(len(varios), len(uno))
+        titulos = [e["title"] for e in respuesta.json()["events"]]
+        self.assertEqual(titulos, ["Partido: Apertura"] * 4)
+
+
+class HuecosLibresTestCase(TestCase):
+    """Tests for the next free slot API and the search mode of the booking page"""
+
+    def setUp(self):
+        self.fecha = datetime.date.today() + datetime.timedelta(days=3)
+        self.jugador = Usuario.objects.create_user(
+            cedula="70000004",
+            password="testpass123",
+            email="70000004@example.com",
+            es_jugador=True,
+        )
+        self.client.force_login(self.jugador)
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        ReservaCancha.objects.create(
+            cancha=self.cancha,
+            jugador=self.jugador,
+            fecha=self.fecha,
+            hora_inicio=datetime.time(8, 0),
+            hora_fin=datetime.time(10, 0),
+            estado="confirmada",
+        )
+        self.params = {
+            "desde": self.fecha.isoformat(),
+            "hasta": self.fecha.isoformat(),
+            "duracion": 120,
+        }
+
+    def test_api_returns_earliest_slots(self):
+        """Test that the API lists the first free blocks after existing bookings"""
+        respuesta = self.client.get(
+            reverse("core:api_free_slots"), {**self.params, "limite": 2}
+        )
+        self.assertEqual(
+            respuesta.json()["huecos"],
+            [
+                {
+                    "cancha": self.cancha.id,
+                    "nombre": "Central",
+                    "fecha": self.fecha.isoformat(),
+                    "hora_inicio": inicio,
+                    "hora_fin": fin,
+                }
+                for inicio, fin in (("10:00", "12:00"), ("12:00", "14:00"))
+            ],
+        )
+
+    def test_api_validates_parameters(self):
+        """Test that invalid searches are rejected with form errors"""
+        respuesta = self.client.get(
+            reverse("core:api_free_slots"), {**self.params, "duracion": 45}
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("duracion", respuesta.json()["errors"])
+
+    def test_booking_page_search_mode(self):
+        """Test that the booking page lists free slots when searching"""
+        respuesta = self.client.get(reverse("core:player_reserve_court"), self.params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            [h.hora_inicio for h in respuesta.context["huecos"]][:2],
+            [datetime.time(10, 0), datetime.time(12, 0)],
+        )
+
+
+class DisponibilidadCondicionalTestCase(TestCase):
+    """Tests for ETag revalidation and payload caching of court availability"""
+
+    def setUp(self):
+        cache.clear()
+        self.fecha = datetime.date.today() + datetime.timedelta(days=2)
+        self.jugador = Usuario.objects.create_user(
+            cedula="70000005",
+            password="testpass123",
+            email="70000005@example.com",
+            es_jugador=True,
+        )
+        self.client.force_login(self.jugador)
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        self.url = reverse("core:api_court_availability", args=[self.cancha.id])
+        self.params = {"start": self.fecha.isoformat(), "end": self.fecha.isoformat()}
+
+    def reservar(self):
+        return ReservaCancha.objects.create(
+            cancha=self.cancha,
+            jugador=self.jugador,
+            fecha=self.fecha,
+            hora_inicio=datetime.time(8, 0),
+            hora_fin=datetime.time(10, 0),
+            estado="confirmada",
+        )
+
+    def test_unchanged_court_returns_not_modified(self):
+        """Test that revalidating with the current ETag costs one lookup"""
+        primera = self.client.get(self.url, self.params)
+        etag = primera["ETag"]
+
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda["ETag"], etag)
+        propias = [q for q in consultas if "facilities_" in q["sql"]]
+        self.assertEqual(len(propias), 1)
+
+    def test_writes_change_the_etag(self):
+        """Test that a reservation write invalidates the previous ETag"""
+        etag = self.client.get(self.url, self.params)["ETag"]
+        reserva = self.reservar()
+
+        respuesta = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["events"][0]["title"], "Mi Reserva")
+
+        etag = respuesta["ETag"]
+        reserva.delete()
+        respuesta = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["events"], [])
+
+    def test_renaming_a_tournament_changes_the_etag(self):
+        """Test that match titles never go stale behind a 304 after a rename"""
+        torneo = Torneo.objects.create(
+            nombre="Apertura",
+            descripcion="",
+            fecha_inicio=self.fecha,
+            fecha_fin=self.fecha,
+            categoria=Categoria.objects.create(nombre="Adulto"),
+        )
+        Partido.objects.create(
+            torneo=torneo, cancha=self.cancha, fecha=self.fecha, hora=datetime.time(10, 0)
+        )
+        etag = self.client.get(self.url, self.params)["ETag"]
+
+        torneo.nombre = "Clausura"
+        torneo.save()
+        respuesta = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["events"][0]["title"], "Partido: Clausura")
+
+        # Guardar otros campos no invalida la caché
+        etag = respuesta["ETag"]
+        torneo.save(update_fields=["descripcion"])
+        self.assertEqual(
+            self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_repeated_range_is_served_from_cache(self):
+        """Test that a repeated range reuses the serialized payload"""
+        self.reservar()
+        primera = self.client.get(self.url, self.params)
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.get(self.url, self.params)
+        self.assertEqual(segunda.content, primera.content)
+        propias = [q for q in consultas if "facilities_" in q["sql"]]
+        self.assertEqual(len(propias), 1)
+
+    def test_etag_depends_on_user(self):
+        """Test that another player does not share the personalised payload"""
+        etag = self.client.get(self.url, self.params)["ETag"]
+        otro = Usuario.objects.create_user(
+            cedula="70000006",
+            password="testpass123",
+            email="70000006@example.com",
+            es_jugador=True,
+        )
+        self.client.force_login(otro)
+        self.assertNotEqual(self.client.get(self.url, self.params)["ETag"], etag)
+
+
+class EventosCanchaTestCase(TestCase):
+    """Tests for the live availability event stream"""
+
+    def setUp(self):
+        broadcast._broadcaster = None
+        self.fecha = datetime.date(2025, 6, 14)
+        self.jugador = Usuario.objects.create_user(
+            cedula="70000007",
+            password="testpass123",
+            email="70000007@example.com",
+            es_jugador=True,
+        )
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+        self.url = reverse("core:api_court_events", args=[self.cancha.id])
+        self.params = {"start": self.fecha.isoformat(), "end": self.fecha.isoformat()}
+
+    def tearDown(self):
+        broadcast._broadcaster = None
+
+    def test_requires_login(self):
+        """Test that anonymous clients cannot open the stream"""
+        self.assertEqual(self.client.get(self.url, self.params).status_code, 401)
+
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        """Test that the endpoint answers 204 outside ASGI"""
+        self.client.force_login(self.jugador)
+        self.assertEqual(self.client.get(self.url, self.params).status_code, 204)
+
+    async def test_stream_replays_events_after_last_event_id(self):
+        """Test that the ASGI stream sends events newer than Last-Event-ID"""
+        await self.async_client.aforce_login(self.jugador)
+        canal = canal_cancha(self.cancha.id, self.fecha)
+        # Otro calendario abierto mantiene el historial del canal
+        otro = get_broadcaster().suscribir([canal])
+        primero = get_broadcaster().publicar(canal, {"id": 1, "accion": "guardado"})
+        segundo = get_broadcaster().publicar(canal, {"id": 2, "accion": "eliminado"})
+
+        respuesta = await self.async_client.get(
+            self.url, self.params, headers={"Last-Event-ID": str(primero)}
+        )
+        self.assertEqual(respuesta["Content-Type"], "text/event-stream")
+        contenido = aiter(respuesta.streaming_content)
+        self.assertEqual(await anext(contenido), b"retry: 5000\n\n")
+        self.assertEqual(
+            await anext(contenido),
+            f'id: {segundo}\nevent: cambio\ndata: {{"id": 2, "accion": "eliminado"}}\n\n'.encode(),
+        )
+        await contenido.aclose()
+        otro.cerrar()
@@ -10,6 +10,11 @@ urlpatterns = [
         "", views.home, name="home"
     ),  # ✅ vista completa con noticias, torneos, ranking y canchas
     path("torneos/", views.public_tournament_list, name="public_torneos_list"),
+    path(
+        "torneos/<int:torneo_id>/clasificacion/",
+        views.public_tournament_standings,
+        name="public_tournament_standings",
+    ),
     path("partidos/", views.public_match_list, name="public_match_list"),
     path("canchas/", views.public_court_list, name="public_canchas_list"),
     path(
@@ -196,6 +201,27 @@ urlpatterns = [
         views_api.get_court_availability,
         name="api_court_availability",
     ),
+    path(
+        "api/cancha/<int:cancha_id>/eventos/",
+        views_api.stream_court_availability,
+        name="api_court_events",
+    ),
+    path(
+        "api/canchas/disponibilidad/",
+        views_api.get_courts_availability,
+        name="api_courts_availability",
+    ),
+    path(
+        "api/canchas/huecos-libres/",
+        views_api.get_free_slots,
+        name="api_free_slots",
+    ),
+    # 📈 Rendimiento (Admin)
+    path(
+        "admin-gestion/rendimiento/",
+        views.admin_performance_summary,
+        name="admin_performance_summary",
+    ),
     # 🏆 Ranking
     path("ranking/", views.ranking, name="ranking"),
     path(
@@ -209,4 +235,9 @@ urlpatterns = [
         views_api.get_players_by_category,
         name="api_players_by_category",
     ),
+    path(
+        "api/jugadores/<int:jugador_id>/comparar/<int:otro_id>/",
+        views_api.compare_players,
+        name="api_compare_players",
+    ),
 ]
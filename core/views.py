@@ -1,12 +1,22 @@
 # core/views.py
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 import datetime
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.paginator import Paginator
 from blog.models import Noticia
 from competitions.models import Torneo, Partido, EstadisticaJugador
+from competitions.marcador import totales_jugador
+from competitions.parejas import mejores_companeros, rivalidades
+from competitions.ranking import leaderboard, leaderboard_a_fecha, posicion_en_leaderboard
+from competitions.services import aplicar_resultado, corregir_resultado
 from facilities.models import Cancha, ReservaCancha
+from facilities.busqueda import buscar_huecos
+from facilities.estado import cargar_estados
+from facilities.ocupacion import capturar_solapamiento
 from users.models import Usuario
 from .forms import (
     NoticiaForm,
@@ -15,9 +25,12 @@ from .forms import (
     PartidoSchedulingForm,
     PartidoResultForm,
     ReservaCanchaForm,
+    BuscarHuecoForm,
 )
 from .forms import JugadorForm, ArbitroForm
 from django.utils import timezone
+from .instrumentacion import resumen_por_vista
+from .paginacion import paginar_por_cursor
 from .utils import IsAdmin, IsArbitro, IsJugador, IsAdminOrArbitro
 
 # Aliases for backward compatibility with existing code
@@ -26,59 +39,17 @@ is_arbitro = IsArbitro
 is_jugador = IsJugador
 is_admin_or_arbitro = IsAdminOrArbitro
 
+# Jugadores por página en la tabla pública de ranking
+JUGADORES_POR_PAGINA_RANKING = 50
 
-def update_player_stats(partido):
-    """
-    Actualiza las estadísticas y ranking ELO de los jugadores después de un partido.
-    - Incrementa partidos_jugados para todos los participantes
-    - Incrementa victorias para el equipo ganador
-    - Incrementa derrotas para el equipo perdedor
-    - Actualiza el ranking ELO basado en el resultado
-    """
-    if not partido.equipo_ganador:
-        return  # No hay ganador definido
-
-    # Obtener jugadores de cada equipo
-    equipo1_jugadores = list(partido.equipo1.all())
-    equipo2_jugadores = list(partido.equipo2.all())
-
-    if partido.equipo_ganador == 1:
-        ganadores = equipo1_jugadores
-        perdedores = equipo2_jugadores
-    else:
-        ganadores = equipo2_jugadores
-        perdedores = equipo1_jugadores
-
-    # Puntos ELO base por victoria/derrota
-    elo_base = 25
 
-    # Actualizar estadísticas de ganadores
-    for jugador in ganadores:
-        # Obtener o crear estadística (sin categoría por simplicidad)
-        stat, _ = EstadisticaJugador.objects.get_or_create(
-            jugador=jugador, categoria=None
-        )
-        stat.partidos_jugados += 1
-        stat.victorias += 1
-        stat.save()
-
-        # Actualizar ranking ELO
-        jugador.ranking = (jugador.ranking or 0) + elo_base
-        jugador.save(update_fields=["ranking"])
-
-    # Actualizar estadísticas de perdedores
-    for jugador in perdedores:
-        stat, _ = EstadisticaJugador.objects.get_or_create(
-            jugador=jugador, categoria=None
-        )
-        stat.partidos_jugados += 1
-        stat.derrotas += 1
-        stat.save()
-
-        # Actualizar ranking ELO (reducir, pero no debajo de 0)
-        nuevo_ranking = (jugador.ranking or 0) - (elo_base // 2)
-        jugador.ranking = max(0, nuevo_ranking)
-        jugador.save(update_fields=["ranking"])
+def buscar_por_nombre_o_cedula(query):
+    """Filtro de búsqueda de usuarios por nombre, apellido o cédula."""
+    return (
+        Q(first_name__icontains=query)
+        | Q(last_name__icontains=query)
+        | Q(cedula__icontains=query)
+    )
 
 
 # 🧭 Redirección por rol
@@ -145,6 +116,20 @@ def public_tournament_list(request):
     )
 
 
+def public_tournament_standings(request, torneo_id):
+    """Tabla de posiciones de un torneo, ya ordenada con sus desempates"""
+    torneo = get_object_or_404(Torneo.objects.select_related("categoria"), id=torneo_id)
+    filas = (
+        torneo.clasificacion.order_by("grupo", "posicion")
+        .prefetch_related("jugadores")
+    )
+    return render(
+        request,
+        "core/torneos/clasificacion.html",
+        {"torneo": torneo, "filas": filas},
+    )
+
+
 def public_court_list(request):
     canchas = Cancha.objects.all()
     return render(
@@ -158,7 +143,9 @@ def public_court_detail(request, cancha_id):
 
 
 def public_noticias_list(request):
-    noticias = Noticia.objects.order_by("-fecha_publicacion")
+    noticias = paginar_por_cursor(
+        request, Noticia.objects.all(), ("-fecha_publicacion", "-id"), por_pagina=12
+    )
     return render(
         request, "core/noticias/public_noticias_list.html", {"noticias": noticias}
     )
@@ -286,9 +273,14 @@ def admin_delete_tournament(request, torneo_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_court_list(request):
-    canchas = Cancha.objects.all()
+    # Estado en vivo desde la caché; solo se consulta al cambiar de transición
+    canchas = cargar_estados(Cancha.objects.all())
     form = CanchaForm(prefix="court")
-    todas_reservas = ReservaCancha.objects.all().select_related("cancha", "jugador").order_by("-fecha", "-hora_inicio")
+    todas_reservas = paginar_por_cursor(
+        request,
+        ReservaCancha.objects.select_related("cancha", "jugador"),
+        ("-fecha", "-hora_inicio", "-id"),
+    )
     
     # Formulario para editar reservas en el modal
     reserva_form = ReservaCanchaForm()
@@ -360,7 +352,9 @@ def admin_edit_reservation(request, reserva_id):
     if request.method == "POST":
         form = ReservaCanchaForm(request.POST, instance=reserva)
         if form.is_valid():
-            form.save()
+            with capturar_solapamiento(form):
+                form.save()
+        if not form.errors:
             messages.success(request, f"Reserva de {reserva.jugador.get_full_name()} actualizada.")
         else:
             for error in form.non_field_errors():
@@ -390,12 +384,16 @@ def admin_cancel_reservation(request, reserva_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_player_list(request):
+    query = request.GET.get("q", "").strip()
     jugadores = Usuario.objects.filter(es_jugador=True)
+    if query:
+        jugadores = jugadores.filter(buscar_por_nombre_o_cedula(query))
+    jugadores = paginar_por_cursor(request, jugadores, ("first_name", "last_name", "id"))
     categorias = Usuario._meta.get_field("categoria_jugador").choices
     return render(
         request,
         "core/jugadores/jugadores.html",
-        {"jugadores": jugadores, "categorias": categorias},
+        {"jugadores": jugadores, "categorias": categorias, "query": query},
     )
 
 
@@ -514,7 +512,12 @@ def jugador_dashboard(request):
     """
     user = request.user
     reservas = ReservaCancha.objects.filter(jugador=user)
-    partidos = Partido.objects.filter(Q(equipo1=user) | Q(equipo2=user)).distinct()
+    partidos = (
+        Partido.objects.filter(participaciones__jugador=user)
+        .programados()
+        .select_related("torneo", "cancha")
+        .order_by("-fecha", "-hora")
+    )
     torneos = Torneo.objects.filter(jugadores_inscritos=user)
 
     from competitions.models import EstadisticaJugador
@@ -557,8 +560,14 @@ def jugador_dashboard(request):
 @login_required
 @user_passes_test(is_admin)
 def admin_referee_list(request):
+    query = request.GET.get("q", "").strip()
     arbitros = Usuario.objects.filter(es_arbitro=True)
-    return render(request, "core/arbitros/lista_arbitro.html", {"arbitros": arbitros})
+    if query:
+        arbitros = arbitros.filter(buscar_por_nombre_o_cedula(query))
+    arbitros = paginar_por_cursor(request, arbitros, ("first_name", "last_name", "id"))
+    return render(
+        request, "core/arbitros/lista_arbitro.html", {"arbitros": arbitros, "query": query}
+    )
 
 
 @login_required
@@ -615,7 +624,7 @@ def arbitro_dashboard(request):
     today = timezone.now().date()
     torneos_modal = Torneo.objects.filter(cancelado=False, fecha_fin__gte=today)
     arbitros = Usuario.objects.filter(es_arbitro=True)
-    jugadores = Usuario.objects.filter(es_jugador=True).order_by('first_name', 'last_name')
+    # Los jugadores se buscan desde el modal con api/jugadores-por-categoria/
     
     # Available time slots
     horarios = []
@@ -633,7 +642,6 @@ def arbitro_dashboard(request):
             "canchas": canchas,
             "torneos_modal": torneos_modal,
             "arbitros": arbitros,
-            "jugadores": jugadores,
             "horarios": horarios,
         },
     )
@@ -652,12 +660,14 @@ def admin_create_match(request):
     """
     form = PartidoSchedulingForm(request.POST or None)
     if form.is_valid():
-        partido = form.save(commit=False)
-        partido.estado = "pendiente"  # Force pending state
-        partido.save()
-        form.save_m2m()  # Save ManyToMany (jugadores)
-        messages.success(request, "Partido agendado exitosamente.")
-        return redirect("core:admin_partidos_list")
+        with capturar_solapamiento(form):
+            partido = form.save(commit=False)
+            partido.estado = "pendiente"  # Force pending state
+            partido.save()
+            form.save_m2m()  # Save ManyToMany (jugadores)
+        if not form.errors:
+            messages.success(request, "Partido agendado exitosamente.")
+            return redirect("core:admin_partidos_list")
     return render(request, "core/partidos/crear_partido.html", {"form": form})
 
 
@@ -667,7 +677,7 @@ def admin_match_list(request):
     """Lista todos los partidos con filtros opcionales"""
     partidos = (
         Partido.objects.all()
-        .select_related("torneo", "cancha", "arbitro")
+        .select_related("torneo__categoria", "cancha", "arbitro")
         .prefetch_related("equipo1", "equipo2")
     )
 
@@ -684,9 +694,12 @@ def admin_match_list(request):
 
     if estado:
         partidos = partidos.filter(estado=estado)
+    else:
+        # Los partidos por programar solo se ven filtrando por ese estado
+        partidos = partidos.programados()
 
-    # Ordenar por fecha y hora
-    partidos = partidos.order_by("-fecha", "-hora")
+    # Página por cursor sobre fecha y hora
+    partidos = paginar_por_cursor(request, partidos, ("-fecha", "-hora", "-id"))
 
     # Obtener torneos para el filtro y marcar el seleccionado
     torneos = Torneo.objects.all()
@@ -713,10 +726,8 @@ def admin_match_list(request):
         )
 
     # Datos para el modal de creación
+    # Los jugadores se buscan desde los modales con api/jugadores-por-categoria/
     canchas = Cancha.objects.filter(estado="disponible")
-    jugadores = Usuario.objects.filter(es_jugador=True).order_by(
-        "first_name", "last_name"
-    )
     arbitros = Usuario.objects.filter(es_arbitro=True).order_by(
         "first_name", "last_name"
     )
@@ -741,7 +752,6 @@ def admin_match_list(request):
         "estado_filtro": estado,
         # Datos para el modal
         "canchas": canchas,
-        "jugadores": jugadores,
         "arbitros": arbitros,
         "torneos_modal": torneos_modal,
         "horarios": horarios,
@@ -772,7 +782,9 @@ def admin_edit_match(request, partido_id):
     if request.method == "POST":
         form = PartidoSchedulingForm(request.POST, instance=partido)
         if form.is_valid():
-            form.save()
+            with capturar_solapamiento(form):
+                form.save()
+        if not form.errors:
             messages.success(request, "Detalles del partido actualizados exitosamente.")
             return redirect("core:admin_partidos_list")
     else:
@@ -812,20 +824,29 @@ def admin_record_result(request, partido_id):
     partido = get_object_or_404(Partido, id=partido_id)
 
     if request.method == "POST":
-        form = PartidoResultForm(request.POST, instance=partido)
-        if form.is_valid():
-            partido = form.save(commit=False)
-            partido.estado = "finalizado"
-            partido.save()
-
-            # Actualizar estadísticas y ranking ELO de los jugadores
-            update_player_stats(partido)
-
-            messages.success(
-                request,
-                "Resultado cargado y partido finalizado. Estadísticas actualizadas.",
+        with transaction.atomic():
+            # Bloquear el partido: dos árbitros no pueden cargarlo a la vez
+            partido = get_object_or_404(
+                Partido.objects.select_for_update(), id=partido_id
             )
-            return redirect("core:admin_pending_results_list")
+            if partido.resultado_aplicado:
+                messages.error(request, "El resultado de este partido ya fue cargado.")
+                return redirect("core:admin_pending_results_list")
+
+            form = PartidoResultForm(request.POST, instance=partido)
+            if form.is_valid():
+                partido = form.save(commit=False)
+                partido.estado = "finalizado"
+                partido.save()
+
+                # Actualizar estadísticas y ranking ELO de los jugadores
+                aplicar_resultado(partido)
+
+                messages.success(
+                    request,
+                    "Resultado cargado y partido finalizado. Estadísticas actualizadas.",
+                )
+                return redirect("core:admin_pending_results_list")
     else:
         form = PartidoResultForm(instance=partido)
 
@@ -883,23 +904,30 @@ def admin_edit_result(request, partido_id):
     Árbitros: máximo 2 ediciones por partido.
     Admins/Superadmin: sin límite.
     """
-    partido = get_object_or_404(Partido, id=partido_id)
     user = request.user
 
     # Verificar límite para árbitros (no admins)
     is_admin_user = user.is_staff or user.is_superuser
     max_ediciones_arbitro = 2
 
-    if not is_admin_user and partido.ediciones_resultado >= max_ediciones_arbitro:
-        messages.error(
-            request,
-            f"Has alcanzado el límite de {max_ediciones_arbitro} correcciones para este partido. Contacta a un administrador.",
-        )
+    if request.method != "POST":
         return redirect("core:admin_partidos_list")
 
-    if request.method == "POST":
+    with transaction.atomic():
+        # Bloquear el partido para serializar correcciones concurrentes
+        partido = get_object_or_404(Partido.objects.select_for_update(), id=partido_id)
+
+        if not is_admin_user and partido.ediciones_resultado >= max_ediciones_arbitro:
+            messages.error(
+                request,
+                f"Has alcanzado el límite de {max_ediciones_arbitro} correcciones para este partido. Contacta a un administrador.",
+            )
+            return redirect("core:admin_partidos_list")
+
         marcador = request.POST.get("marcador")
         equipo_ganador = request.POST.get("equipo_ganador")
+        ganador_anterior = partido.equipo_ganador
+        marcador_anterior = partido.marcador
 
         if marcador:
             partido.marcador = marcador
@@ -917,16 +945,21 @@ def admin_edit_result(request, partido_id):
         partido.estado = "finalizado"
         partido.save()
 
-        ediciones_restantes = max_ediciones_arbitro - partido.ediciones_resultado
-        if not is_admin_user and ediciones_restantes > 0:
-            messages.success(
-                request,
-                f"Resultado actualizado. Te quedan {ediciones_restantes} corrección(es) disponible(s).",
-            )
-        else:
-            messages.success(request, "Resultado actualizado exitosamente.")
+        if not partido.resultado_aplicado:
+            # Primer resultado del partido
+            aplicar_resultado(partido)
+        elif (partido.equipo_ganador, partido.marcador) != (ganador_anterior, marcador_anterior):
+            # Corrección: delta compensatorio en lugar de sumar otro resultado
+            corregir_resultado(partido, anterior=(ganador_anterior, marcador_anterior))
 
-        return redirect("core:admin_partidos_list")
+    ediciones_restantes = max_ediciones_arbitro - partido.ediciones_resultado
+    if not is_admin_user and ediciones_restantes > 0:
+        messages.success(
+            request,
+            f"Resultado actualizado. Te quedan {ediciones_restantes} corrección(es) disponible(s).",
+        )
+    else:
+        messages.success(request, "Resultado actualizado exitosamente.")
 
     return redirect("core:admin_partidos_list")
 
@@ -942,21 +975,48 @@ def player_reserve_court(request):
     if cancha_id:
         cancha = get_object_or_404(Cancha, id=cancha_id)
 
-    form = ReservaCanchaForm(request.POST or None, initial={"cancha": cancha})
+    initial = {"cancha": cancha}
+    # Un hueco elegido en la búsqueda precarga fecha y horario
+    for campo in ("fecha", "hora_inicio", "hora_fin"):
+        if request.GET.get(campo):
+            initial[campo] = request.GET[campo]
+    form = ReservaCanchaForm(request.POST or None, initial=initial)
+
+    # Modo búsqueda: próximos huecos libres en todas las canchas
+    huecos = None
+    if "desde" in request.GET:
+        busqueda = BuscarHuecoForm(request.GET)
+        if busqueda.is_valid():
+            datos = busqueda.cleaned_data
+            huecos = buscar_huecos(
+                datos["desde"],
+                datos["hasta"],
+                datos["duracion"],
+                canchas=[c.pk for c in datos["canchas"]] or None,
+            )
+    else:
+        hoy = timezone.localdate()
+        busqueda = BuscarHuecoForm(
+            initial={"desde": hoy, "hasta": hoy + datetime.timedelta(days=7)}
+        )
 
     if form.is_valid():
-        reserva = form.save(commit=False)
-        reserva.jugador = request.user
-        # Si el form trae cancha usala, sino la del GET, sino error
-        if not reserva.cancha and cancha:
-            reserva.cancha = cancha
+        with capturar_solapamiento(form):
+            reserva = form.save(commit=False)
+            reserva.jugador = request.user
+            # Si el form trae cancha usala, sino la del GET, sino error
+            if not reserva.cancha and cancha:
+                reserva.cancha = cancha
 
-        reserva.save()
-        messages.success(request, "Reserva realizada exitosamente.")
-        return redirect("core:player_reservations")
+            reserva.save()
+        if not form.errors:
+            messages.success(request, "Reserva realizada exitosamente.")
+            return redirect("core:player_reservations")
 
     return render(
-        request, "core/reservas/reservar_cancha.html", {"form": form, "cancha": cancha}
+        request,
+        "core/reservas/reservar_cancha.html",
+        {"form": form, "cancha": cancha, "busqueda": busqueda, "huecos": huecos},
     )
 
 
@@ -968,15 +1028,18 @@ def player_reservation_list(request):
         ReservaCancha.objects.filter(
             jugador=request.user, fecha__gte=datetime.date.today()
         )
+        .select_related("cancha")
         .exclude(estado="cancelada")
         .order_by("fecha", "hora_inicio")
     )
 
-    # Historial (pasadas o canceladas)
-    historial = (
+    # Historial (pasadas o canceladas), por páginas
+    historial = paginar_por_cursor(
+        request,
         ReservaCancha.objects.filter(jugador=request.user)
-        .exclude(id__in=reservas_activas.values_list("id", flat=True))
-        .order_by("-fecha", "-hora_inicio")
+        .select_related("cancha")
+        .exclude(id__in=reservas_activas.values_list("id", flat=True)),
+        ("-fecha", "-hora_inicio", "-id"),
     )
 
     return render(
@@ -1010,37 +1073,53 @@ def ranking(request):
     """Vista pública del ranking de jugadores"""
     categoria_filtro = request.GET.get("categoria")
 
-    # Base query: Jugadores activos ordenados por ranking
-    jugadores = (
-        Usuario.objects.filter(es_jugador=True)
-        .prefetch_related("estadisticas")
-        .order_by("-ranking")
-    )
+    # Base query: Jugadores activos
+    jugadores = Usuario.objects.filter(es_jugador=True)
 
     if categoria_filtro:
         jugadores = jugadores.filter(categoria_jugador=categoria_filtro)
 
-    # Inyectar estadística principal
-    for jugador in jugadores:
-        stats = next(
-            (
-                s
-                for s in jugador.estadisticas.all()
-                if str(s.categoria_id) == str(jugador.categoria_jugador)
-            ),
-            None,
+    # Ranking histórico: rating de cada jugador tras su último partido hasta la fecha
+    campo = "ranking"
+    fecha_historica = None
+    fecha_str = request.GET.get("fecha")
+    if fecha_str:
+        try:
+            fecha_historica = datetime.date.fromisoformat(fecha_str)
+        except ValueError:
+            messages.error(request, "Fecha inválida. Use el formato AAAA-MM-DD.")
+    if fecha_historica:
+        jugadores = leaderboard_a_fecha(jugadores, fecha_historica)
+        campo = "ranking_historico"
+
+    # Posición por categoría (RANK() en SQL) y estadísticas de la categoría del jugador
+    pagina = Paginator(leaderboard(jugadores, campo), JUGADORES_POR_PAGINA_RANKING).get_page(
+        request.GET.get("page")
+    )
+    for jugador in pagina:
+        jugador.stats_display = EstadisticaJugador(
+            partidos_jugados=jugador.stats_jugados or 0,
+            victorias=jugador.stats_victorias or 0,
         )
-        if not stats and jugador.estadisticas.exists():
-            stats = jugador.estadisticas.first()
-        jugador.stats_display = stats
+
+    # Puesto del jugador conectado y la página en la que aparece
+    mi_posicion = mi_pagina = None
+    if request.user.is_authenticated and request.user.es_jugador:
+        encontrado = posicion_en_leaderboard(jugadores, request.user, campo)
+        if encontrado:
+            mi_posicion, indice = encontrado
+            mi_pagina = indice // JUGADORES_POR_PAGINA_RANKING + 1
 
     # Obtener opciones de categoría desde el modelo
     categorias = Usuario._meta.get_field("categoria_jugador").choices
 
     context = {
-        "jugadores": jugadores,
+        "jugadores": pagina,
         "categorias": categorias,
         "filtro_actual": categoria_filtro,
+        "fecha_historica": fecha_historica,
+        "mi_posicion": mi_posicion,
+        "mi_pagina": mi_pagina,
     }
     return render(request, "core/ranking.html", context)
 
@@ -1065,12 +1144,10 @@ def player_public_profile(request, player_id):
         else total_victorias
     )
 
-    # Historial de partidos (donde sea jugador)
+    # Historial de partidos (donde sea jugador), con su resultado ya resuelto
     ultimos_partidos = (
-        Partido.objects.filter(
-            Q(equipo1=jugador) | Q(equipo2=jugador), estado="finalizado"
-        )
-        .distinct()
+        jugador.participaciones.filter(partido__estado="finalizado")
+        .select_related("partido__torneo", "partido__cancha")
         .order_by("-fecha")[:10]
     )
 
@@ -1082,6 +1159,11 @@ def player_public_profile(request, player_id):
         "efectividad": efectividad,
         "ratio": ratio,
         "ultimos_partidos": ultimos_partidos,
+        # Games, sets y tie-breaks sumados en SQL desde SetPartido
+        "totales_sets": totales_jugador(jugador),
+        # Leídos de las estadísticas por pareja precalculadas
+        "mejores_companeros": mejores_companeros(jugador),
+        "rivalidades": rivalidades(jugador),
     }
     return render(request, "core/jugador_perfil.html", context)
 
@@ -1182,35 +1264,49 @@ def admin_delete_noticia(request, noticia_id):
 
 def home(request):
     noticias = Noticia.objects.order_by("-fecha_publicacion", "-id")[:1]  # la más reciente
-    canchas = Cancha.objects.all()[:2]  # Las 2 últimas actualizadas
+    canchas = cargar_estados(Cancha.objects.all()[:2])  # Las 2 últimas actualizadas
 
     # Lógica de torneo principal: Prioridad a torneos en progreso (activo y no cancelado)
     today = timezone.now().date()
+    # El modal del torneo lista inscritos y partidos con sus equipos
+    torneos = Torneo.objects.prefetch_related(
+        "jugadores_inscritos",
+        Prefetch(
+            "partidos",
+            queryset=Partido.objects.programados()
+            .select_related("cancha")
+            .prefetch_related("equipo1", "equipo2"),
+        ),
+    )
     torneo_principal = (
-        Torneo.objects.filter(cancelado=False, fecha_inicio__lte=today, fecha_fin__gte=today)
+        torneos.filter(cancelado=False, fecha_inicio__lte=today, fecha_fin__gte=today)
         .order_by("-fecha_inicio")
         .first()
     )
 
     if not torneo_principal:
         # Si no hay en progreso, el último registrado
-        torneo_principal = Torneo.objects.order_by("-id").first()
+        torneo_principal = torneos.order_by("-id").first()
 
     # Obtener Top 5 del ranking
     ranking = Usuario.objects.filter(es_jugador=True).order_by("-ranking")[:5]
 
     proximo_partido_torneo = None
     if torneo_principal:
-        proximo_partido_torneo = (
-            torneo_principal.partidos.filter(fecha__gte=today)
-            .exclude(estado__in=["finalizado", "cancelado"])
-            .order_by("fecha", "hora")
-            .first()
+        # Sale de los partidos ya precargados para el modal
+        proximo_partido_torneo = min(
+            (
+                partido
+                for partido in torneo_principal.partidos.all()
+                if partido.fecha >= today and partido.estado not in ("finalizado", "cancelado")
+            ),
+            key=lambda partido: (partido.fecha, partido.hora),
+            default=None,
         )
 
     # Obtener últimos partidos (máximo 3 para la vista principal)
     partidos = (
-        Partido.objects.all()
+        Partido.objects.programados()
         .select_related("torneo", "cancha")
         .prefetch_related("equipo1", "equipo2")
         .order_by("-fecha", "-hora")[:3]
@@ -1229,14 +1325,26 @@ def home(request):
 
 def public_match_list(request):
     """Lista pública de todos los partidos registrados"""
-    partidos = (
-        Partido.objects.all()
+    partidos = paginar_por_cursor(
+        request,
+        Partido.objects.programados()
         .select_related("torneo", "cancha")
-        .prefetch_related("equipo1", "equipo2")
-        .order_by("-fecha", "-hora")
+        .prefetch_related("equipo1", "equipo2"),
+        ("-fecha", "-hora", "-id"),
     )
 
     context = {
         "partidos": partidos,
     }
     return render(request, "core/torneos/public_match_list.html", context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_performance_summary(request):
+    """Resumen por vista de las mediciones de core/instrumentacion.py"""
+    context = {
+        "activa": settings.INSTRUMENTACION,
+        "vistas": resumen_por_vista(),
+    }
+    return render(request, "core/rendimiento/resumen.html", context)
@@ -1,7 +1,120 @@
-from django.http import JsonResponse
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from facilities.broadcast import canal_cancha, get_broadcaster
 from facilities.models import ReservaCancha
-from datetime import datetime, timedelta
+from facilities.ocupacion import a_minutos, momento, tramos_partido
+from datetime import datetime, time, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Rango máximo (en días) que acepta la API de disponibilidad de varias canchas
+MAX_DIAS_DISPONIBILIDAD = 62
+# Las claves incluyen la versión de la cancha, así que nunca sirven datos
+# viejos; el tiempo solo limita la memoria ocupada por rangos poco pedidos
+CACHE_DISPONIBILIDAD_SEGUNDOS = 60 * 10
+# Días máximos que puede seguir una conexión de eventos en vivo
+MAX_DIAS_EVENTOS = 31
+# Cada cuánto se envía un comentario para mantener viva la conexión SSE
+KEEPALIVE_SEGUNDOS = 20
+
+
+def _rango_fechas(request):
+    """
+    Lee `start` y `end` (ISO, con o sin hora) de la query string.
+    Por defecto: desde hoy y 30 días hacia adelante.
+    """
+    start_date_str = request.GET.get("start")
+    end_date_str = request.GET.get("end")
+
+    if start_date_str:
+        start_date = datetime.fromisoformat(start_date_str.split("T")[0]).date()
+    else:
+        start_date = datetime.today().date()
+
+    if end_date_str:
+        end_date = datetime.fromisoformat(end_date_str.split("T")[0]).date()
+    else:
+        end_date = start_date + timedelta(days=30)
+
+    return start_date, end_date
+
+
+def _disponibilidad_cancha(cancha, start_date, end_date, user_id):
+    """Arma el contenido de `get_court_availability` (eventos, ocupación y horario)."""
+    from facilities.models import OcupacionCancha
+    from competitions.models import Partido
+
+    # 1. Reservas de jugadores
+    reservas = ReservaCancha.objects.filter(
+        cancha_id=cancha.id, fecha__range=[start_date, end_date]
+    ).exclude(estado="cancelada")
+
+    events = []
+    for r in reservas:
+        color = "#dc3545" if r.estado == "confirmada" else "#ffc107"
+        title = "Reservado" if r.estado == "confirmada" else "Pendiente"
+        if r.jugador_id == user_id:
+            title = "Mi Reserva"
+            color = "#198754"
+
+        events.append({
+            "id": f"reserva-{r.id}",
+            "title": title,
+            "start": f"{r.fecha}T{r.hora_inicio}",
+            "end": f"{r.fecha}T{r.hora_fin}",
+            "color": color,
+            "extendedProps": {"type": "reserva"}
+        })
+
+    # 2. Partidos programados (también los que empiezan el día anterior y
+    # pasan de medianoche)
+    partidos = (
+        Partido.objects.filter(cancha_id=cancha.id)
+        .activos()
+        .solapados(
+            momento(start_date, time.min), momento(end_date + timedelta(days=1), time.min)
+        )
+        .select_related("torneo")
+    )
+
+    for p in partidos:
+        fin = timezone.localtime(p.fin)
+
+        events.append({
+            "id": f"partido-{p.id}",
+            "title": f"Partido: {p.torneo.nombre if p.torneo else 'Casual'}",
+            "start": f"{p.fecha}T{p.hora}",
+            "end": f"{fin.date()}T{fin.time()}",
+            "color": "#6f42c1", # Púrpura para partidos
+            "extendedProps": {"type": "partido"}
+        })
+
+    # 3. Índice de ocupación (mapa de 48 medias horas por día) para que el
+    # calendario descarte selecciones ocupadas sin recorrer los eventos
+    ocupacion = {
+        fecha.isoformat(): slots
+        for fecha, slots in OcupacionCancha.objects.filter(
+            cancha_id=cancha.id, fecha__range=[start_date, end_date]
+        ).values_list("fecha", "slots")
+    }
+
+    return {
+        "events": events,
+        "ocupacion": ocupacion,
+        "businessHours": {
+            "start": cancha.horario_apertura.strftime("%H:%M"),
+            "end": cancha.horario_cierre.strftime("%H:%M"),
+        }
+    }
 
 
 @login_required
@@ -10,78 +123,249 @@ def get_court_availability(request, cancha_id):
     API para obtener eventos de disponibilidad para FullCalendar.
     Retorna reservas confirmadas, pendientes y PARTIDOS programados como eventos ocupados.
     También entrega las horas de operación de la cancha.
+
+    Responde con ETag y 304 Not Modified: si nada cambió, una recarga del
+    calendario solo cuesta la lectura de la versión de la cancha. El JSON
+    ya serializado se guarda en caché con la misma clave.
+    """
+    try:
+        from facilities.models import Cancha
+
+        start_date, end_date = _rango_fechas(request)
+        version, actualizada = (
+            Cancha.objects.filter(id=cancha_id).values_list("version", "updated_at").get()
+        )
+
+        # La versión cambia con cada reserva o partido de la cancha y con el
+        # nombre de sus torneos (título de los eventos), updated_at con la
+        # edición de la cancha (horario) y el contenido depende del usuario
+        # ("Mi Reserva")
+        clave = hashlib.md5(
+            f"{cancha_id}:{version}:{actualizada.isoformat()}:{request.user.id}:"
+            f"{start_date}:{end_date}".encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        etag = quote_etag(clave)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            clave_cache = f"disponibilidad:{clave}"
+            contenido = cache.get(clave_cache)
+            if contenido is None:
+                cancha = Cancha.objects.get(id=cancha_id)
+                contenido = json.dumps(
+                    _disponibilidad_cancha(cancha, start_date, end_date, request.user.id)
+                )
+                cache.set(clave_cache, contenido, CACHE_DISPONIBILIDAD_SEGUNDOS)
+            response = HttpResponse(contenido, content_type="application/json")
+
+        response["ETag"] = etag
+        # El navegador puede guardar la respuesta pero debe revalidarla siempre
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    except Exception as e:
+        logger.exception("Error al armar la disponibilidad de la cancha %s", cancha_id)
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+async def stream_court_availability(request, cancha_id):
+    """
+    Server-Sent Events con los cambios de reservas y partidos de una cancha
+    entre `start` y `end`, publicados al confirmarse cada transacción.
+
+    Cada evento lleva `id`, así que el navegador reenvía `Last-Event-ID` al
+    reconectarse y recibe lo que se perdió si el proceso aún lo conserva; si
+    no, el calendario recarga al reconectarse. Requiere servir el proyecto con
+    `asopadel_barinas.asgi`; bajo WSGI responde 204, lo que le indica a
+    EventSource que no reintente.
+    """
+    from facilities.models import Cancha
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Autenticación requerida."}, status=401)
+    if not isinstance(request, ASGIRequest):
+        # Una conexión abierta bloquearía un worker síncrono
+        return HttpResponse(status=204)
+
+    try:
+        start_date, end_date = _rango_fechas(request)
+        ultimo_id = request.headers.get("Last-Event-ID")
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    dias = (end_date - start_date).days
+    if dias < 0 or dias > MAX_DIAS_EVENTOS:
+        return JsonResponse({"error": "El rango de fechas es inválido."}, status=400)
+    if not await Cancha.objects.filter(id=cancha_id).aexists():
+        return JsonResponse({"error": "La cancha no existe."}, status=404)
+
+    canales = [
+        canal_cancha(cancha_id, start_date + timedelta(days=i)) for i in range(dias + 1)
+    ]
+    suscripcion = get_broadcaster().suscribir(canales, ultimo_id)
+
+    async def eventos():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                evento = await suscripcion.siguiente(timeout=KEEPALIVE_SEGUNDOS)
+                if evento is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield (
+                    f"id: {evento['id']}\n"
+                    f"event: cambio\n"
+                    f"data: {json.dumps(evento['datos'])}\n\n"
+                )
+        finally:
+            suscripcion.cerrar()
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Evita que un proxy (nginx) acumule los eventos en buffer
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def get_courts_availability(request):
+    """
+    API de disponibilidad de varias canchas en un rango de fechas.
+
+    Parámetros: `start`, `end` y opcionalmente `canchas` (ids separados por
+    coma; por defecto todas). Usa una consulta por tabla, sin importar
+    cuántas canchas o días se pidan.
+
+    Cada intervalo ocupado se codifica como `[inicio, fin, tipo]`, con inicio
+    y fin en minutos desde la medianoche y tipo "reserva", "pendiente",
+    "propia" (reserva del usuario) o "partido".
     """
     try:
         from facilities.models import Cancha
         from competitions.models import Partido
-        
-        cancha = Cancha.objects.get(id=cancha_id)
-        start_date_str = request.GET.get("start")
-        end_date_str = request.GET.get("end")
-
-        if start_date_str:
-            start_date = datetime.fromisoformat(start_date_str.split("T")[0]).date()
-        else:
-            start_date = datetime.today().date()
-
-        if end_date_str:
-            end_date = datetime.fromisoformat(end_date_str.split("T")[0]).date()
-        else:
-            end_date = start_date + timedelta(days=30)
-
-        # 1. Reservas de jugadores
-        reservas = ReservaCancha.objects.filter(
-            cancha_id=cancha_id, fecha__range=[start_date, end_date]
-        ).exclude(estado="cancelada")
-
-        events = []
-        for r in reservas:
-            color = "#dc3545" if r.estado == "confirmada" else "#ffc107"
-            title = "Reservado" if r.estado == "confirmada" else "Pendiente"
-            if r.jugador == request.user:
-                title = "Mi Reserva"
-                color = "#198754"
-
-            events.append({
-                "title": title,
-                "start": f"{r.fecha}T{r.hora_inicio}",
-                "end": f"{r.fecha}T{r.hora_fin}",
-                "color": color,
-                "extendedProps": {"type": "reserva"}
-            })
-
-        # 2. Partidos programados
-        partidos = Partido.objects.filter(
-            cancha_id=cancha_id, fecha__range=[start_date, end_date]
-        ).exclude(estado="cancelado")
-
-        for p in partidos:
-            # Asumimos 2 horas de duración
-            dummy_date = datetime.today().date()
-            dt_inicio = datetime.combine(dummy_date, p.hora)
-            dt_fin = dt_inicio + timedelta(hours=2)
-            
-            events.append({
-                "title": f"Partido: {p.torneo.nombre if p.torneo else 'Casual'}",
-                "start": f"{p.fecha}T{p.hora}",
-                "end": f"{p.fecha}T{dt_fin.time()}",
-                "color": "#6f42c1", # Púrpura para partidos
-                "extendedProps": {"type": "partido"}
-            })
-
-        return JsonResponse({
-            "events": events,
-            "businessHours": {
-                "start": cancha.horario_apertura.strftime("%H:%M"),
-                "end": cancha.horario_cierre.strftime("%H:%M"),
+
+        start_date, end_date = _rango_fechas(request)
+        if end_date < start_date:
+            return JsonResponse({"error": "El rango de fechas es inválido."}, status=400)
+        if (end_date - start_date).days > MAX_DIAS_DISPONIBILIDAD:
+            return JsonResponse(
+                {"error": f"El rango máximo es de {MAX_DIAS_DISPONIBILIDAD} días."},
+                status=400,
+            )
+
+        canchas = Cancha.objects.only("id", "nombre", "horario_apertura", "horario_cierre")
+        ids = request.GET.get("canchas")
+        if ids:
+            canchas = canchas.filter(id__in=[int(i) for i in ids.split(",") if i])
+
+        data = {
+            str(c.id): {
+                "nombre": c.nombre,
+                "businessHours": {
+                    "start": c.horario_apertura.strftime("%H:%M"),
+                    "end": c.horario_cierre.strftime("%H:%M"),
+                },
+                "ocupado": {},
             }
-        }, safe=False)
-    except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+            for c in canchas
+        }
+        canchas_ids = [int(i) for i in data]
+
+        def agregar(cancha_id, fecha, intervalo):
+            dias = data[str(cancha_id)]["ocupado"]
+            dias.setdefault(fecha.isoformat(), []).append(intervalo)
+
+        reservas = (
+            ReservaCancha.objects.filter(
+                cancha_id__in=canchas_ids, fecha__range=[start_date, end_date]
+            )
+            .exclude(estado="cancelada")
+            .order_by("fecha", "hora_inicio")
+            .values_list("cancha_id", "fecha", "hora_inicio", "hora_fin", "estado", "jugador_id")
+        )
+        for cancha_id, fecha, inicio, fin, estado, jugador_id in reservas:
+            if jugador_id == request.user.id:
+                tipo = "propia"
+            elif estado == "confirmada":
+                tipo = "reserva"
+            else:
+                tipo = "pendiente"
+            agregar(cancha_id, fecha, [a_minutos(inicio), a_minutos(fin), tipo])
+
+        partidos = (
+            Partido.objects.filter(cancha_id__in=canchas_ids)
+            .activos()
+            .solapados(
+                momento(start_date, time.min),
+                momento(end_date + timedelta(days=1), time.min),
+            )
+            .order_by("fecha", "hora")
+            .values_list("cancha_id", "fecha", "hora", "fin")
+        )
+        for cancha_id, fecha, hora, fin in partidos:
+            # Un partido que pasa de medianoche ocupa un tramo en cada día
+            for dia, inicio, fin_tramo in tramos_partido(fecha, hora, fin):
+                if start_date <= dia <= end_date:
+                    agregar(cancha_id, dia, [inicio, fin_tramo, "partido"])
+
+        return JsonResponse(
+            {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "canchas": data,
+            }
+        )
+    except ValueError as e:
         return JsonResponse({"error": str(e)}, status=400)
 
 
+@login_required
+def get_free_slots(request):
+    """
+    API de búsqueda de los próximos huecos libres.
+
+    Parámetros: `desde`, `hasta`, `duracion` (minutos), opcionalmente
+    `canchas` (repetido) y `limite` (máximo 50). Respeta el horario de cada
+    cancha, la regla de bloques de 2 horas y las reservas y partidos
+    existentes.
+    """
+    from facilities.busqueda import buscar_huecos
+    from .forms import BuscarHuecoForm
+
+    form = BuscarHuecoForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        limite = min(int(request.GET.get("limite", 10)), 50)
+    except ValueError:
+        return JsonResponse({"error": "El límite debe ser un número."}, status=400)
+
+    datos = form.cleaned_data
+    huecos = buscar_huecos(
+        datos["desde"],
+        datos["hasta"],
+        datos["duracion"],
+        canchas=[c.pk for c in datos["canchas"]] or None,
+        limite=max(limite, 1),
+    )
+    return JsonResponse(
+        {
+            "huecos": [
+                {
+                    "cancha": h.cancha_id,
+                    "nombre": h.cancha_nombre,
+                    "fecha": h.fecha.isoformat(),
+                    "hora_inicio": h.hora_inicio.strftime("%H:%M"),
+                    "hora_fin": h.hora_fin.strftime("%H:%M"),
+                }
+                for h in huecos
+            ]
+        }
+    )
+
+
 @login_required
 def get_players_by_category(request):
     """
@@ -133,3 +417,26 @@ def get_players_by_category(request):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+
+
+@login_required
+def compare_players(request, jugador_id, otro_id):
+    """
+    API para comparar dos jugadores: su historial como pareja y como rivales,
+    visto desde `jugador_id`. Lee las estadísticas por pareja precalculadas,
+    sin recorrer los partidos.
+    """
+    from users.models import Usuario
+    from competitions.parejas import comparar_jugadores
+
+    if jugador_id == otro_id:
+        return JsonResponse({"error": "Los jugadores deben ser distintos"}, status=400)
+    encontrados = Usuario.objects.filter(
+        pk__in=(jugador_id, otro_id), es_jugador=True
+    ).count()
+    if encontrados < 2:
+        return JsonResponse({"error": "Jugador no encontrado"}, status=404)
+
+    return JsonResponse(
+        {"jugador": jugador_id, "otro": otro_id, **comparar_jugadores(jugador_id, otro_id)}
+    )
@@ -0,0 +1,52 @@
+"""
+Selectores de jugadores con búsqueda en el servidor.
+
+Solo renderizan las opciones ya seleccionadas; el resto se busca con
+`api/jugadores-por-categoria/` desde `static/js/autocomplete_jugadores.js`.
+Así el tamaño de la página no crece con la cantidad de jugadores. La
+validación sigue siendo la del campo: `ModelChoiceField` y
+`ModelMultipleChoiceField` solo consultan los ids enviados.
+"""
+
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteJugadorMixin:
+    def __init__(self, attrs=None, choices=()):
+        super().__init__({"data-autocomplete": "jugadores", **(attrs or {})}, choices)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault("data-autocomplete-url", reverse("core:api_players_by_category"))
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Como `Select.optgroups`, pero solo con la opción vacía y las elegidas."""
+        opciones = []
+        if not self.allow_multiple_selected:
+            vacia = getattr(self.choices.field, "empty_label", None) or "Seleccione jugador"
+            opciones.append(self.create_option(name, "", vacia, not any(value), 0))
+
+        ids = [v for v in value if str(v).isdigit()]
+        if ids:
+            campo = self.choices.field
+            for obj in campo.queryset.filter(pk__in=ids):
+                opciones.append(
+                    self.create_option(
+                        name,
+                        self.choices.choice(obj)[0],
+                        campo.label_from_instance(obj),
+                        True,
+                        len(opciones),
+                    )
+                )
+        return [(None, opciones, 0)]
+
+
+class AutocompleteJugador(AutocompleteJugadorMixin, forms.Select):
+    pass
+
+
+class AutocompleteJugadores(AutocompleteJugadorMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FacilitiesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "facilities"
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        from . import signals  # noqa: F401
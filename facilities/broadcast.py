@@ -0,0 +1,146 @@
+"""
+Difusión en vivo de cambios de disponibilidad (reservas y partidos).
+
+Cada cambio confirmado se publica en el canal `cancha:<id>:<fecha>` y los
+calendarios abiertos lo reciben por Server-Sent Events. El broadcaster por
+defecto vive en memoria del proceso: sirve para un único proceso ASGI. Con
+varios procesos se cambia por uno compartido (p. ej. Redis) mediante el
+ajuste `BROADCASTER`, que debe apuntar a una clase con la misma interfaz
+(`publicar` y `suscribir`).
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+BROADCASTER_POR_DEFECTO = "facilities.broadcast.BroadcasterEnMemoria"
+
+
+def canal_cancha(cancha_id, fecha):
+    """Nombre del canal de una cancha en un día."""
+    return f"cancha:{cancha_id}:{fecha.isoformat()}"
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente suscrito a uno o varios canales."""
+
+    def __init__(self, broadcaster, canales):
+        self.broadcaster = broadcaster
+        self.canales = canales
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue()
+
+    def entregar(self, evento):
+        # Se puede llamar desde cualquier hilo (p. ej. el de una vista síncrona)
+        self.loop.call_soon_threadsafe(self.cola.put_nowait, evento)
+
+    async def siguiente(self, timeout=None):
+        """Espera el próximo evento; None si vence el timeout."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.broadcaster._desuscribir(self)
+
+
+class BroadcasterEnMemoria:
+    """
+    Broadcaster dentro del proceso. Guarda los últimos eventos de cada canal
+    con suscriptores para que un cliente que se reconecta con `Last-Event-ID`
+    no pierda los cambios ocurridos mientras estaba desconectado.
+
+    El historial de un canal se descarta al irse su último suscriptor, y en
+    un canal sin suscriptores no se publica nada: la memoria queda acotada
+    por los calendarios abiertos.
+    """
+
+    HISTORIAL_POR_CANAL = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Los ids parten de la hora de arranque: un id emitido por otro
+        # proceso (o antes de un reinicio) no coincide con los de este
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self._suscripciones = {}
+        self._historial = {}
+
+    def publicar(self, canal, datos):
+        """
+        Publica `datos` (dict serializable) en `canal`.
+
+        Returns:
+            int | None: id del evento, o None si el canal no tiene
+                suscriptores y no se publicó.
+        """
+        with self._lock:
+            destinatarios = list(self._suscripciones.get(canal, ()))
+            if not destinatarios:
+                return None
+            evento = {"id": next(self._ids), "canal": canal, "datos": datos}
+            historial = self._historial.setdefault(
+                canal, deque(maxlen=self.HISTORIAL_POR_CANAL)
+            )
+            historial.append(evento)
+        for suscripcion in destinatarios:
+            try:
+                suscripcion.entregar(evento)
+            except RuntimeError:
+                # El event loop del cliente ya se cerró
+                self._desuscribir(suscripcion)
+        return evento["id"]
+
+    def suscribir(self, canales, ultimo_id=None):
+        """
+        Suscribe al llamador (dentro de un event loop) a `canales`. Si se
+        indica `ultimo_id` y sigue en el historial de alguno de ellos, los
+        eventos posteriores se encolan de inmediato. Un id desconocido (de
+        otro proceso, descartado o demasiado viejo) no repite nada: no se
+        sabe qué se perdió y el cliente debe recargar.
+        """
+        suscripcion = Suscripcion(self, list(canales))
+        with self._lock:
+            historiales = [self._historial.get(canal, ()) for canal in suscripcion.canales]
+            pendientes = []
+            if ultimo_id is not None and any(
+                e["id"] == ultimo_id for historial in historiales for e in historial
+            ):
+                pendientes = [
+                    e for historial in historiales for e in historial if e["id"] > ultimo_id
+                ]
+            for canal in suscripcion.canales:
+                self._suscripciones.setdefault(canal, set()).add(suscripcion)
+        for evento in sorted(pendientes, key=lambda e: e["id"]):
+            suscripcion.cola.put_nowait(evento)
+        return suscripcion
+
+    def _desuscribir(self, suscripcion):
+        with self._lock:
+            for canal in suscripcion.canales:
+                suscritos = self._suscripciones.get(canal)
+                if suscritos:
+                    suscritos.discard(suscripcion)
+                    if not suscritos:
+                        del self._suscripciones[canal]
+                        self._historial.pop(canal, None)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Instancia única del broadcaster configurado en `settings.BROADCASTER`."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                ruta = getattr(settings, "BROADCASTER", BROADCASTER_POR_DEFECTO)
+                _broadcaster = import_string(ruta)()
+    return _broadcaster
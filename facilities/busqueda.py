@@ -0,0 +1,162 @@
+"""
+Búsqueda de los próximos huecos libres en todas las canchas.
+
+Se cargan de una vez (una consulta por tabla) las reservas y partidos que
+tocan el rango de fechas, se agrupan por cancha y día como listas ordenadas de
+intervalos ocupados ya fusionados, y cada candidato se comprueba con una
+búsqueda binaria en lugar de consultar la base de datos por cancha.
+"""
+
+import bisect
+import datetime
+from collections import defaultdict, namedtuple
+
+from django.utils import timezone
+
+from .models import Cancha, ReservaCancha
+from .ocupacion import a_hora, a_minutos, momento, tramos_partido
+
+# Las reservas se hacen en pasos de 30 minutos...
+PASO_MINUTOS = 30
+# ...y deben quedar dentro de un bloque fijo de 2 horas (08-10, 10-12, ...)
+BLOQUE_MINUTOS = 120
+
+Hueco = namedtuple("Hueco", ["cancha_id", "cancha_nombre", "fecha", "hora_inicio", "hora_fin"])
+
+
+class IntervalosOcupados:
+    """
+    Intervalos ocupados de una cancha en un día, fusionados y ordenados,
+    en minutos desde la medianoche.
+    """
+
+    def __init__(self, intervalos):
+        self.inicios = []
+        self.fines = []
+        for inicio, fin in sorted(intervalos):
+            if self.fines and inicio <= self.fines[-1]:
+                self.fines[-1] = max(self.fines[-1], fin)
+            else:
+                self.inicios.append(inicio)
+                self.fines.append(fin)
+
+    def agregar(self, inicio, fin):
+        """Añade [inicio, fin) fusionándolo con los intervalos que toca."""
+        # Intervalos que terminan en o después del inicio y empiezan hasta el fin
+        i = bisect.bisect_left(self.fines, inicio)
+        j = bisect.bisect_right(self.inicios, fin)
+        if i < j:
+            inicio = min(inicio, self.inicios[i])
+            fin = max(fin, self.fines[j - 1])
+        self.inicios[i:j] = [inicio]
+        self.fines[i:j] = [fin]
+
+    def esta_libre(self, inicio, fin):
+        """True si [inicio, fin) no toca ningún intervalo ocupado."""
+        # Primer intervalo que termina después del inicio buscado
+        i = bisect.bisect_right(self.fines, inicio)
+        return i == len(self.inicios) or self.inicios[i] >= fin
+
+
+def cargar_ocupacion(canchas_ids, desde, hasta):
+    """
+    Construye {(cancha_id, fecha): IntervalosOcupados} con una consulta para
+    reservas y otra para partidos.
+    """
+    from competitions.models import Partido
+
+    intervalos = defaultdict(list)
+    reservas = (
+        ReservaCancha.objects.filter(cancha_id__in=canchas_ids, fecha__range=[desde, hasta])
+        .exclude(estado="cancelada")
+        .values_list("cancha_id", "fecha", "hora_inicio", "hora_fin")
+    )
+    for cancha_id, fecha, inicio, fin in reservas:
+        intervalos[(cancha_id, fecha)].append((a_minutos(inicio), a_minutos(fin)))
+
+    # Incluye los partidos del día anterior que pasan de medianoche
+    partidos = (
+        Partido.objects.filter(cancha_id__in=canchas_ids)
+        .activos()
+        .solapados(
+            momento(desde, datetime.time.min),
+            momento(hasta + datetime.timedelta(days=1), datetime.time.min),
+        )
+        .values_list("cancha_id", "fecha", "hora", "fin")
+    )
+    for cancha_id, fecha, hora, fin in partidos:
+        for dia, inicio, fin_tramo in tramos_partido(fecha, hora, fin):
+            intervalos[(cancha_id, dia)].append((inicio, fin_tramo))
+
+    return {clave: IntervalosOcupados(valor) for clave, valor in intervalos.items()}
+
+
+def _inicios_validos(apertura, cierre, duracion, minimo=0):
+    """
+    Inicios en pasos de 30 minutos que respetan el horario de la cancha y la
+    regla de no cruzar un bloque de 2 horas.
+    """
+    primero = max(a_minutos(apertura), minimo)
+    primero += -primero % PASO_MINUTOS
+    inicio = primero
+    while inicio + duracion <= a_minutos(cierre):
+        fin_bloque = (inicio // BLOQUE_MINUTOS + 1) * BLOQUE_MINUTOS
+        if inicio + duracion <= fin_bloque:
+            yield inicio
+        inicio += PASO_MINUTOS
+
+
+def buscar_huecos(desde, hasta, duracion, canchas=None, limite=10, ahora=None):
+    """
+    Devuelve los `limite` huecos libres más tempranos de `duracion` minutos
+    entre `desde` y `hasta` (inclusive), ordenados por fecha, hora y cancha.
+
+    Args:
+        canchas: queryset o lista de ids; por defecto todas salvo las que
+            están en mantenimiento.
+        ahora: momento actual (por defecto `timezone.now()`); los huecos de
+            hoy que ya empezaron se descartan.
+
+    Returns:
+        list[Hueco]
+    """
+    if duracion <= 0 or duracion > BLOQUE_MINUTOS or duracion % PASO_MINUTOS:
+        raise ValueError(
+            f"La duración debe ser múltiplo de {PASO_MINUTOS} minutos y no mayor a "
+            f"{BLOQUE_MINUTOS}."
+        )
+
+    ahora = timezone.localtime(ahora or timezone.now())
+    desde = max(desde, ahora.date())
+
+    lista_canchas = Cancha.objects.exclude(estado="mantenimiento").order_by("id")
+    if canchas is not None:
+        lista_canchas = lista_canchas.filter(id__in=canchas)
+    lista_canchas = list(
+        lista_canchas.values_list("id", "nombre", "horario_apertura", "horario_cierre")
+    )
+    if not lista_canchas or hasta < desde:
+        return []
+
+    ocupacion = cargar_ocupacion([c[0] for c in lista_canchas], desde, hasta)
+    libre = IntervalosOcupados([])
+
+    huecos = []
+    fecha = desde
+    while fecha <= hasta and len(huecos) < limite:
+        minimo = a_minutos(ahora.time()) if fecha == ahora.date() else 0
+        # Candidatos del día de todas las canchas, ya en orden de hora
+        candidatos = sorted(
+            (inicio, cancha_id, nombre)
+            for cancha_id, nombre, apertura, cierre in lista_canchas
+            for inicio in _inicios_validos(apertura, cierre, duracion, minimo)
+        )
+        for inicio, cancha_id, nombre in candidatos:
+            if ocupacion.get((cancha_id, fecha), libre).esta_libre(inicio, inicio + duracion):
+                huecos.append(
+                    Hueco(cancha_id, nombre, fecha, a_hora(inicio), a_hora(inicio + duracion))
+                )
+                if len(huecos) == limite:
+                    break
+        fecha += datetime.timedelta(days=1)
+    return huecos
@@ -0,0 +1,92 @@
+"""
+Caché del estado en tiempo real de las canchas.
+
+El estado de una cancha solo cambia cuando empieza o termina una reserva o
+un partido, así que se guarda en caché hasta la próxima de esas transiciones.
+La clave incluye `version` (que las señales incrementan con cada escritura de
+reservas y partidos de la cancha) y `updated_at` (edición de la cancha): una
+escritura invalida la entrada en todos los procesos sin tener que borrarla.
+"""
+
+import datetime
+import math
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Cancha
+
+CAMPOS_ESTADO = ("estado_actual", "fin_reserva_actual", "fin_partido_actual")
+# Tope de vida de una entrada aunque no haya transiciones previstas
+ESTADO_TTL_MAXIMO = 60 * 60 * 6
+
+
+def clave_estado(cancha):
+    return (
+        f"cancha:estado:{cancha.pk}:{cancha.version}:{cancha.updated_at.timestamp()}"
+    )
+
+
+def _segundos_hasta_transicion(valores, ahora):
+    """Segundos hasta el próximo momento en que el estado puede cambiar."""
+    hoy = ahora.date()
+
+    def momento(hora):
+        return timezone.make_aware(datetime.datetime.combine(hoy, hora))
+
+    candidatos = [
+        # La transición a un nuevo día cambia las reservas que cuentan
+        timezone.make_aware(datetime.datetime.combine(hoy, datetime.time.min))
+        + datetime.timedelta(days=1),
+        ahora + datetime.timedelta(seconds=ESTADO_TTL_MAXIMO),
+    ]
+    if valores["fin_reserva_actual"]:
+        candidatos.append(momento(valores["fin_reserva_actual"]))
+    if valores["fin_partido_actual"]:
+        candidatos.append(valores["fin_partido_actual"])
+    for campo in ("proxima_reserva", "proximo_partido"):
+        if valores[campo]:
+            candidatos.append(momento(valores[campo]))
+    return max(1, math.ceil((min(candidatos) - ahora).total_seconds()))
+
+
+def cargar_estados(canchas, ahora=None):
+    """
+    Asigna `estado_actual`, `fin_reserva_actual` y `fin_partido_actual` a
+    cada cancha, como `Cancha.objects.with_estado_actual()`, leyendo la caché
+    con una sola llamada y consultando la base de datos solo por las canchas
+    que faltan.
+
+    Returns:
+        list[Cancha]
+    """
+    canchas = list(canchas)
+    por_clave = {clave_estado(c): c for c in canchas if c.pk is not None}
+    en_cache = cache.get_many(por_clave)
+
+    faltan = {c.pk: clave for clave, c in por_clave.items() if clave not in en_cache}
+    if faltan:
+        ahora = timezone.localtime(ahora or timezone.now())
+        filas = (
+            Cancha.objects.filter(pk__in=faltan)
+            .with_estado_actual(ahora)
+            .with_proximo_inicio(ahora)
+            .values("pk", *CAMPOS_ESTADO, "proxima_reserva", "proximo_partido")
+        )
+        for fila in filas:
+            valores = {campo: fila[campo] for campo in CAMPOS_ESTADO}
+            clave = faltan[fila["pk"]]
+            cache.set(clave, valores, _segundos_hasta_transicion(fila, ahora))
+            en_cache[clave] = valores
+
+    for cancha in canchas:
+        valores = en_cache.get(clave_estado(cancha)) if cancha.pk is not None else None
+        if valores is None:
+            valores = {
+                "estado_actual": cancha.estado,
+                "fin_reserva_actual": None,
+                "fin_partido_actual": None,
+            }
+        for campo, valor in valores.items():
+            setattr(cancha, campo, valor)
+    return canchas
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:49
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Duración fija de los partidos cuando se creó el índice
+DURACION_PARTIDO = datetime.timedelta(hours=2)
+# Formato del índice cuando se creó: 48 celdas de media hora por día. Copiado
+# aquí para que cambios posteriores en facilities.ocupacion no alteren lo que
+# calcula esta migración
+MINUTOS_POR_SLOT = 30
+SLOTS_POR_DIA = 48
+
+
+def mascara(hora_inicio, hora_fin):
+    # Un fin anterior o igual al inicio cruza la medianoche: hasta el final del día
+    inicio = (hora_inicio.hour * 60 + hora_inicio.minute) // MINUTOS_POR_SLOT
+    if hora_fin <= hora_inicio:
+        fin = SLOTS_POR_DIA
+    else:
+        fin = min(-(-(hora_fin.hour * 60 + hora_fin.minute) // MINUTOS_POR_SLOT), SLOTS_POR_DIA)
+    if fin <= inicio:
+        return 0
+    return ((1 << (fin - inicio)) - 1) << inicio
+
+
+def fin_partido(hora):
+    return (datetime.datetime.combine(datetime.date.min, hora) + DURACION_PARTIDO).time()
+
+
+def poblar_ocupacion(apps, schema_editor):
+    # Construye el índice para las reservas y partidos existentes
+    ReservaCancha = apps.get_model('facilities', 'ReservaCancha')
+    Partido = apps.get_model('competitions', 'Partido')
+    OcupacionCancha = apps.get_model('facilities', 'OcupacionCancha')
+
+    slots = {}
+    reservas = ReservaCancha.objects.exclude(estado='cancelada').values_list(
+        'cancha_id', 'fecha', 'hora_inicio', 'hora_fin'
+    )
+    for cancha_id, fecha, inicio, fin in reservas:
+        clave = (cancha_id, fecha)
+        slots[clave] = slots.get(clave, 0) | mascara(inicio, fin)
+    partidos = Partido.objects.exclude(estado='cancelado').filter(
+        cancha__isnull=False
+    ).values_list('cancha_id', 'fecha', 'hora')
+    for cancha_id, fecha, hora in partidos:
+        clave = (cancha_id, fecha)
+        slots[clave] = slots.get(clave, 0) | mascara(hora, fin_partido(hora))
+
+    OcupacionCancha.objects.bulk_create(
+        [
+            OcupacionCancha(cancha_id=cancha_id, fecha=fecha, slots=valor)
+            for (cancha_id, fecha), valor in slots.items()
+            if valor
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0005_add_updated_at_to_cancha'),
+        ('competitions', '0010_partido_resultado_aplicado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionCancha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('slots', models.BigIntegerField(default=0)),
+                ('cancha', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupaciones', to='facilities.cancha')),
+            ],
+            options={
+                'verbose_name_plural': 'Ocupación de Canchas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ocupacioncancha',
+            constraint=models.UniqueConstraint(fields=('cancha', 'fecha'), name='unique_ocupacion_cancha_fecha'),
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0007_reservacancha_sin_solapamiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cancha',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0008_cancha_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservacancha',
+            index=models.Index(fields=['fecha', 'hora_inicio', 'id'], name='reserva_orden_idx'),
+        ),
+    ]
@@ -1,7 +1,83 @@
 from django.db import models
+from django.utils import timezone
 from users.models import Usuario
 
 
+class CanchaQuerySet(models.QuerySet):
+    def with_estado_actual(self, ahora=None):
+        """
+        Anota el estado en tiempo real (`estado_actual`) y los datos para
+        `proxima_disponibilidad` de todas las canchas en una sola consulta,
+        con subconsultas EXISTS en lugar de dos consultas por cancha.
+        """
+        from competitions.models import Partido
+
+        now = timezone.localtime(ahora or timezone.now())
+        current_time = now.time()
+
+        reservas_activas = ReservaCancha.objects.filter(
+            cancha=models.OuterRef("pk"),
+            fecha=now.date(),
+            hora_inicio__lte=current_time,
+            hora_fin__gte=current_time,
+            estado="confirmada",
+        )
+        # Usa el fin guardado de cada partido, incluso si empezó ayer
+        partidos_activos = (
+            Partido.objects.filter(cancha=models.OuterRef("pk")).activos().en_curso(now)
+        )
+
+        return self.annotate(
+            estado_actual=models.Case(
+                models.When(estado="mantenimiento", then=models.Value("mantenimiento")),
+                models.When(
+                    models.Exists(reservas_activas), then=models.Value("reservada")
+                ),
+                models.When(
+                    models.Exists(partidos_activos), then=models.Value("reservada")
+                ),
+                default=models.Value("disponible"),
+                output_field=models.CharField(),
+            ),
+            fin_reserva_actual=models.Subquery(
+                reservas_activas.order_by("hora_fin").values("hora_fin")[:1]
+            ),
+            fin_partido_actual=models.Subquery(
+                partidos_activos.order_by("-fin").values("fin")[:1]
+            ),
+        )
+
+    def with_proximo_inicio(self, ahora=None):
+        """
+        Anota la próxima reserva confirmada (`proxima_reserva`) y el próximo
+        partido (`proximo_partido`) que empiezan hoy después de `ahora`: son
+        los momentos en que el estado de una cancha libre puede cambiar.
+        """
+        from competitions.models import Partido
+
+        now = timezone.localtime(ahora or timezone.now())
+        return self.annotate(
+            proxima_reserva=models.Subquery(
+                ReservaCancha.objects.filter(
+                    cancha=models.OuterRef("pk"),
+                    fecha=now.date(),
+                    hora_inicio__gt=now.time(),
+                    estado="confirmada",
+                )
+                .order_by("hora_inicio")
+                .values("hora_inicio")[:1]
+            ),
+            proximo_partido=models.Subquery(
+                Partido.objects.filter(
+                    cancha=models.OuterRef("pk"), fecha=now.date(), hora__gt=now.time()
+                )
+                .activos()
+                .order_by("hora")
+                .values("hora")[:1]
+            ),
+        )
+
+
 class Cancha(models.Model):
     nombre = models.CharField(max_length=100)
     ubicacion = models.CharField(max_length=200)
@@ -19,96 +95,54 @@ class Cancha(models.Model):
     descripcion = models.TextField(blank=True, null=True)
     imagen = models.ImageField(upload_to="canchas/", blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Se incrementa (con F()) en cada escritura de reservas o partidos de la
+    # cancha; sirve de ETag y clave de caché para la disponibilidad
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CanchaQuerySet.as_manager()
 
     def __str__(self):
-        return f"{self.nombre} ({self.get_estado_actual()})"
+        # Solo campos guardados: el estado en vivo costaría una consulta por
+        # instancia. Los selects de canchas lo muestran con `usar_estados_en_cache`.
+        return f"{self.nombre} ({self.get_estado_display()})"
+
+    def _cargar_estado_actual(self):
+        """
+        Rellena las anotaciones de `with_estado_actual` cuando la instancia
+        no viene de ese queryset, desde la caché de estados o con una sola
+        consulta.
+        """
+        if not hasattr(self, "estado_actual"):
+            from .estado import cargar_estados
+
+            cargar_estados([self])
 
     def get_estado_actual(self):
         """
         Determina el estado de la cancha en tiempo real.
         Si está en mantenimiento, se respeta.
         Si tiene una reserva o partido en este momento, se marca como reservada.
-        """
-        if self.estado == "mantenimiento":
-            return "mantenimiento"
-
-        from django.utils import timezone
-        import datetime
-
-        now = timezone.now()
-        current_time = now.time()
-        current_date = now.date()
 
-        # Verificar si hay una reserva activa en este preciso momento
-        reserva_activa = ReservaCancha.objects.filter(
-            cancha=self,
-            fecha=current_date,
-            hora_inicio__lte=current_time,
-            hora_fin__gte=current_time,
-            estado="confirmada"
-        ).exists()
-
-        if reserva_activa:
-            return "reservada"
-
-        # Verificar si hay un partido activo (asumimos 2h de duración)
-        # Importamos aquí para evitar importaciones circulares si fuera necesario
-        from competitions.models import Partido
-        
-        # Un partido está activo si comenzó hace menos de 2 horas
-        two_hours_ago = (now - datetime.timedelta(hours=2)).time()
-        
-        partido_activo = Partido.objects.filter(
-            cancha=self,
-            fecha=current_date,
-            hora__lte=current_time,
-            hora__gte=two_hours_ago
-        ).exclude(estado="cancelado").exists()
-
-        if partido_activo:
-            return "reservada"
-
-        return "disponible"
+        Usa la anotación de `Cancha.objects.with_estado_actual()` si existe.
+        """
+        self._cargar_estado_actual()
+        return self.estado_actual
 
     def proxima_disponibilidad(self):
         """
         Devuelve cuándo volverá a estar libre la cancha si está ocupada.
         """
-        if self.get_estado_actual() != "reservada":
+        self._cargar_estado_actual()
+        if self.estado_actual != "reservada":
             return None
 
-        from django.utils import timezone
-        import datetime
-        now = timezone.now()
-        current_time = now.time()
-        
-        # Buscar fin de la reserva actual
-        reserva = ReservaCancha.objects.filter(
-            cancha=self,
-            fecha=now.date(),
-            hora_inicio__lte=current_time,
-            hora_fin__gte=current_time,
-            estado="confirmada"
-        ).order_by('hora_fin').first()
+        # Fin de la reserva actual
+        if self.fin_reserva_actual:
+            return self.fin_reserva_actual
 
-        if reserva:
-            return reserva.hora_fin
-
-        from competitions.models import Partido
-        two_hours_ago = (now - datetime.timedelta(hours=2)).time()
-        partido = Partido.objects.filter(
-            cancha=self,
-            fecha=now.date(),
-            hora__lte=current_time,
-            hora__gte=two_hours_ago
-        ).exclude(estado="cancelado").order_by('-hora').first()
-
-        if partido:
-            # Fin estimado del partido
-            dummy_date = datetime.date.today()
-            dt_inicio = datetime.datetime.combine(dummy_date, partido.hora)
-            dt_fin = dt_inicio + datetime.timedelta(hours=2)
-            return dt_fin.time()
+        if self.fin_partido_actual:
+            # Fin del partido en curso
+            return timezone.localtime(self.fin_partido_actual).time()
 
         return None
 
@@ -139,3 +173,32 @@ class ReservaCancha(models.Model):
     class Meta:
         ordering = ["fecha", "hora_inicio"]
         verbose_name_plural = "Reservas de Canchas"
+        indexes = [
+            # Paginación por cursor de los listados de reservas
+            models.Index(fields=["fecha", "hora_inicio", "id"], name="reserva_orden_idx"),
+        ]
+
+
+class OcupacionCancha(models.Model):
+    """
+    Índice de ocupación por cancha y día: un mapa de bits de 48 celdas de
+    30 minutos (bit 0 = 00:00-00:30). Lo mantienen las señales de
+    `facilities.signals` al guardar reservas y partidos.
+    """
+
+    cancha = models.ForeignKey(
+        Cancha, on_delete=models.CASCADE, related_name="ocupaciones"
+    )
+    fecha = models.DateField()
+    slots = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cancha_id} - {self.fecha}: {self.slots:048b}"
+
+    class Meta:
+        verbose_name_plural = "Ocupación de Canchas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cancha", "fecha"], name="unique_ocupacion_cancha_fecha"
+            )
+        ]
@@ -0,0 +1,247 @@
+"""
+Índice de ocupación de canchas.
+
+Cada día de cada cancha se resume en un entero de 48 bits, una celda por
+media hora. Comprobar si un intervalo está libre es un AND con la máscara
+del intervalo. Las horas que no caen en la media hora exacta ocupan la celda
+completa, así que un bit a 1 solo indica un posible conflicto: en ese caso se
+consulta el detalle exacto con `buscar_conflicto`.
+
+En PostgreSQL la garantía final la dan las restricciones de exclusión
+`reserva_sin_solapamiento` y `partido_sin_solapamiento`; `capturar_solapamiento`
+convierte su violación en un error de formulario.
+"""
+
+import datetime
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+MINUTOS_POR_SLOT = 30
+MINUTOS_POR_DIA = 24 * 60
+SLOTS_POR_DIA = MINUTOS_POR_DIA // MINUTOS_POR_SLOT
+# Duración por defecto de un partido; cada partido guarda la suya
+DURACION_PARTIDO_MINUTOS = 120
+# Un partido nunca dura más de un día, así que como mucho invade el siguiente
+DURACION_MAXIMA_MINUTOS = MINUTOS_POR_DIA
+
+
+def a_minutos(hora):
+    """Minutos desde la medianoche de una hora del día."""
+    return hora.hour * 60 + hora.minute
+
+
+def a_hora(minutos):
+    """Hora del día a `minutos` de la medianoche (inversa de `a_minutos`)."""
+    return datetime.time(minutos // 60, minutos % 60)
+
+
+def momento(fecha, hora):
+    """Fecha y hora locales como datetime aware."""
+    return timezone.make_aware(datetime.datetime.combine(fecha, hora))
+
+
+def fin_partido(fecha, hora, duracion=DURACION_PARTIDO_MINUTOS):
+    """Momento (aware) en que termina un partido de `duracion` minutos."""
+    return momento(fecha, hora) + datetime.timedelta(minutes=duracion)
+
+
+def tramos_partido(fecha, hora, fin):
+    """
+    Divide un partido en tramos por día local, en minutos desde la medianoche:
+    uno solo si termina el mismo día, dos si pasa de medianoche.
+
+    Yields:
+        tuple: (fecha, inicio, fin)
+    """
+    fin = timezone.localtime(fin)
+    dia, inicio = fecha, a_minutos(hora)
+    while dia < fin.date():
+        yield dia, inicio, MINUTOS_POR_DIA
+        dia, inicio = dia + datetime.timedelta(days=1), 0
+    if a_minutos(fin.time()) > inicio:
+        yield dia, inicio, a_minutos(fin.time())
+
+
+def _mascara_minutos(inicio, fin):
+    inicio = inicio // MINUTOS_POR_SLOT
+    fin = min(-(-fin // MINUTOS_POR_SLOT), SLOTS_POR_DIA)
+    if fin <= inicio:
+        return 0
+    return ((1 << (fin - inicio)) - 1) << inicio
+
+
+def mascara(hora_inicio, hora_fin):
+    """
+    Máscara de bits de las celdas que toca el intervalo [hora_inicio, hora_fin).
+    Si el fin es anterior o igual al inicio, el intervalo cruza la medianoche
+    y se marca hasta el final del día.
+    """
+    if hora_fin <= hora_inicio:
+        return _mascara_minutos(a_minutos(hora_inicio), MINUTOS_POR_DIA)
+    return _mascara_minutos(a_minutos(hora_inicio), a_minutos(hora_fin))
+
+
+def _reservas_activas(cancha_id, fecha):
+    from .models import ReservaCancha
+
+    return ReservaCancha.objects.filter(cancha_id=cancha_id, fecha=fecha).exclude(
+        estado="cancelada"
+    )
+
+
+def _partidos_solapados(cancha_id, inicio, fin):
+    from competitions.models import Partido
+
+    return Partido.objects.filter(cancha_id=cancha_id).activos().solapados(inicio, fin)
+
+
+def calcular_slots(cancha_id, fecha):
+    """
+    Reconstruye el mapa de bits de un día a partir de reservas y partidos,
+    incluida la parte de un partido del día anterior que pasa de medianoche.
+    """
+    slots = 0
+    for inicio, fin in _reservas_activas(cancha_id, fecha).values_list(
+        "hora_inicio", "hora_fin"
+    ):
+        slots |= mascara(inicio, fin)
+    dia = momento(fecha, datetime.time.min)
+    partidos = _partidos_solapados(
+        cancha_id, dia, dia + datetime.timedelta(days=1)
+    ).values_list("fecha", "hora", "fin")
+    for p_fecha, p_hora, p_fin in partidos:
+        for tramo_fecha, inicio, fin in tramos_partido(p_fecha, p_hora, p_fin):
+            if tramo_fecha == fecha:
+                slots |= _mascara_minutos(inicio, fin)
+    return slots
+
+
+def actualizar_ocupacion(cancha_id, fecha):
+    """
+    Recalcula y guarda el índice de un día. La fila se bloquea mientras se
+    recalcula para que dos escrituras concurrentes no se pisen.
+    """
+    from .models import OcupacionCancha
+
+    if cancha_id is None or fecha is None:
+        return
+    with transaction.atomic():
+        fila = (
+            OcupacionCancha.objects.select_for_update()
+            .filter(cancha_id=cancha_id, fecha=fecha)
+            .first()
+        )
+        slots = calcular_slots(cancha_id, fecha)
+        if fila:
+            if fila.slots != slots:
+                fila.slots = slots
+                fila.save(update_fields=["slots"])
+        elif slots:
+            OcupacionCancha.objects.create(cancha_id=cancha_id, fecha=fecha, slots=slots)
+
+
+def incrementar_version(*cancha_ids):
+    """
+    Incrementa atómicamente la versión de las canchas indicadas para
+    invalidar ETags y cachés de disponibilidad. No toca `updated_at`.
+    """
+    from django.db.models import F
+
+    from .models import Cancha
+
+    ids = {cancha_id for cancha_id in cancha_ids if cancha_id is not None}
+    if ids:
+        Cancha.objects.filter(pk__in=ids).update(version=F("version") + 1)
+
+
+def obtener_slots(cancha_id, fecha):
+    """Mapa de bits de un día (0 si no hay nada registrado)."""
+    from .models import OcupacionCancha
+
+    return (
+        OcupacionCancha.objects.filter(cancha_id=cancha_id, fecha=fecha)
+        .values_list("slots", flat=True)
+        .first()
+        or 0
+    )
+
+
+def esta_libre(cancha_id, fecha, hora_inicio, hora_fin):
+    """
+    True si ninguna celda del intervalo está ocupada. Un False solo indica
+    un posible conflicto; `buscar_conflicto` da el detalle exacto.
+    """
+    return not obtener_slots(cancha_id, fecha) & mascara(hora_inicio, hora_fin)
+
+
+def buscar_conflicto(
+    cancha_id, fecha, hora_inicio, hora_fin, excluir_reserva=None, excluir_partido=None
+):
+    """
+    Busca la primera reserva o partido que se solapa exactamente con el
+    intervalo, usando primero el índice como filtro rápido. Un `hora_fin`
+    anterior o igual a `hora_inicio` indica que el intervalo pasa de
+    medianoche.
+
+    Returns:
+        tuple | None: ("reserva" | "partido", hora_inicio, hora_fin) o None.
+    """
+    cruza_medianoche = hora_fin <= hora_inicio
+    siguiente = fecha + datetime.timedelta(days=1)
+    if esta_libre(cancha_id, fecha, hora_inicio, hora_fin) and (
+        not cruza_medianoche
+        or esta_libre(cancha_id, siguiente, datetime.time.min, hora_fin)
+    ):
+        return None
+
+    reservas = _reservas_activas(cancha_id, fecha).filter(hora_fin__gt=hora_inicio)
+    if not cruza_medianoche:
+        reservas = reservas.filter(hora_inicio__lt=hora_fin)
+    if excluir_reserva:
+        reservas = reservas.exclude(pk=excluir_reserva)
+    reserva = reservas.order_by("hora_inicio").values_list("hora_inicio", "hora_fin").first()
+    if reserva:
+        return ("reserva", *reserva)
+
+    inicio = momento(fecha, hora_inicio)
+    fin = momento(siguiente if cruza_medianoche else fecha, hora_fin)
+    partidos = _partidos_solapados(cancha_id, inicio, fin)
+    if excluir_partido:
+        partidos = partidos.exclude(pk=excluir_partido)
+    partido = partidos.order_by("fecha", "hora").values_list("hora", "fin").first()
+    if partido:
+        return ("partido", partido[0], timezone.localtime(partido[1]).time())
+    return None
+
+
+# SQLSTATE de PostgreSQL para una violación de restricción EXCLUDE
+EXCLUSION_VIOLATION = "23P01"
+MENSAJE_SOLAPAMIENTO = (
+    "Ese horario acaba de ser ocupado por otra reserva o partido. "
+    "Por favor, elige otro."
+)
+
+
+def es_violacion_solapamiento(error):
+    """True si el IntegrityError viene de las restricciones `*_sin_solapamiento`."""
+    causa = error.__cause__
+    codigo = getattr(causa, "pgcode", None) or getattr(causa, "sqlstate", None)
+    return codigo == EXCLUSION_VIOLATION
+
+
+@contextmanager
+def capturar_solapamiento(form):
+    """
+    Guarda dentro de una transacción y convierte el choque detectado por la
+    base de datos (otra petición ocupó el horario entre la validación y el
+    INSERT) en un error no asociado a campo del formulario.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as error:
+        if not es_violacion_solapamiento(error):
+            raise
+        form.add_error(None, MENSAJE_SOLAPAMIENTO)
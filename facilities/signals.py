@@ -0,0 +1,148 @@
+"""
+Señales que mantienen el índice de ocupación (`OcupacionCancha`) y la
+versión de cada cancha al día cuando se guardan o eliminan reservas y
+partidos (o se renombra un torneo con partidos en ella), y que publican el cambio a los calendarios abiertos una vez
+confirmada la transacción.
+"""
+
+import datetime
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .broadcast import canal_cancha, get_broadcaster
+from .models import ReservaCancha
+from .ocupacion import actualizar_ocupacion, incrementar_version, tramos_partido
+
+# Campos que cambian la ocupación de un día
+CAMPOS_RESERVA = {"cancha", "cancha_id", "fecha", "hora_inicio", "hora_fin", "estado"}
+CAMPOS_PARTIDO = {"cancha", "cancha_id", "fecha", "hora", "duracion", "fin", "estado"}
+
+
+def _afecta_ocupacion(sender, update_fields):
+    """Un save(update_fields=...) que no toca estos campos no recalcula nada."""
+    if update_fields is None:
+        return True
+    campos = CAMPOS_RESERVA if sender is ReservaCancha else CAMPOS_PARTIDO
+    return bool(set(update_fields) & campos)
+
+
+def _valor(instance, campo):
+    # Al crear con cadenas ("10:00") el atributo aún no está convertido
+    return instance._meta.get_field(campo).to_python(getattr(instance, campo))
+
+
+def _dias(sender, cancha_id, fecha, hora=None, fin=None):
+    """Claves (cancha, día) que ocupa una fila; un partido puede tocar dos días."""
+    if sender is ReservaCancha or fin is None:
+        return [(cancha_id, fecha)]
+    return [(cancha_id, dia) for dia, _, _ in tramos_partido(fecha, hora, fin)] or [
+        (cancha_id, fecha)
+    ]
+
+
+def _dias_instancia(instance):
+    if isinstance(instance, ReservaCancha):
+        return _dias(ReservaCancha, instance.cancha_id, _valor(instance, "fecha"))
+    return _dias(
+        type(instance),
+        instance.cancha_id,
+        _valor(instance, "fecha"),
+        _valor(instance, "hora"),
+        instance.fin,
+    )
+
+
+def _guardar_clave_anterior(sender, instance, update_fields=None, **kwargs):
+    """Recuerda los días previos de la fila para limpiar los que deja."""
+    instance._ocupacion_anterior = []
+    if instance.pk and _afecta_ocupacion(sender, update_fields):
+        campos = ["cancha_id", "fecha"]
+        if sender is not ReservaCancha:
+            campos += ["hora", "fin"]
+        fila = sender.objects.filter(pk=instance.pk).values_list(*campos).first()
+        if fila:
+            instance._ocupacion_anterior = _dias(sender, *fila)
+
+
+def _datos_evento(instance, accion):
+    """Evento compacto para el calendario: intervalo en HH:MM y estado."""
+    if isinstance(instance, ReservaCancha):
+        datos = {
+            "tipo": "reserva",
+            "inicio": _valor(instance, "hora_inicio").strftime("%H:%M"),
+            "fin": _valor(instance, "hora_fin").strftime("%H:%M"),
+            "jugador": instance.jugador_id,
+        }
+        cancelado = instance.estado == "cancelada"
+    else:
+        datos = {
+            "tipo": "partido",
+            "inicio": _valor(instance, "hora").strftime("%H:%M"),
+            "fin": timezone.localtime(instance.fin).strftime("%H:%M"),
+        }
+        cancelado = instance.estado == "cancelado"
+    datos.update(
+        {
+            "id": instance.pk,
+            "accion": "eliminado" if accion == "eliminado" or cancelado else accion,
+            "fecha": _valor(instance, "fecha").isoformat(),
+            "estado": instance.estado,
+        }
+    )
+    return datos
+
+
+def _publicar_al_confirmar(cancha_id, fecha, datos):
+    if cancha_id is None or fecha is None:
+        return
+    fecha = datetime.date.fromisoformat(str(fecha))
+    transaction.on_commit(
+        partial(get_broadcaster().publicar, canal_cancha(cancha_id, fecha), datos)
+    )
+
+
+def _actualizar_tras_guardar(sender, instance, update_fields=None, **kwargs):
+    if not _afecta_ocupacion(sender, update_fields):
+        return
+    actuales = _dias_instancia(instance)
+    anteriores = getattr(instance, "_ocupacion_anterior", None) or []
+    for clave in anteriores:
+        if clave not in actuales:
+            actualizar_ocupacion(*clave)
+            # Quien mira el día anterior debe ver desaparecer el bloque
+            datos = dict(_datos_evento(instance, "eliminado"), fecha=str(clave[1]))
+            _publicar_al_confirmar(*clave, datos)
+    for clave in actuales:
+        actualizar_ocupacion(*clave)
+    incrementar_version(*(cancha_id for cancha_id, _ in anteriores + actuales))
+    for clave in actuales:
+        _publicar_al_confirmar(*clave, _datos_evento(instance, "guardado"))
+
+
+def _actualizar_tras_eliminar(sender, instance, **kwargs):
+    dias = _dias_instancia(instance)
+    for clave in dias:
+        actualizar_ocupacion(*clave)
+    incrementar_version(instance.cancha_id)
+    for clave in dias:
+        _publicar_al_confirmar(*clave, _datos_evento(instance, "eliminado"))
+
+
+def _actualizar_tras_guardar_torneo(sender, instance, created, update_fields=None, **kwargs):
+    """El nombre del torneo es el título de sus partidos en el calendario."""
+    if created or (update_fields is not None and "nombre" not in update_fields):
+        return
+    incrementar_version(
+        *instance.partidos.exclude(cancha=None).values_list("cancha_id", flat=True).distinct()
+    )
+
+
+post_save.connect(_actualizar_tras_guardar_torneo, sender="competitions.Torneo")
+
+for modelo in (ReservaCancha, "competitions.Partido"):
+    pre_save.connect(_guardar_clave_anterior, sender=modelo)
+    post_save.connect(_actualizar_tras_guardar, sender=modelo)
+    post_delete.connect(_actualizar_tras_eliminar, sender=modelo)
@@ -0,0 +1,157 @@
+import asyncio
+import datetime
+
+from django.test import TestCase, override_settings
+
+from facilities import broadcast
+from facilities.broadcast import BroadcasterEnMemoria, canal_cancha, get_broadcaster
+from facilities.models import Cancha, ReservaCancha
+from users.models import Usuario
+
+
+class BroadcasterDePrueba:
+    """Broadcaster that only records what is published"""
+
+    def __init__(self):
+        self.publicados = []
+
+    def publicar(self, canal, datos):
+        self.publicados.append((canal, datos))
+        return len(self.publicados)
+
+
+class BroadcasterEnMemoriaTestCase(TestCase):
+    """Tests for the in-process publish/subscribe broadcaster"""
+
+    def setUp(self):
+        self.broadcaster = BroadcasterEnMemoria()
+        self.canal = canal_cancha(1, datetime.date(2025, 6, 14))
+
+    def test_subscribers_receive_published_events(self):
+        """Test that only subscribers of a channel receive its events"""
+
+        async def escenario():
+            suscripcion = self.broadcaster.suscribir([self.canal])
+            self.broadcaster.publicar("cancha:2:2025-06-14", {"id": 1})
+            id_evento = self.broadcaster.publicar(self.canal, {"id": 2})
+            evento = await suscripcion.siguiente(timeout=1)
+            vacio = await suscripcion.siguiente(timeout=0.01)
+            suscripcion.cerrar()
+            return id_evento, evento, vacio
+
+        id_evento, evento, vacio = asyncio.run(escenario())
+        self.assertEqual(evento, {"id": id_evento, "canal": self.canal, "datos": {"id": 2}})
+        self.assertIsNone(vacio)
+
+    def test_last_event_id_replays_missed_events(self):
+        """Test that reconnecting with Last-Event-ID replays newer events only"""
+
+        async def escenario():
+            otro = self.broadcaster.suscribir([self.canal])
+            primero = self.broadcaster.publicar(self.canal, {"id": 1})
+            self.broadcaster.publicar(self.canal, {"id": 2})
+            suscripcion = self.broadcaster.suscribir([self.canal], ultimo_id=primero)
+            evento = await suscripcion.siguiente(timeout=1)
+            vacio = await suscripcion.siguiente(timeout=0.01)
+            suscripcion.cerrar()
+            otro.cerrar()
+            return evento, vacio
+
+        evento, vacio = asyncio.run(escenario())
+        self.assertEqual(evento["datos"], {"id": 2})
+        self.assertIsNone(vacio)
+
+    def test_unknown_last_event_id_replays_nothing(self):
+        """Test that an id this process never issued does not replay history"""
+
+        async def escenario():
+            otro = self.broadcaster.suscribir([self.canal])
+            primero = self.broadcaster.publicar(self.canal, {"id": 1})
+            self.broadcaster.publicar(self.canal, {"id": 2})
+            suscripcion = self.broadcaster.suscribir([self.canal], ultimo_id=primero - 1)
+            vacio = await suscripcion.siguiente(timeout=0.01)
+            suscripcion.cerrar()
+            otro.cerrar()
+            return vacio
+
+        self.assertIsNone(asyncio.run(escenario()))
+
+    def test_channels_without_subscribers_keep_nothing(self):
+        """Test that publishing to an empty channel is skipped and history is evicted"""
+        self.assertIsNone(self.broadcaster.publicar(self.canal, {"id": 1}))
+        self.assertEqual(self.broadcaster._historial, {})
+
+        async def escenario():
+            suscripcion = self.broadcaster.suscribir([self.canal])
+            self.assertIsNotNone(self.broadcaster.publicar(self.canal, {"id": 2}))
+            suscripcion.cerrar()
+
+        asyncio.run(escenario())
+        self.assertEqual(self.broadcaster._historial, {})
+
+    def test_closed_subscription_is_removed(self):
+        """Test that closing a subscription leaves no listeners behind"""
+
+        async def escenario():
+            self.broadcaster.suscribir([self.canal]).cerrar()
+
+        asyncio.run(escenario())
+        self.assertEqual(self.broadcaster._suscripciones, {})
+
+
+@override_settings(BROADCASTER="facilities.test_broadcast.BroadcasterDePrueba")
+class PublicacionCambiosTestCase(TestCase):
+    """Tests for publishing committed availability changes"""
+
+    def setUp(self):
+        broadcast._broadcaster = None
+        self.fecha = datetime.date.today() + datetime.timedelta(days=5)
+        self.jugador = Usuario.objects.create_user(
+            cedula="60000101",
+            password="testpass123",
+            email="60000101@example.com",
+            es_jugador=True,
+        )
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+
+    def tearDown(self):
+        broadcast._broadcaster = None
+
+    def test_broadcaster_is_configurable(self):
+        """Test that the BROADCASTER setting selects the implementation"""
+        self.assertIsInstance(get_broadcaster(), BroadcasterDePrueba)
+
+    def test_changes_are_published_on_commit(self):
+        """Test that saves, moves and deletes are published after commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = ReservaCancha.objects.create(
+                cancha=self.cancha,
+                jugador=self.jugador,
+                fecha=self.fecha,
+                hora_inicio=datetime.time(10, 0),
+                hora_fin=datetime.time(11, 0),
+                estado="confirmada",
+            )
+            self.assertEqual(get_broadcaster().publicados, [])
+
+        canal, datos = get_broadcaster().publicados[-1]
+        self.assertEqual(canal, canal_cancha(self.cancha.pk, self.fecha))
+        self.assertEqual(datos["accion"], "guardado")
+        self.assertEqual((datos["inicio"], datos["fin"]), ("10:00", "11:00"))
+
+        nueva_fecha = self.fecha + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.fecha = nueva_fecha
+            reserva.save()
+        self.assertEqual(
+            [(c, d["accion"]) for c, d in get_broadcaster().publicados[-2:]],
+            [
+                (canal_cancha(self.cancha.pk, self.fecha), "eliminado"),
+                (canal_cancha(self.cancha.pk, nueva_fecha), "guardado"),
+            ],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.delete()
+        canal, datos = get_broadcaster().publicados[-1]
+        self.assertEqual((canal, datos["accion"]), (canal_cancha(self.cancha.pk, nueva_fecha), "eliminado"))
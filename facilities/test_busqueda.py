@@ -0,0 +1,124 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from competitions.models import Partido
+from facilities.busqueda import IntervalosOcupados, buscar_huecos
+from facilities.models import Cancha, ReservaCancha
+from users.models import Usuario
+
+
+def hora(texto):
+    return datetime.datetime.strptime(texto, "%H:%M").time()
+
+
+class IntervalosOcupadosTestCase(TestCase):
+    """Tests for the merged, sorted busy-interval structure"""
+
+    def test_overlapping_intervals_are_merged(self):
+        """Test that touching and overlapping intervals collapse into one"""
+        ocupados = IntervalosOcupados([(600, 660), (480, 540), (540, 600), (630, 700)])
+        self.assertEqual((ocupados.inicios, ocupados.fines), ([480], [700]))
+
+    def test_free_checks(self):
+        """Test that only intervals that really overlap are busy"""
+        ocupados = IntervalosOcupados([(600, 720)])
+        self.assertTrue(ocupados.esta_libre(480, 600))
+        self.assertTrue(ocupados.esta_libre(720, 840))
+        self.assertFalse(ocupados.esta_libre(690, 750))
+        self.assertFalse(ocupados.esta_libre(540, 840))
+
+
+class BuscarHuecosTestCase(TestCase):
+    """Tests for the earliest free slot search across courts"""
+
+    def setUp(self):
+        self.ahora = timezone.make_aware(datetime.datetime(2025, 6, 10, 7, 0))
+        self.fecha = self.ahora.date()
+        self.jugador = Usuario.objects.create_user(
+            cedula="80000001",
+            password="testpass123",
+            email="80000001@example.com",
+            es_jugador=True,
+        )
+        self.a = Cancha.objects.create(nombre="A", ubicacion="X", estado="disponible")
+        self.b = Cancha.objects.create(
+            nombre="B",
+            ubicacion="X",
+            estado="disponible",
+            horario_apertura=hora("10:00"),
+        )
+
+    def reservar(self, cancha, inicio, fin, fecha=None):
+        ReservaCancha.objects.create(
+            cancha=cancha,
+            jugador=self.jugador,
+            fecha=fecha or self.fecha,
+            hora_inicio=hora(inicio),
+            hora_fin=hora(fin),
+            estado="confirmada",
+        )
+
+    def buscar(self, duracion, limite=3, **kwargs):
+        return [
+            (h.cancha_nombre, h.hora_inicio.strftime("%H:%M"), h.hora_fin.strftime("%H:%M"))
+            for h in buscar_huecos(
+                self.fecha, self.fecha, duracion, limite=limite, ahora=self.ahora, **kwargs
+            )
+        ]
+
+    def test_earliest_slots_across_courts(self):
+        """Test that busy slots are skipped and results interleave courts"""
+        self.reservar(self.a, "08:00", "10:00")
+        Partido.objects.create(cancha=self.a, fecha=self.fecha, hora=hora("10:00"))
+        self.assertEqual(
+            self.buscar(120),
+            [("B", "10:00", "12:00"), ("A", "12:00", "14:00"), ("B", "12:00", "14:00")],
+        )
+
+    def test_slots_respect_two_hour_blocks(self):
+        """Test that a 90 minute slot never crosses a block boundary"""
+        self.reservar(self.a, "08:00", "08:30")
+        self.assertEqual(
+            self.buscar(90, limite=2, canchas=[self.a.pk]),
+            [("A", "08:30", "10:00"), ("A", "10:00", "11:30")],
+        )
+
+    def test_slots_respect_closing_time(self):
+        """Test that no slot ends after the court closes"""
+        self.a.horario_cierre = hora("11:00")
+        self.a.save()
+        self.assertEqual(
+            self.buscar(60, limite=5, canchas=[self.a.pk]),
+            [
+                ("A", "08:00", "09:00"),
+                ("A", "08:30", "09:30"),
+                ("A", "09:00", "10:00"),
+                ("A", "10:00", "11:00"),
+            ],
+        )
+
+    def test_past_slots_today_are_skipped(self):
+        """Test that slots that already started today are not offered"""
+        self.ahora = self.ahora.replace(hour=9, minute=10)
+        self.assertEqual(self.buscar(30, limite=1, canchas=[self.a.pk]), [("A", "09:30", "10:00")])
+
+    def test_query_count_is_constant(self):
+        """Test that the search loads courts, reservations and matches once each"""
+        for cancha in (self.a, self.b):
+            for inicio, fin in (("08:00", "10:00"), ("10:00", "12:00"), ("12:00", "14:00")):
+                self.reservar(cancha, inicio, fin)
+        with self.assertNumQueries(3):
+            buscar_huecos(
+                self.fecha,
+                self.fecha + datetime.timedelta(days=6),
+                120,
+                limite=20,
+                ahora=self.ahora,
+            )
+
+    def test_invalid_duration(self):
+        """Test that durations outside the block rule are rejected"""
+        with self.assertRaises(ValueError):
+            buscar_huecos(self.fecha, self.fecha, 150)
@@ -0,0 +1,198 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from competitions.models import Partido
+from core.forms import ReservaCanchaForm
+from facilities.estado import CAMPOS_ESTADO, _segundos_hasta_transicion, cargar_estados
+from facilities.models import Cancha, ReservaCancha
+from users.models import Usuario
+
+
+class EstadoActualTestCase(TestCase):
+    """Tests for the batch-annotated real-time court status"""
+
+    def setUp(self):
+        self.ahora = timezone.make_aware(datetime.datetime(2025, 6, 10, 11, 0))
+        self.jugador = Usuario.objects.create_user(
+            cedula="50000001", password="testpass123", es_jugador=True
+        )
+        self.libre = Cancha.objects.create(nombre="Libre", ubicacion="A", estado="disponible")
+        self.reservada = Cancha.objects.create(
+            nombre="Reservada", ubicacion="B", estado="disponible"
+        )
+        self.con_partido = Cancha.objects.create(
+            nombre="Partido", ubicacion="C", estado="disponible"
+        )
+        self.taller = Cancha.objects.create(
+            nombre="Taller", ubicacion="D", estado="mantenimiento"
+        )
+        hoy = self.ahora.date()
+        ReservaCancha.objects.create(
+            cancha=self.reservada,
+            jugador=self.jugador,
+            fecha=hoy,
+            hora_inicio=datetime.time(10, 0),
+            hora_fin=datetime.time(12, 0),
+            estado="confirmada",
+        )
+        Partido.objects.create(
+            cancha=self.con_partido, fecha=hoy, hora=datetime.time(10, 0)
+        )
+
+    def test_annotation_in_single_query(self):
+        """Test that every court gets its live status from one query"""
+        with self.assertNumQueries(1):
+            canchas = {
+                c.nombre: (c.estado_actual, c.proxima_disponibilidad())
+                for c in Cancha.objects.with_estado_actual(self.ahora)
+            }
+        self.assertEqual(
+            canchas,
+            {
+                "Libre": ("disponible", None),
+                "Reservada": ("reservada", datetime.time(12, 0)),
+                "Partido": ("reservada", datetime.time(12, 0)),
+                "Taller": ("mantenimiento", None),
+            },
+        )
+
+    def test_stored_duration_and_midnight(self):
+        """Test that the stored end is used, also for matches started yesterday"""
+        hoy = self.ahora.date()
+        Partido.objects.create(
+            cancha=self.libre, fecha=hoy, hora=datetime.time(8, 0), duracion=210
+        )
+        Partido.objects.create(
+            cancha=self.taller,
+            fecha=hoy - datetime.timedelta(days=1),
+            hora=datetime.time(23, 0),
+            duracion=180,
+        )
+        Cancha.objects.filter(pk=self.taller.pk).update(estado="disponible")
+        medianoche = timezone.make_aware(datetime.datetime.combine(hoy, datetime.time(1, 0)))
+
+        libre = Cancha.objects.with_estado_actual(self.ahora).get(pk=self.libre.pk)
+        taller = Cancha.objects.with_estado_actual(medianoche).get(pk=self.taller.pk)
+        self.assertEqual(libre.proxima_disponibilidad(), datetime.time(11, 30))
+        self.assertEqual(taller.proxima_disponibilidad(), datetime.time(2, 0))
+
+    def test_str_uses_stored_fields(self):
+        """Test that __str__ shows the stored status without querying"""
+        cancha = Cancha.objects.get(pk=self.reservada.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(cancha), "Reservada (Disponible)")
+
+    def test_unannotated_instance_falls_back(self):
+        """Test that a plain instance loads its status in a single query"""
+        cancha = Cancha.objects.get(pk=self.taller.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cancha.get_estado_actual(), "mantenimiento")
+            self.assertIsNone(cancha.proxima_disponibilidad())
+
+    def test_form_choices_do_not_scale_with_courts(self):
+        """Test that the court select loads all statuses at once, then from cache"""
+        cache.clear()
+        with self.assertNumQueries(2):
+            ReservaCanchaForm()["cancha"].as_widget()
+        with self.assertNumQueries(1):
+            ReservaCanchaForm()["cancha"].as_widget()
+
+
+class EstadoEnCacheTestCase(TestCase):
+    """Tests for caching the live court status until its next transition"""
+
+    def setUp(self):
+        cache.clear()
+        self.ahora = timezone.make_aware(datetime.datetime(2025, 6, 10, 11, 0))
+        self.jugador = Usuario.objects.create_user(
+            cedula="50000002", password="testpass123", es_jugador=True
+        )
+        self.reservada = Cancha.objects.create(
+            nombre="Reservada", ubicacion="A", estado="disponible"
+        )
+        self.libre = Cancha.objects.create(nombre="Libre", ubicacion="B", estado="disponible")
+        self.reservar(self.reservada, 10, 12)
+
+    def reservar(self, cancha, inicio, fin):
+        return ReservaCancha.objects.create(
+            cancha=cancha,
+            jugador=self.jugador,
+            fecha=self.ahora.date(),
+            hora_inicio=datetime.time(inicio, 0),
+            hora_fin=datetime.time(fin, 0),
+            estado="confirmada",
+        )
+
+    def estados(self):
+        return {
+            c.nombre: c.estado_actual
+            for c in cargar_estados(Cancha.objects.all(), self.ahora)
+        }
+
+    def test_second_load_is_served_from_cache(self):
+        """Test that a repeated load needs no status query"""
+        canchas = list(Cancha.objects.all())
+        with self.assertNumQueries(1):
+            cargar_estados(canchas, self.ahora)
+
+        canchas = list(Cancha.objects.all())
+        with self.assertNumQueries(0):
+            cargar_estados(canchas, self.ahora)
+        self.assertEqual(
+            {c.nombre: c.estado_actual for c in canchas},
+            {"Reservada": "reservada", "Libre": "disponible"},
+        )
+
+    def test_writes_invalidate_the_entry(self):
+        """Test that a reservation write changes the cached status"""
+        self.assertEqual(self.estados()["Libre"], "disponible")
+        reserva = self.reservar(self.libre, 10, 12)
+        self.assertEqual(self.estados()["Libre"], "reservada")
+        reserva.delete()
+        self.assertEqual(self.estados()["Libre"], "disponible")
+
+    def test_ttl_ends_at_next_transition(self):
+        """Test that entries expire when a booking ends or starts"""
+        self.reservar(self.libre, 15, 16)
+        filas = {
+            fila["nombre"]: fila
+            for fila in Cancha.objects.with_estado_actual(self.ahora)
+            .with_proximo_inicio(self.ahora)
+            .values("nombre", *CAMPOS_ESTADO, "proxima_reserva", "proximo_partido")
+        }
+        self.assertEqual(_segundos_hasta_transicion(filas["Reservada"], self.ahora), 3600)
+        self.assertEqual(_segundos_hasta_transicion(filas["Libre"], self.ahora), 4 * 3600)
+
+        Partido.objects.create(
+            cancha=self.libre, fecha=self.ahora.date(), hora=datetime.time(13, 0)
+        )
+        fila = (
+            Cancha.objects.filter(pk=self.libre.pk)
+            .with_estado_actual(self.ahora)
+            .with_proximo_inicio(self.ahora)
+            .values(*CAMPOS_ESTADO, "proxima_reserva", "proximo_partido")
+            .get()
+        )
+        self.assertEqual(_segundos_hasta_transicion(fila, self.ahora), 2 * 3600)
+
+    def test_court_list_status_costs_no_queries_when_cached(self):
+        """Test that the admin court list reads court status from the cache"""
+        admin = Usuario.objects.create_user(
+            cedula="50000003",
+            password="testpass123",
+            email="50000003@example.com",
+            es_admin_aso=True,
+        )
+        self.client.force_login(admin)
+        url = reverse("core:admin_canchas_list")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # La consulta de estado es la única con el CASE de `with_estado_actual`
+        self.assertEqual([q["sql"] for q in consultas if "CASE" in q["sql"]], [])
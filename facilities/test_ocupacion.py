@@ -0,0 +1,239 @@
+import datetime
+
+from django import forms
+from django.db import IntegrityError
+from django.test import TestCase
+
+from competitions.models import Partido
+from core.forms import PartidoSchedulingForm, ReservaCanchaForm
+from facilities.models import Cancha, OcupacionCancha, ReservaCancha
+from facilities.ocupacion import (
+    MENSAJE_SOLAPAMIENTO,
+    buscar_conflicto,
+    capturar_solapamiento,
+    esta_libre,
+    fin_partido,
+    mascara,
+    obtener_slots,
+)
+from users.models import Usuario
+
+
+def hora(texto):
+    return datetime.datetime.strptime(texto, "%H:%M").time()
+
+
+class MascaraTestCase(TestCase):
+    """Tests for the half-hour slot masks"""
+
+    def test_aligned_interval(self):
+        """Test that 08:00-10:00 covers slots 16 to 19"""
+        self.assertEqual(mascara(hora("08:00"), hora("10:00")), 0b1111 << 16)
+
+    def test_partial_slots_are_covered(self):
+        """Test that a non-aligned interval marks the whole touched slots"""
+        self.assertEqual(mascara(hora("08:15"), hora("08:45")), 0b11 << 16)
+
+    def test_interval_past_midnight(self):
+        """Test that an interval ending after midnight fills the rest of the day"""
+        self.assertEqual(mascara(hora("23:00"), hora("01:00")), 0b11 << 46)
+
+
+class OcupacionCanchaTestCase(TestCase):
+    """Tests for the occupancy index maintained by signals"""
+
+    def setUp(self):
+        self.fecha = datetime.date.today() + datetime.timedelta(days=7)
+        self.jugador = Usuario.objects.create_user(
+            cedula="60000001",
+            password="testpass123",
+            email="60000001@example.com",
+            es_jugador=True,
+        )
+        self.cancha = Cancha.objects.create(nombre="Central", ubicacion="A", estado="disponible")
+
+    def reservar(self, inicio, fin, estado="confirmada"):
+        return ReservaCancha.objects.create(
+            cancha=self.cancha,
+            jugador=self.jugador,
+            fecha=self.fecha,
+            hora_inicio=hora(inicio),
+            hora_fin=hora(fin),
+            estado=estado,
+        )
+
+    def test_index_follows_writes(self):
+        """Test that saving, moving and cancelling rows keeps the bitmap exact"""
+        reserva = self.reservar("10:00", "11:00")
+        Partido.objects.create(cancha=self.cancha, fecha=self.fecha, hora=hora("14:00"))
+        self.assertEqual(
+            obtener_slots(self.cancha.pk, self.fecha),
+            mascara(hora("10:00"), hora("11:00")) | mascara(hora("14:00"), hora("16:00")),
+        )
+
+        # Mover la reserva a otro día limpia el día anterior
+        reserva.fecha = self.fecha + datetime.timedelta(days=1)
+        reserva.save()
+        self.assertEqual(
+            obtener_slots(self.cancha.pk, self.fecha), mascara(hora("14:00"), hora("16:00"))
+        )
+        self.assertTrue(esta_libre(self.cancha.pk, self.fecha, hora("10:00"), hora("11:00")))
+
+        reserva.estado = "cancelada"
+        reserva.save()
+        self.assertEqual(obtener_slots(self.cancha.pk, reserva.fecha), 0)
+
+    def test_delete_clears_slots(self):
+        """Test that deleting a reservation frees its slots"""
+        reserva = self.reservar("10:00", "12:00")
+        reserva.delete()
+        self.assertEqual(obtener_slots(self.cancha.pk, self.fecha), 0)
+
+    def test_unrelated_update_fields_skip_recalculation(self):
+        """Test that saving fields unrelated to occupancy does not touch the index"""
+        partido = Partido.objects.create(
+            cancha=self.cancha, fecha=self.fecha, hora=hora("10:00")
+        )
+        with self.assertNumQueries(1):
+            partido.save(update_fields=["marcador"])
+
+    def test_free_interval_needs_one_query(self):
+        """Test that a conflict check on a free interval is a single lookup"""
+        self.reservar("10:00", "12:00")
+        with self.assertNumQueries(1):
+            self.assertIsNone(
+                buscar_conflicto(self.cancha.pk, self.fecha, hora("12:00"), hora("14:00"))
+            )
+
+    def test_partial_slot_is_confirmed_exactly(self):
+        """Test that a shared half-hour slot without real overlap is not a conflict"""
+        self.reservar("10:00", "10:15")
+        self.assertFalse(
+            esta_libre(self.cancha.pk, self.fecha, hora("10:15"), hora("11:00"))
+        )
+        self.assertIsNone(
+            buscar_conflicto(self.cancha.pk, self.fecha, hora("10:15"), hora("11:00"))
+        )
+
+    def test_reservation_form_reports_match_overlap(self):
+        """Test that a reservation overlapping a match is rejected"""
+        Partido.objects.create(cancha=self.cancha, fecha=self.fecha, hora=hora("10:00"))
+        form = ReservaCanchaForm(
+            data={
+                "cancha": self.cancha.pk,
+                "fecha": self.fecha.isoformat(),
+                "hora_inicio": "11:00",
+                "hora_fin": "12:00",
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            "Conflicto: Hay un partido programado de 10:00 a 12:00",
+            form.non_field_errors(),
+        )
+
+    def test_scheduling_form_detects_overlapping_match(self):
+        """Test that a match starting inside another match is rejected"""
+        Partido.objects.create(cancha=self.cancha, fecha=self.fecha, hora=hora("09:00"))
+        rival = Usuario.objects.create_user(
+            cedula="60000002",
+            password="testpass123",
+            email="60000002@example.com",
+            es_jugador=True,
+        )
+        form = PartidoSchedulingForm(
+            data={
+                "es_casual": True,
+                "cancha": self.cancha.pk,
+                "fecha": self.fecha.isoformat(),
+                "hora": "10:00",
+                "equipo1_jugador1": self.jugador.pk,
+                "equipo2_jugador1": rival.pk,
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            "La cancha ya tiene un partido programado de 09:00 a 11:00",
+            form.non_field_errors(),
+        )
+
+    def test_writes_bump_court_version(self):
+        """Test that reservation and match writes bump the court version only"""
+        actualizada = Cancha.objects.get(pk=self.cancha.pk).updated_at
+        reserva = self.reservar("10:00", "11:00")
+        Partido.objects.create(cancha=self.cancha, fecha=self.fecha, hora=hora("14:00"))
+        reserva.delete()
+
+        cancha = Cancha.objects.get(pk=self.cancha.pk)
+        self.assertEqual(cancha.version, 3)
+        self.assertEqual(cancha.updated_at, actualizada)
+
+    def test_match_duration_is_stored(self):
+        """Test that the end follows the duration, also after a partial update"""
+        partido = Partido.objects.create(
+            cancha=self.cancha, fecha=self.fecha, hora=hora("10:00"), duracion=90
+        )
+        self.assertEqual(partido.fin, fin_partido(self.fecha, hora("10:00"), 90))
+        self.assertEqual(
+            buscar_conflicto(self.cancha.pk, self.fecha, hora("11:00"), hora("12:00")),
+            ("partido", hora("10:00"), hora("11:30")),
+        )
+
+        partido.duracion = 60
+        partido.save(update_fields=["duracion"])
+        partido.refresh_from_db()
+        self.assertEqual(partido.fin, fin_partido(self.fecha, hora("10:00"), 60))
+        self.assertIsNone(
+            buscar_conflicto(self.cancha.pk, self.fecha, hora("11:00"), hora("12:00"))
+        )
+
+    def test_match_crossing_midnight_occupies_next_day(self):
+        """Test that a late match blocks the first slots of the next day"""
+        siguiente = self.fecha + datetime.timedelta(days=1)
+        Partido.objects.create(cancha=self.cancha, fecha=self.fecha, hora=hora("23:00"))
+        self.assertEqual(
+            obtener_slots(self.cancha.pk, self.fecha), mascara(hora("23:00"), hora("00:00"))
+        )
+        self.assertEqual(
+            obtener_slots(self.cancha.pk, siguiente), mascara(hora("00:00"), hora("01:00"))
+        )
+        self.assertEqual(
+            buscar_conflicto(self.cancha.pk, siguiente, hora("00:30"), hora("02:00")),
+            ("partido", hora("23:00"), hora("01:00")),
+        )
+
+    def test_one_row_per_court_and_day(self):
+        """Test that one index row exists per court and day"""
+        self.reservar("08:00", "09:00")
+        self.reservar("09:00", "10:00")
+        self.assertEqual(OcupacionCancha.objects.count(), 1)
+
+
+def error_de_base_de_datos(sqlstate):
+    # Django encadena el error del driver, que expone el SQLSTATE en `pgcode`
+    causa = Exception("violación")
+    causa.pgcode = sqlstate
+    error = IntegrityError("violación")
+    error.__cause__ = causa
+    return error
+
+
+class CapturarSolapamientoTestCase(TestCase):
+    """Tests for turning exclusion-constraint violations into form errors"""
+
+    def setUp(self):
+        self.form = forms.Form(data={})
+        self.form.is_valid()
+
+    def test_exclusion_violation_becomes_form_error(self):
+        """Test that a 23P01 violation is reported on the form"""
+        with capturar_solapamiento(self.form):
+            raise error_de_base_de_datos("23P01")
+        self.assertEqual(self.form.non_field_errors(), [MENSAJE_SOLAPAMIENTO])
+
+    def test_other_integrity_errors_propagate(self):
+        """Test that unrelated integrity errors are not swallowed"""
+        with self.assertRaises(IntegrityError):
+            with capturar_solapamiento(self.form):
+                raise error_de_base_de_datos("23505")
+        self.assertFalse(self.form.errors)
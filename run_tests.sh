@@ -31,6 +31,20 @@ echo ""
 echo "🎯 Ejecutando TODOS los tests de users..."
 python manage.py test users --verbosity=2
 
+# Ejecutar tests de competencias, instalaciones y core
+echo ""
+echo "🏆 Tests de Competencias..."
+python manage.py test competitions --verbosity=2
+
+echo ""
+echo "🏟️ Tests de Instalaciones..."
+python manage.py test facilities --verbosity=2
+
+echo ""
+# Incluye el presupuesto de consultas de las vistas más usadas (regresiones N+1)
+echo "⚙️ Tests de Core (API, formularios, paginación, presupuesto de consultas)..."
+python manage.py test core --verbosity=2
+
 echo ""
 echo "=============================================="
 echo "✅ Tests completados!"
@@ -0,0 +1,91 @@
+// Selectores de jugadores con búsqueda en el servidor (core/widgets.py).
+// El <select> solo trae las opciones elegidas; las demás se buscan en la API.
+document.addEventListener("DOMContentLoaded", () => {
+    const MINIMO_CARACTERES = 2;
+    const ESPERA_MS = 250;
+
+    const agregarOpcion = (select, jugador) => {
+        const valor = String(jugador.id);
+        if (!select.multiple) {
+            // Un único jugador: se conserva solo la opción vacía
+            Array.from(select.options)
+                .filter(opcion => opcion.value !== "")
+                .forEach(opcion => opcion.remove());
+        }
+        let opcion = Array.from(select.options).find(o => o.value === valor);
+        if (!opcion) {
+            opcion = new Option(`${jugador.nombre} (C.I-${jugador.cedula})`, valor);
+            select.add(opcion);
+        }
+        opcion.selected = true;
+        select.dispatchEvent(new Event("change", { bubbles: true }));
+    };
+
+    document.querySelectorAll('select[data-autocomplete="jugadores"]').forEach(select => {
+        const buscador = document.createElement("input");
+        buscador.type = "search";
+        buscador.className = "form-control form-control-sm mb-2";
+        buscador.placeholder = "Buscar jugador por nombre o cédula...";
+        buscador.autocomplete = "off";
+
+        const resultados = document.createElement("div");
+        resultados.className = "list-group mb-2";
+        resultados.style.maxHeight = "200px";
+        resultados.style.overflowY = "auto";
+
+        select.before(buscador, resultados);
+
+        if (select.multiple) {
+            // Doble clic sobre un jugador elegido lo quita
+            select.addEventListener("dblclick", e => {
+                if (e.target.tagName === "OPTION") {
+                    e.target.remove();
+                }
+            });
+            // Las opciones presentes son los jugadores elegidos
+            if (select.form) {
+                select.form.addEventListener("submit", () => {
+                    Array.from(select.options).forEach(opcion => { opcion.selected = true; });
+                });
+            }
+        }
+
+        let espera;
+        buscador.addEventListener("input", () => {
+            clearTimeout(espera);
+            const texto = buscador.value.trim();
+            if (texto.length < MINIMO_CARACTERES) {
+                resultados.replaceChildren();
+                return;
+            }
+            espera = setTimeout(() => {
+                const params = new URLSearchParams({ search: texto });
+                const selectorCategoria = select.dataset.categoriaInput;
+                const categoria = selectorCategoria && select.form
+                    ? select.form.querySelector(selectorCategoria)
+                    : null;
+                if (categoria && categoria.value) {
+                    params.set("categoria_id", categoria.value);
+                }
+                fetch(`${select.dataset.autocompleteUrl}?${params}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        resultados.replaceChildren(
+                            ...(data.jugadores || []).map(jugador => {
+                                const boton = document.createElement("button");
+                                boton.type = "button";
+                                boton.className = "list-group-item list-group-item-action py-1 small";
+                                boton.textContent = `${jugador.nombre} (C.I-${jugador.cedula})`;
+                                boton.addEventListener("click", () => {
+                                    agregarOpcion(select, jugador);
+                                    buscador.value = "";
+                                    resultados.replaceChildren();
+                                });
+                                return boton;
+                            })
+                        );
+                    });
+            }, ESPERA_MS);
+        });
+    });
+});